@@ -0,0 +1,159 @@
+"""Microbenchmark of the old nested keyword loops against the compiled matchers: python bench_matcher.py"""
+import os
+import random
+import time
+os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+import main
+import qloo_client
+from qloo_client import EntityRecord
+from tag_index import TagBitsets, CULTURAL_TAGS
+WORDS = [
+    "japanese", "italian", "mexican", "vinyl", "record", "live", "concert", "cocktail", "wine", "art", "gallery",
+    "museum", "craft", "yoga", "coffee", "cafe", "authentic", "trendy", "local", "premium", "sustainable", "cozy",
+    "innovative", "classic", "restaurant", "deli", "market", "park", "kitchen", "house", "pizza", "tavern", "hall",
+    "comfort food", "happy hour", "the", "and", "spot", "corner", "brooklyn", "east", "village", "studio"
+]
+TAG_TYPES = ["urn:tag:category:place", "urn:tag:genre:place", "urn:tag:amenity:place", "urn:tag:offerings:place",
+             "urn:tag:cuisine:place"]
+MESSAGES = [
+    "I love jazz clubs, rooftop cocktails and hidden vintage markets",
+    "Looking for specialty coffee and a museum afternoon in Brooklyn",
+    "Any craft beer spots near live music venues?",
+]
+def phrase(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, n)))
+def make_entities(n, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "name": phrase(rng, 3).title(),
+        "tags": [{"name": phrase(rng, 2).title(), "type": rng.choice(TAG_TYPES)} for _ in range(rng.randint(2, 10))],
+        "properties": {"keywords": [{"name": phrase(rng, 2)} for _ in range(rng.randint(0, 8))],
+                       "description": phrase(rng, 20)}
+    } for _ in range(n)]
+def naive_signals(entity):
+    signals = []
+    for tag in entity.get("tags", []):
+        tag_name = tag.get("name", "").lower()
+        tag_type = tag.get("type", "")
+        if any(w in tag_name for w in ["japanese", "asian"]):
+            signals.append("Japanese Culture Enthusiasts")
+        elif any(w in tag_name for w in ["italian", "mediterranean"]):
+            signals.append("European Culture Seekers")
+        elif any(w in tag_name for w in ["mexican", "latin", "caribbean"]):
+            signals.append("Latin Culture Community")
+        elif "cuisine" in tag_type and not signals:
+            signals.append("Culinary Adventurers")
+        elif any(w in tag_name for w in ["vinyl", "record", "music"]):
+            signals.append("Vinyl & Music Collectors")
+        elif any(w in tag_name for w in ["live", "concert", "dj", "performance"]):
+            signals.append("Live Music Scene")
+        elif any(w in tag_name for w in ["bar", "cocktail", "wine", "beer", "nightlife"]):
+            signals.append("Craft Cocktail Enthusiasts")
+        elif any(w in tag_name for w in ["art", "gallery", "museum", "creative", "design"]):
+            signals.append("Arts & Culture Connoisseurs")
+        elif any(w in tag_name for w in ["craft", "artisan", "maker", "handmade"]):
+            signals.append("Artisan Craft Community")
+        elif any(w in tag_name for w in ["yoga", "fitness", "health", "organic", "wellness"]):
+            signals.append("Mindful Wellness Community")
+        elif "coffee" in tag_name or "cafe" in tag_name:
+            signals.append("Third Wave Coffee Culture")
+    for keyword in entity["properties"]["keywords"][:5]:
+        name = keyword.get("name", "").lower()
+        if any(w in name for w in ["authentic", "traditional", "heritage", "original"]):
+            signals.append("Authenticity Seekers")
+        elif any(w in name for w in ["trendy", "hip", "cool", "modern", "contemporary", "instagram"]):
+            signals.append("Cultural Trendsetters")
+        elif any(w in name for w in ["local", "neighborhood", "community", "family"]):
+            signals.append("Neighborhood Loyalists")
+        elif any(w in name for w in ["premium", "luxury", "upscale", "fine", "exclusive"]):
+            signals.append("Premium Experience Seekers")
+        elif any(w in name for w in ["sustainable", "eco", "green", "ethical", "conscious"]):
+            signals.append("Conscious Culture Advocates")
+    description = entity["properties"]["description"].lower()
+    if any(w in description for w in ["intimate", "cozy", "hideaway", "secret"]):
+        signals.append("Intimate Experience Seekers")
+    elif any(w in description for w in ["innovative", "unique", "creative", "experimental", "cutting-edge"]):
+        signals.append("Innovation Pioneers")
+    elif any(w in description for w in ["classic", "timeless", "established", "renowned"]):
+        signals.append("Classic Culture Appreciators")
+    return signals
+def compiled_signals(entity):
+    signals = []
+    for tag in entity.get("tags", []):
+        hits = qloo_client.TAG_SIGNALS.find_groups(tag.get("name", ""))
+        signal = qloo_client.first_hit(hits, qloo_client.CUISINE_TAG_SIGNALS)
+        if signal is None and "cuisine" in tag.get("type", "") and not signals:
+            signal = "Culinary Adventurers"
+        elif signal is None:
+            signal = qloo_client.first_hit(hits, qloo_client.SCENE_TAG_SIGNALS)
+        if signal:
+            signals.append(signal)
+    for keyword in entity["properties"]["keywords"][:5]:
+        signal = qloo_client.KEYWORD_SIGNALS.first_group(keyword.get("name", ""))
+        if signal:
+            signals.append(signal)
+    signal = qloo_client.DESCRIPTION_SIGNALS.first_group(entity["properties"]["description"])
+    if signal:
+        signals.append(signal)
+    return signals
+def naive_is_cultural(entity):
+    name = entity.get("name", "").lower()
+    cultural_tag_types = {
+        'urn:tag:category:place': ['restaurant', 'museum', 'art museum', 'market', 'cafe', 'deli', 'event venue'],
+        'urn:tag:genre:place': ['restaurant', 'museum', 'art museum', 'market', 'deli', 'arena'],
+        'urn:tag:amenity:place': ['restaurant', 'bar', 'cafe'],
+        'urn:tag:offerings:place': ['comfort food', 'happy hour', 'live music']
+    }
+    is_cultural = False
+    for tag in entity["tags"]:
+        tag_name = tag.get("name", "").lower()
+        if tag.get("type", "") in cultural_tag_types:
+            if any(w in tag_name for w in cultural_tag_types[tag["type"]]):
+                is_cultural = True
+                break
+    indicators = ['museum', 'gallery', 'market', 'deli', 'restaurant', 'cafe', 'bar', 'lounge', 'center', 'house',
+                  'theater', 'studio', 'kitchen', 'bistro', 'tavern', 'club', 'palace', 'hall', 'room', 'eataly',
+                  'katz', 'beauty & essex']
+    if any(i in name for i in indicators):
+        is_cultural = True
+    if any(t.get("name", "").lower() in ['tourist attraction', 'historical landmark', 'monument'] for t in entity["tags"]):
+        is_cultural = True
+    return is_cultural
+def cultural_flags(records):
+    """The /api/venues cultural filter over a candidate pool, before the skip list"""
+    tagged = TagBitsets(records).any(CULTURAL_TAGS)
+    return [bool(has_tag) or main.CULTURAL_NAME_INDICATORS.any(r.name) for r, has_tag in zip(records, tagged)]
+def clear_caches():
+    for group in (qloo_client.TAG_SIGNALS, qloo_client.KEYWORD_SIGNALS, qloo_client.DESCRIPTION_SIGNALS):
+        group.find_groups.cache_clear()
+        group.keywords.find.cache_clear()
+def timed(fn, entities, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for entity in entities:
+            fn(entity)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+def main_bench():
+    print(f"{'entities':>8} | {'task':<16} | {'naive ms':>9} | {'compiled cold':>13} | {'compiled warm':>13} | speedup")
+    for n in (50, 500, 5000):
+        entities = make_entities(n, seed=n)
+        assert [naive_signals(e) for e in entities] == [compiled_signals(e) for e in entities]
+        records = [EntityRecord(e) for e in entities]
+        assert [naive_is_cultural(e) for e in entities] == cultural_flags(records)
+        for task, naive, compiled, inputs in (("cluster signals", naive_signals, compiled_signals, entities),
+                                              ("venue filter", naive_is_cultural, cultural_flags, [records])):
+            naive_ms = timed(naive, entities)
+            clear_caches()
+            cold_ms = timed(compiled, inputs, repeat=1)
+            warm_ms = timed(compiled, inputs)
+            print(f"{n:>8} | {task:<16} | {naive_ms:>9.2f} | {cold_ms:>13.2f} | {warm_ms:>13.2f} | {naive_ms / warm_ms:>6.1f}x")
+    started = time.perf_counter()
+    for _ in range(1000):
+        for message in MESSAGES:
+            main.mock_extract_tastes(message)
+    per_message_ms = (time.perf_counter() - started) * 1000 / (1000 * len(MESSAGES))
+    print(f"mock_extract_tastes: {per_message_ms:.3f} ms per message (warm)")
+if __name__ == "__main__":
+    main_bench()
\ No newline at end of file
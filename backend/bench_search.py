@@ -0,0 +1,77 @@
+"""Build time, memory and latency of the /api/qloo-search indexes: python bench_search.py [entities]"""
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from search_index import SearchIndex
+SYLLABLES = ["ka", "to", "ri", "mo", "an", "el", "su", "pa", "ne", "lo", "vi", "da", "gu", "ber", "tz", "sh", "en", "heim"]
+TAG_NAMES = ["Deli", "Cafe", "Bar", "Art Museum", "Jazz Club", "Bakery", "Market", "Gallery", "Park", "Rooftop Bar",
+             "Wine Bar", "Bookstore", "Record Store", "Ramen", "Pizza", "Tavern", "Theater", "Comedy Club"]
+def make_catalog(n, seed=0):
+    rng = random.Random(seed)
+    words = sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(n // 8)})
+    return [{
+        "id": f"urn:entity:{i}",
+        "name": " ".join(rng.choice(words).title() for _ in range(rng.randint(1, 4))),
+        "popularity": rng.random(),
+        "tags": [{"type": "urn:tag:genre:place", "name": rng.choice(TAG_NAMES)} for _ in range(rng.randint(1, 4))],
+        "properties": {"keywords": [{"name": rng.choice(words)} for _ in range(rng.randint(0, 5))]}
+    } for i in range(n)]
+def typo(rng, text):
+    chars = list(text)
+    i = rng.randrange(len(chars) - 1)
+    edit = rng.choice(("swap", "drop", "replace"))
+    if edit == "swap":
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    elif edit == "drop":
+        del chars[i]
+    else:
+        chars[i] = rng.choice("aeiourstn")
+    return "".join(chars)
+def build(catalog):
+    index = SearchIndex(max_entities=len(catalog))
+    for entity in catalog:
+        index.add(entity)
+    index._fuzzy_names.compact()
+    index._fuzzy_tags.compact()
+    return index
+def latency(fn, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], timings[-1]
+def main(n):
+    catalog = make_catalog(n)
+    rng = random.Random(1)
+    started = time.perf_counter()
+    index = build(catalog)
+    build_s = time.perf_counter() - started
+    tracemalloc.start()
+    traced = build(catalog)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+    sample = [entity["name"].lower() for entity in rng.sample(catalog, 300)]
+    long_words = [w for name in sample for w in name.split() if len(w) >= 6]
+    queries = {
+        "prefix (3 chars)": [name[:3] for name in sample],
+        "full name": sample,
+        "two words": [" ".join(name.split()[:2]) for name in sample if " " in name],
+        "typo, 1 edit": [typo(rng, w) for w in long_words[:300]],
+        "typo + prefix": [typo(rng, w)[:-1] for w in long_words[:300]],
+    }
+    found = sum(1 for q in queries["typo, 1 edit"] if index.fuzzy_search(q))
+    print(f"entities: {n}, tokens: {len(index._vocabulary)}, name strings: {index._fuzzy_names.stats()['strings']}")
+    print(f"build: {build_s:.2f} s, index memory: {current / 2 ** 20:.1f} MiB (peak {peak / 2 ** 20:.1f} MiB)")
+    print(f"typo recall: {found}/{len(queries['typo, 1 edit'])}")
+    print(f"{'query':<18} | {'engine':<6} | {'p50 ms':>7} | {'p95 ms':>7} | {'max ms':>7}")
+    for label, items in queries.items():
+        fuzzy = label.startswith("typo")
+        p50, p95, worst = latency(index.fuzzy_search if fuzzy else index.search, items)
+        print(f"{label:<18} | {'fuzzy' if fuzzy else 'prefix':<6} | {p50:>7.2f} | {p95:>7.2f} | {worst:>7.2f}")
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+FRESH = 'fresh'
+STALE = 'stale'
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a TTL and may be served stale for a grace window"""
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 300.0, stale_ttl: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    def lookup(self, key: Hashable) -> Tuple[Optional[str], Any]:
+        """Return (FRESH|STALE, value) for a usable entry, or (None, None) on a miss"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, None
+        value, expires_at, stale_until = entry
+        now = self._clock()
+        if now < expires_at:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return FRESH, value
+        if now < stale_until:
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return STALE, value
+        del self._data[key]
+        self.expirations += 1
+        self.misses += 1
+        return None, None
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        state, value = self.lookup(key)
+        return default if state is None else value
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, stale_ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        expires_at = float('inf') if ttl is None else self._clock() + ttl
+        self._data[key] = (value, expires_at, expires_at + stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+    def clear(self) -> None:
+        self._data.clear()
+    def items(self) -> List[Tuple[Hashable, Any, float]]:
+        """Live entries as (key, value, seconds until expiry), oldest first"""
+        now = self._clock()
+        return [(key, value, expires_at - now) for key, (value, expires_at, _) in self._data.items() if now < expires_at]
+    def __len__(self) -> int:
+        return len(self._data)
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and self._clock() < entry[2]
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
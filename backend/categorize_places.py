@@ -1,6 +1,14 @@
 import asyncio
 import json
-from qloo_client import call_qloo
+from qloo_client import call_qloo, EntityStore, TAG_VOCAB
+from tag_index import TagBitsets, CATEGORY_TAGS, GENRE_TAGS
+def tally(counts):
+    """Tag-id counts keyed by tag name, in vocabulary (first interned) order"""
+    named = {}
+    for tag_id in sorted(counts):
+        name = TAG_VOCAB.names[tag_id]
+        named[name] = named.get(name, 0) + counts[tag_id]
+    return named
 async def categorize_qloo_places():
     """Categorize all the types of places Qloo returns"""
     params = {
@@ -12,29 +20,21 @@ async def categorize_qloo_places():
     try:
         print("🔍 Getting comprehensive list of Qloo places...")
         response = await call_qloo('/v2/insights', params)
-        entities = response.get('results', {}).get('entities', [])
+        entities = EntityStore.from_response(response).records
         print(f"📊 Analyzing {len(entities)} entities")
-        place_categories = {}
-        place_genres = {}
-        for entity in entities:
-            name = entity.get('name', 'Unknown')
-            tags = entity.get('tags', [])
-            entity_categories = []
-            entity_genres = []
-            for tag in tags:
-                tag_name = tag.get('name', '')
-                tag_type = tag.get('type', '')
-                if tag_type == 'urn:tag:category:place':
-                    entity_categories.append(tag_name)
-                    place_categories[tag_name] = place_categories.get(tag_name, 0) + 1
-                elif tag_type == 'urn:tag:genre:place':
-                    entity_genres.append(tag_name)
-                    place_genres[tag_name] = place_genres.get(tag_name, 0) + 1
-            if len(entity_categories) > 0 or len(entity_genres) > 0:
-                print(f"🏢 {name}")
-                if entity_categories:
+        bitsets = TagBitsets(entities)
+        place_categories = tally(bitsets.tag_counts(CATEGORY_TAGS))
+        place_genres = tally(bitsets.tag_counts(GENRE_TAGS))
+        has_category = bitsets.any(CATEGORY_TAGS)
+        has_genre = bitsets.any(GENRE_TAGS)
+        for entity, categorized, genred in zip(entities, has_category, has_genre):
+            if categorized or genred:
+                print(f"🏢 {entity.name or 'Unknown'}")
+                if categorized:
+                    entity_categories = [TAG_VOCAB.names[t] for t in entity.tag_ids if t in CATEGORY_TAGS]
                     print(f"   Categories: {', '.join(entity_categories[:3])}")
-                if entity_genres:
+                if genred:
+                    entity_genres = [TAG_VOCAB.names[t] for t in entity.tag_ids if t in GENRE_TAGS]
                     print(f"   Genres: {', '.join(entity_genres[:3])}")
         print(f"\n📊 PLACE CATEGORIES (by frequency):")
         for cat, count in sorted(place_categories.items(), key=lambda x: x[1], reverse=True):
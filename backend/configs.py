@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 load_dotenv()
 class Settings:
@@ -8,4 +9,39 @@ class Settings:
     EMBED_MODEL = os.getenv('EMBED_MODEL')
     VECTOR_DIR = 'vectorstore'
     COLLECTION_NAME = 'culturis'
+    QLOO_TIMEOUT = float(os.getenv('QLOO_TIMEOUT', '30'))
+    QLOO_CONNECT_TIMEOUT = float(os.getenv('QLOO_CONNECT_TIMEOUT', '5'))
+    QLOO_MAX_CONNECTIONS = int(os.getenv('QLOO_MAX_CONNECTIONS', '20'))
+    QLOO_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('QLOO_MAX_KEEPALIVE_CONNECTIONS', '10'))
+    QLOO_KEEPALIVE_EXPIRY = float(os.getenv('QLOO_KEEPALIVE_EXPIRY', '60'))
+    QLOO_HTTP2 = os.getenv('QLOO_HTTP2', 'false').lower() in ('1', 'true', 'yes')
+    QLOO_CACHE_MAX_ENTRIES = int(os.getenv('QLOO_CACHE_MAX_ENTRIES', '512'))
+    QLOO_CACHE_TTL = float(os.getenv('QLOO_CACHE_TTL', '300'))
+    QLOO_CACHE_STALE_TTL = float(os.getenv('QLOO_CACHE_STALE_TTL', '600'))
+    QLOO_CACHE_TTLS = {k: float(v) for k, v in json.loads(os.getenv('QLOO_CACHE_TTLS', '{"/v2/insights": 900}')).items()}
+    RETRIEVER_WORKERS = int(os.getenv('RETRIEVER_WORKERS', '4'))
+    PLANNER_CACHE_MAX_ENTRIES = int(os.getenv('PLANNER_CACHE_MAX_ENTRIES', '2048'))
+    PLANNER_CACHE_TTL = float(os.getenv('PLANNER_CACHE_TTL', '86400'))
+    PLANNER_CACHE_PATH = os.getenv('PLANNER_CACHE_PATH')
+    PLANNER_RULE_MIN_CONFIDENCE = float(os.getenv('PLANNER_RULE_MIN_CONFIDENCE', '0.75'))
+    PLANNER_CONTEXT_TOKEN_BUDGET = int(os.getenv('PLANNER_CONTEXT_TOKEN_BUDGET', '600'))
+    CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', '512'))
+    CHAT_CACHE_THRESHOLD = float(os.getenv('CHAT_CACHE_THRESHOLD', '0.92'))
+    CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', '3600'))
+    CHAT_CACHE_EMBED_TIMEOUT = float(os.getenv('CHAT_CACHE_EMBED_TIMEOUT', '1.5'))
+    EMBED_CACHE_PATH = os.getenv('EMBED_CACHE_PATH', os.path.join('vectorstore', 'embeddings_cache.sqlite'))
+    EMBED_CACHE_MEMORY_SIZE = int(os.getenv('EMBED_CACHE_MEMORY_SIZE', '4096'))
+    LOG_SINK_MAX_QUEUE = int(os.getenv('LOG_SINK_MAX_QUEUE', '1000'))
+    LOG_SINK_BATCH_SIZE = int(os.getenv('LOG_SINK_BATCH_SIZE', '50'))
+    LOG_SINK_FLUSH_INTERVAL = float(os.getenv('LOG_SINK_FLUSH_INTERVAL', '1.0'))
+    LOG_SINK_DROP_POLICY = os.getenv('LOG_SINK_DROP_POLICY', 'newest')
+    SEARCH_INDEX_MAX_ENTITIES = int(os.getenv('SEARCH_INDEX_MAX_ENTITIES', '50000'))
+    SEARCH_WARMUP_LOCATIONS = json.loads(os.getenv('SEARCH_WARMUP_LOCATIONS', '[]'))
+    SEARCH_WARMUP_RADIUS = os.getenv('SEARCH_WARMUP_RADIUS', '50000')
+    VOCAB_MAX_ENTRIES = int(os.getenv('VOCAB_MAX_ENTRIES', '50000'))
+    VENUE_FANOUT_CONCURRENCY = int(os.getenv('VENUE_FANOUT_CONCURRENCY', '8'))
+    VENUE_FANOUT_LIMIT = int(os.getenv('VENUE_FANOUT_LIMIT', '20'))
+    TASTE_LOCAL_MIN_CONFIDENCE = float(os.getenv('TASTE_LOCAL_MIN_CONFIDENCE', '0.6'))
+    TASTE_CACHE_MAX_ENTRIES = int(os.getenv('TASTE_CACHE_MAX_ENTRIES', '2048'))
+    TASTE_CACHE_TTL = float(os.getenv('TASTE_CACHE_TTL', '86400'))
 setting = Settings()
\ No newline at end of file
@@ -1,6 +1,23 @@
-from index import retriever
-def build_context(query):
-    tag_snips, shot_snips = retriever.retrieve(query, k=8)
-    sections = ["Retriever tags:"] + [d['text'] for d in tag_snips]
-    sections += ["\nFew-shot examples"] + [d['text'] for d in shot_snips]
-    return "\n---\n".join(sections)
\ No newline at end of file
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from configs import setting
+_executor = ThreadPoolExecutor(max_workers=setting.RETRIEVER_WORKERS, thread_name_prefix="retriever")
+def _retrieve(query, k):
+    from index import get_retriever
+    return get_retriever().retrieve(query, k=k)
+def _embed(query):
+    from embeddings import embed_texts
+    return embed_texts([query])[0]
+async def embed_query(query):
+    """Unit-normalized embedding of a query, computed (or read from the embedding cache) on the retriever pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _embed, query)
+def rank_snippets(tag_snips, shot_snips):
+    """Tag and few-shot snippets in one list, most similar to the query first"""
+    return sorted(list(tag_snips) + list(shot_snips), key=lambda d: -d.get('score', 0.0))
+async def build_context(query):
+    """Ranked retrieval snippets for a query. The blocking vector lookup and query embedding run on
+    the retriever pool, off the event loop; the prompt builder decides how many fit its token budget."""
+    loop = asyncio.get_running_loop()
+    tag_snips, shot_snips = await loop.run_in_executor(_executor, _retrieve, query, 8)
+    return rank_snippets(tag_snips, shot_snips)
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional
+import numpy as np
+from cache import TTLCache
+def normalize_text(text: str) -> str:
+    """Unicode- and whitespace-normalized text, the form that is embedded and hashed"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-memory LRU in front of a SQLite file that survives restarts"""
+    def __init__(self, path: Optional[str] = None, memory_size: int = 4096):
+        self.path = path
+        self._memory = TTLCache(max_size=memory_size, ttl=None)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+        return self._conn
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [embedding_key(model, t) for t in texts]
+        found: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(i)
+                else:
+                    found[i] = vector
+                    self.memory_hits += 1
+            db = self._db()
+            if missing and db is not None:
+                wanted = list({keys[i] for i in missing})
+                rows = {}
+                for start in range(0, len(wanted), 500):
+                    chunk = wanted[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows.update(db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall())
+                still_missing = []
+                for i in missing:
+                    blob = rows.get(keys[i])
+                    if blob is None:
+                        still_missing.append(i)
+                        continue
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._memory.set(keys[i], vector)
+                    found[i] = vector
+                    self.disk_hits += 1
+                missing = still_missing
+            self.misses += len(missing)
+        return found
+    def put_many(self, model: str, texts: List[str], vectors: np.ndarray) -> None:
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                vector = np.array(vector, dtype=np.float32)
+                vector.flags.writeable = False
+                key = embedding_key(model, text)
+                self._memory.set(key, vector)
+                rows.append((key, model, vector.tobytes()))
+            db = self._db()
+            if db is not None and rows:
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)", rows)
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_size": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_hit_rate": round(self.memory_hits / lookups, 4) if lookups else 0.0,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_path": self.path
+        }
\ No newline at end of file
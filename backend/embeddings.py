@@ -0,0 +1,44 @@
+from typing import List
+import numpy as np
+from openai import OpenAI
+from configs import setting
+from embedding_cache import EmbeddingCache, normalize_text
+DEFAULT_EMBED_MODEL = "text-embedding-ada-002"
+EMBED_BATCH_SIZE = 256
+_client = None
+embedding_cache = EmbeddingCache(setting.EMBED_CACHE_PATH, setting.EMBED_CACHE_MEMORY_SIZE)
+def embed_model() -> str:
+    return setting.EMBED_MODEL or DEFAULT_EMBED_MODEL
+def _get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=setting.OPENAI_API_KEY)
+    return _client
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product is a cosine similarity"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+def _embed_uncached(texts: List[str], model: str) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        batch = texts[start:start + EMBED_BATCH_SIZE]
+        resp = _get_client().embeddings.create(model=model, input=batch)
+        vectors.extend(item.embedding for item in sorted(resp.data, key=lambda d: d.index))
+    return normalize_rows(np.asarray(vectors, dtype=np.float32))
+def embed_texts(texts: List[str], model: str = None) -> np.ndarray:
+    """Embed texts as a unit-normalized float32 matrix, only calling the API for texts not yet cached"""
+    model = model or embed_model()
+    texts = [normalize_text(t) for t in texts]
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    found = embedding_cache.get_many(model, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, found) if v is None))
+    if missing:
+        fresh = _embed_uncached(missing, model)
+        embedding_cache.put_many(model, missing, fresh)
+        by_text = dict(zip(missing, fresh))
+        found = [by_text[t] if v is None else v for t, v in zip(texts, found)]
+    return np.vstack(found).astype(np.float32, copy=False)
+def embedding_cache_stats() -> dict:
+    return embedding_cache.stats()
\ No newline at end of file
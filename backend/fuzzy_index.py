@@ -0,0 +1,169 @@
+import math
+from itertools import chain
+from typing import Dict, List, Sequence, Set, Tuple
+import numpy as np
+def trigrams(token: str) -> List[str]:
+    padded = f"  {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+def edit_bound(token: str) -> int:
+    """Typos tolerated in a query token: none for 1-2 letters, one up to 4, two beyond"""
+    return 0 if len(token) <= 2 else 1 if len(token) <= 4 else 2
+def prefix_distance(query: str, target: str, bound: int) -> int:
+    """Optimal-string-alignment distance from query to its best-matching prefix of target,
+    or bound + 1 once it provably exceeds bound, so typeahead partial words still match"""
+    target = target[:len(query) + bound]
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(query) + 1):
+        current = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if query[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and j > 1 and query[i - 1] == target[j - 2]
+                    and query[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > bound:
+            return bound + 1
+        previous_previous, previous = previous, current
+    low = max(0, len(query) - bound)
+    return min(min(previous[low:]), bound + 1)
+class TrigramIndex:
+    """Typo-tolerant lookup over normalized strings: CSR trigram postings, re-ranked by prefix edit distance"""
+    def __init__(self, merge_threshold: int = 4096, max_dead_fraction: float = 0.25):
+        self.merge_threshold = merge_threshold
+        self.max_dead_fraction = max_dead_fraction
+        self._reset()
+    def _reset(self) -> None:
+        self._trigram_ids: Dict[str, int] = {}
+        self._token_grams: Dict[str, Tuple[int, ...]] = {}
+        self._item_ids: Dict[str, int] = {}
+        self.texts: List[str] = []
+        self.keys: List[Set[str]] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._flat = np.zeros(0, dtype=np.int32)
+        self._compiled_items = 0
+        self._pending: List[Tuple[int, frozenset]] = []
+        self._alive = bytearray()
+        self._dead = 0
+    def __len__(self) -> int:
+        return len(self.texts) - self._dead
+    def add(self, text: str, key: str) -> None:
+        if not text:
+            return
+        item = self._item_ids.get(text)
+        if item is None:
+            item = self._item_ids[text] = len(self.texts)
+            self.texts.append(text)
+            self.keys.append(set())
+            self._alive.append(1)
+            grams = frozenset(g for token in text.split() for g in self._grams_of(token))
+            self._pending.append((item, grams))
+            if len(self._pending) >= self.merge_threshold:
+                self.compact()
+        elif not self._alive[item]:
+            self._alive[item] = 1
+            self._dead -= 1
+        self.keys[item].add(key)
+    def keys_for(self, text: str) -> Set[str]:
+        item = self._item_ids.get(text)
+        return set() if item is None else set(self.keys[item])
+    def discard(self, text: str, key: str) -> None:
+        item = self._item_ids.get(text)
+        if item is None or key not in self.keys[item]:
+            return
+        self.keys[item].discard(key)
+        if not self.keys[item]:
+            self._alive[item] = 0
+            self._dead += 1
+            if self._dead > self.max_dead_fraction * len(self.texts):
+                self.rebuild()
+    def rebuild(self) -> None:
+        """Re-index only the live strings, releasing the postings and trigram ids of dead ones"""
+        live = [(text, keys) for text, keys in zip(self.texts, self.keys) if keys]
+        self._reset()
+        for text, keys in live:
+            for key in keys:
+                self.add(text, key)
+        self.compact()
+    def _grams_of(self, token: str) -> Tuple[int, ...]:
+        grams = self._token_grams.get(token)
+        if grams is None:
+            ids = []
+            for gram in trigrams(token):
+                gram_id = self._trigram_ids.get(gram)
+                if gram_id is None:
+                    gram_id = self._trigram_ids[gram] = len(self._trigram_ids)
+                ids.append(gram_id)
+            grams = self._token_grams[token] = tuple(ids)
+        return grams
+    def compact(self) -> None:
+        """Fold every pending string into the CSR arrays with one stable sort by trigram"""
+        if not self._pending:
+            return
+        sizes = [len(grams) for _, grams in self._pending]
+        new_items = np.repeat(np.fromiter((item for item, _ in self._pending), dtype=np.int32, count=len(sizes)), sizes)
+        new_grams = np.fromiter(chain.from_iterable(grams for _, grams in self._pending), dtype=np.int64, count=sum(sizes))
+        old_grams = np.repeat(np.arange(len(self._offsets) - 1), np.diff(self._offsets))
+        grams = np.concatenate([old_grams, new_grams])
+        order = np.argsort(grams, kind='stable')
+        self._flat = np.concatenate([self._flat, new_items])[order]
+        counts = np.bincount(grams, minlength=len(self._trigram_ids))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._compiled_items = len(self.texts)
+        self._pending = []
+    def _overlaps(self, grams: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        compiled = [g for g in grams if g + 1 < len(self._offsets)]
+        if compiled and self._compiled_items:
+            slices = [self._flat[self._offsets[g]:self._offsets[g + 1]] for g in compiled]
+            counts = np.bincount(np.concatenate(slices), minlength=self._compiled_items)
+        else:
+            counts = np.zeros(self._compiled_items, dtype=np.int64)
+        query = set(grams)
+        pending = [(item, len(query & item_grams)) for item, item_grams in self._pending]
+        items = np.concatenate([np.arange(self._compiled_items), np.fromiter((p[0] for p in pending), dtype=np.int64)])
+        shared = np.concatenate([counts, np.fromiter((p[1] for p in pending), dtype=np.int64)])
+        return items, shared
+    def search(self, query_tokens: Sequence[str], limit: int = 10, min_overlap: float = 0.3,
+               candidates: int = 64) -> List[Tuple[str, int, float]]:
+        """(text, total edit distance, trigram overlap) for the closest strings, best first"""
+        query_tokens = [t for t in query_tokens if t]
+        grams = sorted({self._trigram_ids[g] for token in query_tokens for g in trigrams(token) if g in self._trigram_ids})
+        total = len({g for token in query_tokens for g in trigrams(token)})
+        if not grams or not total:
+            return []
+        items, shared = self._overlaps(grams)
+        shared = np.where(np.frombuffer(self._alive, dtype=np.bool_)[items], shared, 0)
+        eligible = np.flatnonzero(shared >= max(1, math.ceil(min_overlap * total)))
+        if len(eligible) > candidates:
+            eligible = eligible[np.argpartition(-shared[eligible], candidates - 1)[:candidates]]
+        ranked = []
+        distances: Dict[Tuple[str, str], int] = {}
+        def word_distance(token: str, word: str, bound: int) -> int:
+            if word.startswith(token):
+                return 0
+            key = (token, word)
+            if key not in distances:
+                distances[key] = prefix_distance(token, word, bound)
+            return distances[key]
+        for position in eligible:
+            item = int(items[position])
+            words = self.texts[item].split()
+            distance = 0
+            for token in query_tokens:
+                bound = edit_bound(token)
+                best = min(word_distance(token, word, bound) for word in words)
+                if best > bound:
+                    break
+                distance += best
+            else:
+                ranked.append((distance, -int(shared[position]) / total, len(self.texts[item]), item))
+        ranked.sort()
+        return [(self.texts[item], distance, -overlap) for distance, overlap, _, item in ranked[:limit]]
+    def stats(self) -> Dict[str, int]:
+        return {
+            "strings": len(self.texts),
+            "dead": self._dead,
+            "trigrams": len(self._trigram_ids),
+            "postings": int(self._offsets[-1]) + sum(len(g) for _, g in self._pending),
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,5 @@
+import hashlib
+def stable_bucket(text: str, buckets: int = 100) -> int:
+    """A per-text bucket that, unlike the salted builtin hash(), is the same in every process"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % buckets
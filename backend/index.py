@@ -1,25 +1,30 @@
-import chromadb
-from chromadb.utils import embedding_functions
 from configs import setting
-import os
+from embeddings import embed_texts
+from vector_index import VectorIndex
+import threading
 class RAGRetriever:
     def __init__(self):
-        if not os.getenv('CHROMA_OPENAI_API_KEY') and setting.OPENAI_API_KEY:
-            os.environ['CHROMA_OPENAI_API_KEY'] = setting.OPENAI_API_KEY
-        self.client = chromadb.PersistentClient(path=setting.VECTOR_DIR)
-        self.collection = self.client.get_or_create_collection(
-            setting.COLLECTION_NAME,
-            embedding_function=embedding_functions.OpenAIEmbeddingFunction(
-                model_name=setting.EMBED_MODEL or "text-embedding-ada-002"
-            )
-        )
+        try:
+            self.index = VectorIndex.load(setting.VECTOR_DIR, setting.COLLECTION_NAME)
+        except FileNotFoundError:
+            print(f"⚠️ No vector index in '{setting.VECTOR_DIR}', run python vectorRAG.py to build it")
+            self.index = None
     def retrieve(self, query, k = 8):
-        result = self.collection.query(query_texts=[query], n_results=k)
         docs = []
-        for i, doc in enumerate(result['documents'][0]):
-            meta = result['metadatas'][0][i]  
-            docs.append({"text": doc, "metadata": meta})
+        if self.index is not None and len(self.index):
+            query_vector = embed_texts([query], model=self.index.model)[0]
+            for score, doc in self.index.search(query_vector, k):
+                docs.append({"text": doc["text"], "metadata": doc["metadata"], "score": score})
         tag_snips = [d for d in docs if d['metadata'].get("kind") == 'tag']
         shot_snips = [d for d in docs if d['metadata'].get("kind") == 'fewshot']
         return tag_snips, shot_snips
-retriever = RAGRetriever()
\ No newline at end of file
+_retriever = None
+_retriever_lock = threading.Lock()
+def get_retriever() -> RAGRetriever:
+    """Open the vector store on first use instead of at import time"""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = RAGRetriever()
+    return _retriever
\ No newline at end of file
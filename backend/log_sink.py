@@ -0,0 +1,94 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+DROP_NEWEST = 'newest'
+DROP_OLDEST = 'oldest'
+class LogSink:
+    """Bounded queue of log documents, drained by a background task that writes them with insert_many"""
+    def __init__(self, collection, max_queue: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 1.0, drop_policy: str = DROP_NEWEST,
+                 before_write: Optional[Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]] = None):
+        if drop_policy not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.before_write = before_write
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+    def submit(self, doc: Dict[str, Any]) -> bool:
+        """Queue a document without waiting; returns False if it (or an older one) was dropped"""
+        self.submitted += 1
+        try:
+            self._queue.put_nowait(doc)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.drop_policy == DROP_OLDEST:
+                self._queue.get_nowait()
+                self._queue.put_nowait(doc)
+            return False
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+    async def stop(self) -> None:
+        """Stop the writer and flush everything still queued"""
+        self._stopping = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+            await self._write(batch)
+    async def _run(self) -> None:
+        while not self._stopping:
+            batch = await self._next_batch()
+            if batch:
+                await self._write(batch)
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        try:
+            batch = [await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)]
+        except asyncio.TimeoutError:
+            return []
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopping:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            if self.before_write is not None:
+                batch = await self.before_write(batch)
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"⚠️ Failed to write {len(batch)} log documents: {e}")
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "drop_policy": self.drop_policy,
+            "running": self._task is not None and not self._task.done()
+        }
\ No newline at end of file
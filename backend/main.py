@@ -1,22 +1,63 @@
 import os
+import copy
+import json
+import asyncio
 import random
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Any
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 from models import UserIn, UserDB, ChatRequest, Plan, ChatResponse
-from context import build_context
-from planner import plan_qloo_call
-from qloo_client import call_qloo, build_qloo_json, top_clusters
-from stylist import prettify_answers
-from mongo import logs_col
+from context import build_context, embed_query
+from planner import plan_qloo_call, rule_plan, planner_cache_stats, load_plan_cache, save_plan_cache, rule_planner
+from qloo_client import (call_qloo, build_qloo_json, top_clusters, start_qloo_client, close_qloo_client, qloo_cache_stats,
+                         affinity_memo_stats, add_response_listener, fan_out_qloo, EntityStore, TAG_VOCAB,
+                         KEYWORD_VOCAB)
+from stylist import prettify_answers, iter_markdown_report
+from embeddings import embedding_cache_stats
+from mongo import logs_col, payloads_col
+from payload_store import PayloadStore
+from log_sink import LogSink
+from configs import setting
+from matcher import KeywordMatcher, GroupMatcher
+from scoring import VenueScorer
+from venue_classifier import venue_classifier
+from tag_index import TagBitsets, CULTURAL_TAGS
+from search_index import SearchIndex, warm_search_index
+from taste_extractor import taste_extractor, mock_extract_tastes
+from semantic_cache import SemanticCache
 load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-app = FastAPI()
+qloo_payload_store = PayloadStore(payloads_col, field="qloo_response")
+chat_log_sink = LogSink(
+    logs_col,
+    max_queue=setting.LOG_SINK_MAX_QUEUE,
+    batch_size=setting.LOG_SINK_BATCH_SIZE,
+    flush_interval=setting.LOG_SINK_FLUSH_INTERVAL,
+    drop_policy=setting.LOG_SINK_DROP_POLICY,
+    before_write=qloo_payload_store.externalize
+)
+search_index = SearchIndex(max_entities=setting.SEARCH_INDEX_MAX_ENTITIES)
+chat_cache = SemanticCache(setting.CHAT_CACHE_MAX_ENTRIES, threshold=setting.CHAT_CACHE_THRESHOLD, ttl=setting.CHAT_CACHE_TTL)
+add_response_listener(search_index.on_qloo_payload)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_qloo_client()
+    load_plan_cache()
+    await chat_log_sink.start()
+    warmup = asyncio.create_task(warm_search_index(setting.SEARCH_WARMUP_LOCATIONS, radius=setting.SEARCH_WARMUP_RADIUS))
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        await chat_log_sink.stop()
+        await close_qloo_client()
+        save_plan_cache()
+app = FastAPI(lifespan=lifespan)
 
 # Get allowed origins from environment or use defaults
 allowed_origins = os.getenv("ALLOWED_ORIGINS", 
@@ -42,8 +83,7 @@ except:
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins
-    ],
+    allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -61,34 +101,67 @@ async def onboarding(user:UserIn) -> Any:
         return {"success": True, "user": UserDB(**created)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+def build_extractor_json(user_query: str, planner_result: dict) -> dict:
+    return {
+        "user": user_query,
+        "qloo_request": {
+            "endpoint": planner_result["endpoint"],
+            "params": planner_result["params"]
+        }
+    }
+def log_chat(user_query: str, planner_result: dict, raw_qloo: dict, pretty: str) -> None:
+    """Hand the chat log to the background sink; the response never waits on Mongo"""
+    chat_log_sink.submit({
+        "user_query": user_query,
+        "planner_result": planner_result,
+        "qloo_response": raw_qloo,
+        "pretty_response": pretty,
+        "createdAt": datetime.utcnow()
+    })
+async def load_chat_log(log_id) -> dict:
+    """Fetch a chat_logs row with its raw Qloo response restored from the payload store"""
+    doc = await logs_col.find_one({"_id": log_id})
+    return None if doc is None else await qloo_payload_store.rehydrate(doc)
+async def embed_chat_query(user_query):
+    """The query's embedding for the semantic cache, or None if it can't be embedded promptly"""
+    try:
+        return await asyncio.wait_for(embed_query(user_query), timeout=setting.CHAT_CACHE_EMBED_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Could not embed chat query, skipping the semantic cache: {e!r}")
+        return None
+async def plan_and_fetch(user_query):
+    """The plan and raw Qloo response for a query. Rule-planned queries go straight to Qloo; the rest
+    first look for a paraphrase about the same place in the semantic cache, skipping the LLM and Qloo."""
+    planner_result = rule_plan(user_query)
+    if planner_result is not None:
+        return planner_result, await call_qloo(planner_result["endpoint"], planner_result["params"])
+    place = rule_planner.place_key(user_query)
+    query_vector = None
+    if place is not None and chat_cache.max_entries > 0:
+        query_vector = await embed_chat_query(user_query)
+    if query_vector is not None:
+        cached, _ = chat_cache.lookup(query_vector, place)
+        if cached is not None:
+            return copy.deepcopy(cached)
+    planner_result = await plan_qloo_call(user_query, lambda: build_context(user_query))
+    raw_qloo = await call_qloo(
+        planner_result["endpoint"],
+        planner_result["params"]
+    )
+    if query_vector is not None:
+        chat_cache.store(query_vector, copy.deepcopy((planner_result, raw_qloo)), place)
+    return planner_result, raw_qloo
 @app.post('/api/chat')
 async def chat(req: ChatRequest) -> Any:
     user_query = req.query.strip()
     if not user_query:
         raise HTTPException(status_code=400, detail="Empty query")
     try:
-        context = build_context(user_query)
-        planner_result = plan_qloo_call(user_query, context)
-        raw_qloo = await call_qloo(
-            planner_result["endpoint"],
-            planner_result["params"]
-        )
-        extractor_json = {
-            "user": user_query,
-            "qloo_request": {
-                "endpoint": planner_result["endpoint"],
-                "params": planner_result["params"]
-            }
-        }
+        planner_result, raw_qloo = await plan_and_fetch(user_query)
+        extractor_json = build_extractor_json(user_query, planner_result)
         qloo_package = build_qloo_json(extractor_json, raw_qloo)
         pretty = prettify_answers(user_query, qloo_package)
-        await logs_col.insert_one({
-            "user_query": user_query,
-            "planner_result": planner_result,
-            "qloo_response": raw_qloo,
-            "pretty_response": pretty,
-            "createdAt": datetime.utcnow()
-        })
+        log_chat(user_query, planner_result, raw_qloo, pretty)
         plan = Plan(
             endpoint=planner_result["endpoint"],
             params=planner_result["params"]
@@ -97,39 +170,64 @@ async def chat(req: ChatRequest) -> Any:
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+@app.post('/api/chat/stream')
+async def chat_stream(req: ChatRequest) -> Any:
+    """Server-Sent-Events variant of /api/chat: plan, then clusters, then the report section by section"""
+    user_query = req.query.strip()
+    if not user_query:
+        raise HTTPException(status_code=400, detail="Empty query")
+    async def events():
+        try:
+            planner_result, raw_qloo = await plan_and_fetch(user_query)
+            yield sse_event("plan", Plan(**planner_result).model_dump())
+            qloo_package = build_qloo_json(build_extractor_json(user_query, planner_result), raw_qloo)
+            yield sse_event("clusters", qloo_package)
+            sections = []
+            for i, section in enumerate(iter_markdown_report(qloo_package)):
+                sections.append(section)
+                yield sse_event("report", {"section": i, "markdown": section})
+            pretty = "".join(sections)
+            yield sse_event("done", {"sections": len(sections)})
+            log_chat(user_query, planner_result, raw_qloo, pretty)
+        except Exception as e:
+            print(f"Error in chat stream endpoint: {e}")
+            yield sse_event("error", {"detail": str(e)})
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 @app.get('/api/qloo-search')
 async def qloo_search(q: str) -> Any:
+    """Typeahead over every Qloo entity seen so far, then typo-tolerant matching, then a live Qloo query"""
     try:
-        params = {
-            'filter.type': 'urn:entity:place',
-            'filter.location.query': 'New York, NY',
-            'filter.location.radius': '50000',
-            'limit': 20
-        }
-        response = await call_qloo('/v2/insights', params)
-        entities = response.get("results", {}).get("entities", [])
-        matching_entities = []
-        query_lower = q.lower()
-        for entity in entities:
-            name = entity.get("name", "").lower()
-            tags = entity.get("tags", [])
-            keywords = entity.get("properties", {}).get("keywords", [])
-            if query_lower in name:
-                matching_entities.append(entity)
-                continue
-            for tag in tags:
-                tag_name = tag.get("name", "").lower()
-                if query_lower in tag_name:
-                    matching_entities.append(entity)
-                    break
-            if not any(query_lower in name for _ in [None]):
-                for keyword in keywords:
-                    keyword_name = keyword.get("name", "").lower()
-                    if query_lower in keyword_name:
-                        matching_entities.append(entity)
-                        break
+        matching_entities = search_index.search(q, limit=10)
+        source = "index"
+        if not matching_entities:
+            matching_entities = search_index.fuzzy_search(q, limit=10)
+            source = "fuzzy"
+        if not matching_entities:
+            params = {
+                'filter.type': 'urn:entity:place',
+                'filter.location.query': 'New York, NY',
+                'filter.location.radius': '50000',
+                'limit': 20
+            }
+            response = await call_qloo('/v2/insights', params)
+            source = "qloo"
+            matching_entities = search_index.search(q, limit=10)
+            if not matching_entities:
+                query_lower = q.lower()
+                for entity in EntityStore.from_response(response):
+                    if (query_lower in entity.name_lower
+                            or any(query_lower in TAG_VOCAB.lowered[t] for t in entity.tag_ids)
+                            or any(query_lower in KEYWORD_VOCAB.lowered[k] for k in entity.keyword_ids)):
+                        matching_entities.append(entity.raw)
         return {
             "success": True,
+            "source": source,
             "results": {
                 "entities": matching_entities[:10]
             }
@@ -173,40 +271,14 @@ async def extract_tastes(req: dict) -> Any:
         location = req.get("location", "New York, NY")
         if not message:
             raise HTTPException(status_code=400, detail="Empty message")
-        system_prompt = f"""You are a cultural taste extraction AI. Analyze user messages and extract specific cultural interests, activities, and venue types.
-Location context: {location}
-Existing tastes: {', '.join(existing_tastes)}
-Extract new cultural tastes from the user's message. Return a JSON array of taste objects with this format:
-{{"id": "unique_id", "name": "Taste Name", "color": "
-Focus on:
-- Specific venue types (jazz clubs, art galleries, bookstores, etc.)
-- Activity preferences (live music, rooftop dining, craft cocktails, etc.)  
-- Cultural interests (contemporary art, vintage shopping, local cuisine, etc.)
-- Ambiance preferences (intimate, vibrant, quiet, social, etc.)
-Only extract tastes that are clearly mentioned or strongly implied. Avoid duplicating existing tastes.
-Return valid JSON only, no explanations."""
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message}
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
-        extracted_content = response.choices[0].message.content.strip()
-        import json
-        try:
-            extracted_tastes = json.loads(extracted_content)
-            if not isinstance(extracted_tastes, list):
-                extracted_tastes = []
-        except json.JSONDecodeError:
-            extracted_tastes = mock_extract_tastes(message)
+        result = await taste_extractor.extract(message, existing_tastes, location)
         return {
             "success": True,
-            "extracted_tastes": extracted_tastes,
+            "extracted_tastes": result["extracted_tastes"],
             "message": message,
-            "location": location
+            "location": location,
+            "tier": result["tier"],
+            "confidence": result["confidence"]
         }
     except Exception as e:
         print(f"Error in extract-tastes endpoint: {e}")
@@ -214,36 +286,42 @@ Return valid JSON only, no explanations."""
             "success": True,
             "extracted_tastes": mock_extract_tastes(req.get("message", "")),
             "message": req.get("message", ""),
-            "location": req.get("location", "New York, NY")
+            "location": req.get("location", "New York, NY"),
+            "tier": "fallback",
+            "confidence": 0.0
         }
-def mock_extract_tastes(message):
-    lower_message = message.lower()
-    extracted_tastes = []
-    taste_keywords = {
-        'jazz': {"id": "jazz_music", "name": "Jazz Music", "color": "#8E44AD"},
-        'coffee': {"id": "specialty_coffee", "name": "Specialty Coffee", "color": "#A0522D"},
-        'art': {"id": "contemporary_art", "name": "Contemporary Art", "color": "#2E8B57"},
-        'gallery': {"id": "art_galleries", "name": "Art Galleries", "color": "#4682B4"},
-        'food': {"id": "gourmet_food", "name": "Gourmet Food", "color": "#CD853F"},
-        'restaurant': {"id": "fine_dining", "name": "Fine Dining", "color": "#B22222"},
-        'music': {"id": "live_music", "name": "Live Music", "color": "#FF6347"},
-        'vintage': {"id": "vintage_shops", "name": "Vintage Shopping", "color": "#DAA520"},
-        'books': {"id": "bookstores", "name": "Independent Bookstores", "color": "#483D8B"},
-        'craft': {"id": "craft_beer", "name": "Craft Beer", "color": "#D2691E"},
-        'outdoor': {"id": "outdoor_activities", "name": "Outdoor Activities", "color": "#228B22"},
-        'theater': {"id": "theater", "name": "Theater & Performance", "color": "#8B008B"},
-        'local': {"id": "local_culture", "name": "Local Culture", "color": "#556B2F"},
-        'hidden': {"id": "hidden_gems", "name": "Hidden Gems", "color": "#708090"},
-        'rooftop': {"id": "rooftop_venues", "name": "Rooftop Venues", "color": "#FF69B4"},
-        'cocktail': {"id": "craft_cocktails", "name": "Craft Cocktails", "color": "#20B2AA"},
-        'museum': {"id": "museums", "name": "Museums", "color": "#9932CC"},
-        'market': {"id": "local_markets", "name": "Local Markets", "color": "#32CD32"},
-        'nightlife': {"id": "nightlife", "name": "Nightlife", "color": "#FF1493"}
-    }
-    for keyword, taste in taste_keywords.items():
-        if keyword in lower_message:
-            extracted_tastes.append(taste)
-    return extracted_tastes
+# Qloo place tags fetched for each taste category in /api/venues, one upstream query per category
+VENUE_TAG_GROUPS = {
+    'food_beverage': ['urn:tag:genre:place:Restaurant', 'urn:tag:category:place:Restaurant'],
+    'arts_culture': ['urn:tag:genre:place:Museum', 'urn:tag:category:place:Art Museum'],
+    'music_entertainment': ['urn:tag:category:place:Event Venue', 'urn:tag:genre:place:Arena'],
+    'shopping_markets': ['urn:tag:category:place:Market', 'urn:tag:category:place:Shopping Mall']
+}
+TASTE_CATEGORY_WORDS = GroupMatcher({
+    'music_entertainment': ['music', 'concert', 'jazz', 'live', 'band', 'artist'],
+    'beverage': ['coffee', 'cafe', 'beer', 'wine', 'cocktail', 'bar', 'brew'],
+    'food': ['restaurant', 'food', 'dining', 'cuisine', 'kitchen'],
+    'arts_culture': ['art', 'gallery', 'museum', 'creative', 'contemporary', 'design'],
+    'shopping_markets': ['shop', 'boutique', 'vintage', 'fashion', 'market']
+})
+SKIP_VENUE_NAMES = KeywordMatcher([
+    'airport', 'international airport', 'medical center', 'hospital', 'urgent care',
+    'gas station', 'auto repair', 'car wash', 'pharmacy chain', 'cvs', 'walgreens',
+    'dentist office', 'veterinary', 'bank branch', 'atm', 'post office'
+])
+CULTURAL_NAME_INDICATORS = KeywordMatcher([
+    'museum', 'gallery', 'market', 'deli', 'restaurant', 'cafe', 'bar', 'lounge',
+    'center', 'house', 'theater', 'studio', 'kitchen', 'bistro', 'tavern',
+    'club', 'palace', 'hall', 'room', 'eataly', 'katz', 'beauty & essex'
+])
+BACKFILL_SKIP_NAMES = KeywordMatcher(['airport', 'medical', 'hospital', 'gas station', 'auto', 'pharmacy'])
+SKIP_RESULT_NAMES = KeywordMatcher([
+    'veterinary', 'hospital', 'medical', 'pharmacy', 'gas station', 'auto', 'car wash',
+    'applebee', 'wendy', 'mcdonald', 'burger king', 'taco bell', 'subway', 'domino',
+    'pizza hut', 'kfc', 'popeyes', 'chipotle', 'panera', 'starbucks chain',
+    'cvs', 'walgreens', 'rite aid', 'walmart', 'target', 'home depot',
+    'harley-davidson', 'ford', 'toyota', 'honda', 'bmw', 'mercedes'
+])
 @app.post('/api/venues')
 async def get_venues(request: dict) -> Any:
     try:
@@ -265,207 +343,76 @@ async def get_venues(request: dict) -> Any:
         print(f"🎭 Using taste URNs for personalized recommendations: {taste_urns}")
         print(f"🏷️ Taste names for matching: {taste_names}")
         print(f"📍 Location: {location}")
-        params = {
-            'filter.type': 'urn:entity:place',
-            'filter.location.query': location,
-            'filter.location.radius': '10000',  
-            'limit': '50'  
-        }
         taste_categories = []
         for taste in tastes:
-            taste_name = taste.get('name', '').lower()
             taste_id = taste.get('id', '')
-            if 'artist:' in taste_id or any(word in taste_name for word in ['music', 'concert', 'jazz', 'live', 'band', 'artist']):
+            hits = TASTE_CATEGORY_WORDS.find_groups(taste.get('name', ''))
+            if 'artist:' in taste_id or 'music_entertainment' in hits:
                 taste_categories.append('music_entertainment')
-            elif 'beverage:' in taste_id or any(word in taste_name for word in ['coffee', 'cafe', 'beer', 'wine', 'cocktail', 'bar', 'brew']):
+            elif 'beverage:' in taste_id or 'beverage' in hits:
                 taste_categories.append('food_beverage')
-            elif 'food:' in taste_id or 'cuisine:' in taste_id or any(word in taste_name for word in ['restaurant', 'food', 'dining', 'cuisine', 'kitchen']):
+            elif 'food:' in taste_id or 'cuisine:' in taste_id or 'food' in hits:
                 taste_categories.append('food_beverage')
-            elif any(word in taste_name for word in ['art', 'gallery', 'museum', 'creative', 'contemporary', 'design']):
+            elif 'arts_culture' in hits:
                 taste_categories.append('arts_culture')
-            elif any(word in taste_name for word in ['shop', 'boutique', 'vintage', 'fashion', 'market']):
+            elif 'shopping_markets' in hits:
                 taste_categories.append('shopping_markets')
             else:
                 taste_categories.append('general_cultural')
-        venue_filters = []
-        if 'food_beverage' in taste_categories:
-            venue_filters.extend(['urn:tag:genre:place:Restaurant', 'urn:tag:category:place:Restaurant'])
-        if 'arts_culture' in taste_categories:
-            venue_filters.extend(['urn:tag:genre:place:Museum', 'urn:tag:category:place:Art Museum'])
-        if 'music_entertainment' in taste_categories:
-            venue_filters.extend(['urn:tag:category:place:Event Venue', 'urn:tag:genre:place:Arena'])
-        if 'shopping_markets' in taste_categories:
-            venue_filters.extend(['urn:tag:category:place:Market', 'urn:tag:category:place:Shopping Mall'])
         params = {
             'filter.type': 'urn:entity:place',
             'filter.location.query': location,
-            'filter.location.radius': '10000',  
-            'limit': '20'  
+            'filter.location.radius': '10000',
+            'limit': str(setting.VENUE_FANOUT_LIMIT)
         }
-        print(f"🔍 Making single optimized API call...")
-        response = await call_qloo('/v2/insights', params)
-        entities = response.get('results', {}).get('entities', [])
+        queries = [params]
+        for category, tag_urns in VENUE_TAG_GROUPS.items():
+            if category in taste_categories:
+                queries.append({**params, 'filter.tags': ','.join(tag_urns)})
+        interest_tags = [urn for urn in taste_urns if urn.startswith('urn:tag:')]
+        interest_entities = [urn for urn in taste_urns if urn.startswith('urn:entity:')]
+        if interest_tags:
+            queries.append({**params, 'signal.interests.tags': ','.join(interest_tags)})
+        if interest_entities:
+            queries.append({**params, 'signal.interests.entities': ','.join(interest_entities)})
+        print(f"🔍 Fanning out {len(queries)} Qloo queries...")
+        responses = await fan_out_qloo('/v2/insights', queries)
+        failures = [r for r in responses if isinstance(r, Exception)]
+        for failure in failures:
+            print(f"⚠️ Venue candidate query failed: {failure}")
+        if len(failures) == len(responses):
+            raise failures[0]
+        entities = EntityStore.merged(EntityStore.from_response(r) for r in responses if not isinstance(r, Exception)).records
         print(f"🏢 Processing {len(entities)} diverse entities from Qloo")
         cultural_entities = []
-        for entity in entities:
-            name = entity.get('name', '').lower()
-            tags = entity.get('tags', [])
-            skip_keywords = [
-                'airport', 'international airport', 'medical center', 'hospital', 'urgent care',
-                'gas station', 'auto repair', 'car wash', 'pharmacy chain', 'cvs', 'walgreens',
-                'dentist office', 'veterinary', 'bank branch', 'atm', 'post office'
-            ]
-            if any(skip in name for skip in skip_keywords):
+        bitsets = TagBitsets(entities)
+        tagged_cultural = bitsets.any(CULTURAL_TAGS)
+        for entity, has_cultural_tag in zip(entities, tagged_cultural):
+            if SKIP_VENUE_NAMES.any(entity.name):
                 continue
-            is_cultural = False
-            cultural_tag_types = {
-                'urn:tag:category:place': ['restaurant', 'museum', 'art museum', 'market', 'cafe', 'deli', 'event venue'],
-                'urn:tag:genre:place': ['restaurant', 'museum', 'art museum', 'market', 'deli', 'arena'],
-                'urn:tag:amenity:place': ['restaurant', 'bar', 'cafe'],
-                'urn:tag:offerings:place': ['comfort food', 'happy hour', 'live music']
-            }
-            for tag in tags:
-                tag_name = tag.get('name', '').lower()
-                tag_type = tag.get('type', '')
-                if tag_type in cultural_tag_types:
-                    if any(cultural_word in tag_name for cultural_word in cultural_tag_types[tag_type]):
-                        is_cultural = True
-                        break
-            cultural_name_indicators = [
-                'museum', 'gallery', 'market', 'deli', 'restaurant', 'cafe', 'bar', 'lounge',
-                'center', 'house', 'theater', 'studio', 'kitchen', 'bistro', 'tavern',
-                'club', 'palace', 'hall', 'room', 'eataly', 'katz', 'beauty & essex'
-            ]
-            if any(indicator in name for indicator in cultural_name_indicators):
-                is_cultural = True
-            if any(tag.get('name', '').lower() in ['tourist attraction', 'historical landmark', 'monument'] 
-                   for tag in tags):
-                is_cultural = True
-            if is_cultural:
+            if has_cultural_tag or CULTURAL_NAME_INDICATORS.any(entity.name):
                 cultural_entities.append(entity)
         print(f"🎭 Found {len(cultural_entities)} cultural venues after filtering")
         if len(cultural_entities) < 8:
             for entity in entities:
                 if entity not in cultural_entities:
-                    name = entity.get('name', '').lower()
-                    if not any(skip in name for skip in ['airport', 'medical', 'hospital', 'gas station', 'auto', 'pharmacy']):
+                    if not BACKFILL_SKIP_NAMES.any(entity.name):
                         cultural_entities.append(entity)
                         if len(cultural_entities) >= 12:
                             break
-        def calculate_taste_match_score(entity, user_tastes):
-            """Calculate how well a venue matches user's taste profile"""
-            score = 0.5  
-            venue_name = entity.get('name', '').lower()
-            venue_tags = entity.get('tags', [])
-            venue_keywords = entity.get('properties', {}).get('keywords', [])
-            for taste in user_tastes:
-                taste_name = taste.get('name', '').lower()
-                taste_id = taste.get('id', '')
-                if any(word in venue_name for word in taste_name.split() if len(word) > 3):
-                    score += 0.2
-                if 'artist:' in taste_id:
-                    music_indicators = ['music', 'concert', 'venue', 'club', 'bar', 'lounge']
-                    if any(indicator in venue_name or 
-                          any(indicator in tag.get('name', '').lower() for tag in venue_tags)
-                          for indicator in music_indicators):
-                        score += 0.15
-                elif 'beverage:' in taste_id:
-                    beverage_indicators = ['bar', 'cafe', 'coffee', 'brewery', 'wine', 'cocktail']
-                    if any(indicator in venue_name or
-                          any(indicator in tag.get('name', '').lower() for tag in venue_tags)
-                          for indicator in beverage_indicators):
-                        score += 0.15
-                elif 'food:' in taste_id or 'cuisine:' in taste_id:
-                    food_indicators = ['restaurant', 'kitchen', 'dining', 'food', 'eatery', 'bistro']
-                    if any(indicator in venue_name or
-                          any(indicator in tag.get('name', '').lower() for tag in venue_tags)
-                          for indicator in food_indicators):
-                        score += 0.15
-                for tag in venue_tags:
-                    tag_name = tag.get('name', '').lower()
-                    if any(word in tag_name for word in taste_name.split() if len(word) > 3):
-                        score += 0.1
-                for keyword in venue_keywords[:5]:
-                    keyword_name = keyword.get('name', '').lower()
-                    if any(word in keyword_name for word in taste_name.split() if len(word) > 3):
-                        score += 0.05
-            return min(score, 0.95)  
-        scored_entities = []
-        for entity in cultural_entities:
-            taste_score = calculate_taste_match_score(entity, tastes)
-            entity['taste_match_score'] = taste_score
-            scored_entities.append(entity)
-        scored_entities.sort(key=lambda e: e.get('taste_match_score', 0.5), reverse=True)
+        scorer = VenueScorer(cultural_entities, tastes, bitsets)
+        scored_entities = sorted(cultural_entities, key=scorer.score_of, reverse=True)
         top_matched_entities = scored_entities[:15]
-        print(f"🎯 Top venue taste scores: {[(e.get('name', '')[:20], round(e.get('taste_match_score', 0.5), 2)) for e in top_matched_entities[:5]]}")
+        print(f"🎯 Top venue taste scores: {[(e.name[:20], round(scorer.score_of(e), 2)) for e in top_matched_entities[:5]]}")
         all_venues = []
         for i, entity in enumerate(top_matched_entities):
-            venue_name = entity.get('name', f'Local Venue {i+1}')
-            venue_type = 'Cultural Venue'
-            skip_keywords = [
-                'veterinary', 'hospital', 'medical', 'pharmacy', 'gas station', 'auto', 'car wash',
-                'applebee', 'wendy', 'mcdonald', 'burger king', 'taco bell', 'subway', 'domino',
-                'pizza hut', 'kfc', 'popeyes', 'chipotle', 'panera', 'starbucks chain',
-                'cvs', 'walgreens', 'rite aid', 'walmart', 'target', 'home depot',
-                'harley-davidson', 'ford', 'toyota', 'honda', 'bmw', 'mercedes'
-            ]
-            if any(skip in venue_name.lower() for skip in skip_keywords):
+            venue_name = entity.name or f'Local Venue {i+1}'
+            if SKIP_RESULT_NAMES.any(venue_name):
                 continue
-            venue_type = 'Cultural Venue'  
-            tags = entity.get('tags', [])
-            venue_type_hierarchy = [
-                (['urn:tag:category:place:American Restaurant', 'urn:tag:category:place:Italian Restaurant', 
-                  'urn:tag:category:place:Jewish Restaurant'], 'Restaurant'),
-                (['urn:tag:category:place:Deli', 'urn:tag:genre:place:Deli'], 'Deli'),
-                (['urn:tag:category:place:Cafe', 'urn:tag:amenity:place:Cafe'], 'Cafe'),
-                (['urn:tag:genre:place:Restaurant'], 'Restaurant'),
-                (['urn:tag:amenity:place:Bar', 'urn:tag:amenity:place:Bar / Lounge'], 'Bar'),
-                (['urn:tag:category:place:Art Museum', 'urn:tag:genre:place:Art Museum'], 'Art Museum'),
-                (['urn:tag:category:place:Modern Art Museum', 'urn:tag:genre:place:Modern Art Museum'], 'Modern Art Museum'),
-                (['urn:tag:category:place:Museum', 'urn:tag:genre:place:Museum'], 'Museum'),
-                (['urn:tag:category:place:Market', 'urn:tag:genre:place:Market'], 'Market'),
-                (['urn:tag:category:place:Shopping Mall'], 'Shopping Mall'),
-                (['urn:tag:category:place:Event Venue', 'urn:tag:genre:place:Event Venue'], 'Event Venue'),
-                (['urn:tag:category:place:Arena', 'urn:tag:genre:place:Arena'], 'Arena'),
-                (['urn:tag:genre:place:Stadium'], 'Stadium'),
-                (['urn:tag:genre:place:Tourist Attraction'], 'Tourist Attraction'),
-                (['urn:tag:category:place:Tourist Attraction'], 'Tourist Attraction'),
-                (['urn:tag:category:place:Historical Landmark'], 'Historical Landmark'),
-                (['urn:tag:category:place:Park', 'urn:tag:genre:place:Park'], 'Park'),
-                (['urn:tag:category:place:Garden'], 'Garden')
-            ]
-            for tag_patterns, type_name in venue_type_hierarchy:
-                for tag in tags:
-                    tag_type_name = f"{tag.get('type', '')}:{tag.get('name', '')}"
-                    if tag_type_name in tag_patterns:
-                        venue_type = type_name
-                        break
-                if venue_type != 'Cultural Venue':
-                    break
-            if venue_type == 'Cultural Venue':
-                name_lower = venue_name.lower()
-                if 'deli' in name_lower or 'delicatessen' in name_lower:
-                    venue_type = 'Deli'
-                elif any(word in name_lower for word in ['museum', 'guggenheim', 'whitney']):
-                    venue_type = 'Museum'
-                elif 'market' in name_lower:
-                    venue_type = 'Market'
-                elif any(word in name_lower for word in ['restaurant', 'kitchen', 'house']) and 'museum' not in name_lower:
-                    venue_type = 'Restaurant'
-                elif any(word in name_lower for word in ['cafe', 'coffee']):
-                    venue_type = 'Cafe'
-                elif any(word in name_lower for word in ['bar', 'tavern', 'lounge']):
-                    venue_type = 'Bar'
-                elif any(word in name_lower for word in ['center', 'arena', 'garden']) and 'medical' not in name_lower:
-                    if 'garden' in name_lower:
-                        venue_type = 'Garden'
-                    else:
-                        venue_type = 'Event Venue'
-                elif 'park' in name_lower:
-                    venue_type = 'Park'
-            base_affinity = float(entity.get('query', {}).get('affinity', 0.7))
-            popularity = float(entity.get('popularity', 0.5))
-            distance = float(entity.get('query', {}).get('distance', 2000))
+            venue_type = venue_classifier.classify(entity, venue_name)
+            base_affinity = 0.7 if entity.affinity is None else entity.affinity
+            popularity = 0.5 if entity.popularity is None else entity.popularity
+            distance = 2000.0 if entity.distance is None else entity.distance
             affinity_score = base_affinity * 100
             if popularity > 0.7:
                 affinity_score += 10  
@@ -475,74 +422,13 @@ async def get_venues(request: dict) -> Any:
             rating = 3.5 + (popularity * 1.3) + (base_affinity * 0.5)
             rating = min(5.0, max(3.0, rating))
             coordinates = [user_coords[0], user_coords[1]]  
-            if 'location' in entity and entity['location']:
-                loc = entity['location']
-                if 'lat' in loc and 'lng' in loc:
-                    try:
-                        lat = float(loc['lat'])
-                        lng = float(loc['lng'])
-                        if -90 <= lat <= 90 and -180 <= lng <= 180:
-                            coordinates = [lat, lng]
-                    except (ValueError, TypeError):
-                        pass  
+            if entity.lat is not None:
+                coordinates = [entity.lat, entity.lng]
             if coordinates == [user_coords[0], user_coords[1]]:
                 offset_lat = (random.random() - 0.5) * 0.02  
                 offset_lng = (random.random() - 0.5) * 0.02
                 coordinates = [user_coords[0] + offset_lat, user_coords[1] + offset_lng]
-            cultural_matches = []
-            venue_tags = entity.get('tags', [])
-            venue_keywords = entity.get('properties', {}).get('keywords', [])
-            venue_name_lower = venue_name.lower()
-            for taste in tastes[:4]:  
-                taste_name = taste.get('name', '').lower()
-                taste_type = taste.get('type', '').lower()
-                if any(word in venue_name_lower for word in taste_name.split() if len(word) > 2):
-                    cultural_matches.append(taste.get('name', ''))
-                    continue
-                tag_match = False
-                for tag in venue_tags:
-                    tag_name = tag.get('name', '').lower()
-                    tag_type = tag.get('type', '').lower()
-                    if any(word in tag_name for word in taste_name.split() if len(word) > 2):
-                        cultural_matches.append(taste.get('name', ''))
-                        tag_match = True
-                        break
-                    if taste_type == 'food_beverage' and tag_type in ['venue_type', 'business_type']:
-                        if any(food_word in tag_name for food_word in ['restaurant', 'cafe', 'coffee', 'bar', 'dining', 'food', 'drink']):
-                            cultural_matches.append(taste.get('name', ''))
-                            tag_match = True
-                            break
-                    if taste_type == 'visual_arts' and tag_type in ['venue_type', 'category']:
-                        if any(art_word in tag_name for art_word in ['gallery', 'museum', 'art', 'studio', 'exhibition', 'creative']):
-                            cultural_matches.append(taste.get('name', ''))
-                            tag_match = True
-                            break
-                if tag_match:
-                    continue
-                for keyword in venue_keywords[:8]:  
-                    keyword_name = keyword.get('name', '').lower()
-                    if any(word in keyword_name or keyword_name in word 
-                          for word in taste_name.split() if len(word) > 3):
-                        cultural_matches.append(taste.get('name', ''))
-                        break
-                venue_type_mappings = {
-                    'contemporary art': ['gallery', 'museum', 'art', 'creative', 'design'],
-                    'specialty coffee': ['coffee', 'cafe', 'espresso', 'roast', 'brew'],
-                    'craft beer': ['brewery', 'beer', 'tap', 'ale', 'lager', 'craft'],
-                    'vintage fashion': ['vintage', 'boutique', 'thrift', 'retro', 'second hand'],
-                    'fine dining': ['restaurant', 'dining', 'cuisine', 'chef', 'gourmet'],
-                    'live music': ['music', 'concert', 'live', 'band', 'venue', 'stage'],
-                    'wine': ['wine', 'vineyard', 'tasting', 'cellar', 'sommelier'],
-                    'street food': ['food truck', 'street', 'casual', 'quick', 'takeout']
-                }
-                if taste_name in venue_type_mappings:
-                    mapping_words = venue_type_mappings[taste_name]
-                    if any(map_word in venue_name_lower or 
-                          any(map_word in tag.get('name', '').lower() for tag in venue_tags) or
-                          any(map_word in kw.get('name', '').lower() for kw in venue_keywords)
-                          for map_word in mapping_words):
-                        cultural_matches.append(taste.get('name', ''))
-            cultural_matches = list(dict.fromkeys(cultural_matches))
+            cultural_matches = scorer.cultural_matches(entity)
             if len(cultural_matches) >= 2:
                 cultural_match_text = f"{cultural_matches[0]} + {cultural_matches[1]}"
                 if len(cultural_matches) > 2:
@@ -580,9 +466,9 @@ async def get_venues(request: dict) -> Any:
                 'address': f"{location} Area",
                 'culturalMatch': cultural_match_text,
                 'qloo_data': {
-                    'entity_id': entity.get('id', ''),
+                    'entity_id': entity.id,
                     'popularity': popularity,
-                    'keywords': [k.get('name', '') for k in venue_keywords[:3]]
+                    'keywords': entity.keyword_names(3)
                 }
             }
             all_venues.append(venue_data)
@@ -710,6 +596,21 @@ async def refine_route(request: dict):
     except Exception as e:
         print(f"❌ Route refinement error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to refine route: {str(e)}")
+@app.get('/api/stats')
+async def stats():
+    """In-process cache and pipeline counters"""
+    return {
+        "qloo_cache": qloo_cache_stats(),
+        "affinity_memo": affinity_memo_stats(),
+        "planner_cache": planner_cache_stats(),
+        "chat_cache": chat_cache.stats(),
+        "venue_classifier": venue_classifier.stats(),
+        "search_index": search_index.stats(),
+        "taste_extractor": taste_extractor.stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "chat_log_sink": chat_log_sink.stats(),
+        "qloo_payload_store": qloo_payload_store.stats()
+    }
 @app.get('/health')
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,97 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+def normalize_query(user_query: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a query, used as the plan cache key"""
+    text = unicodedata.normalize("NFKC", user_query).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+# Words that carry no taste or place of their own, so a query's coverage is measured without them
+FILLER_WORDS = frozenset("""
+a an the and or but of in on at to for from with near around by my me i im we us our you your some any
+this that these those is are be am it its there here what where which who how can could would should will do does
+love loves like likes enjoy enjoys into want wants looking look find show get give recommend suggest please
+really very also just more most good great best nice cool new place places spot spots venue venues club clubs
+thing things stuff kind kinds type types something somewhere anything tonight today weekend night day time fan big
+""".split())
+class KeywordMatcher:
+    """Finds every vocabulary term occurring as a substring of a text in one memoized regex scan"""
+    def __init__(self, terms: Iterable[str], cache_size: int = 8192):
+        self.terms = tuple(dict.fromkeys(t.lower() for t in terms if t))
+        ordered = sorted(self.terms, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(t) for t in ordered) + "))") if ordered else None
+        self._prefixes = {t: frozenset(p for p in self.terms if t.startswith(p)) for t in self.terms}
+        self.find = lru_cache(maxsize=cache_size)(self._find)
+    def _find(self, text: str) -> FrozenSet[str]:
+        if self._pattern is None or not text:
+            return frozenset()
+        hits = set()
+        for match in self._pattern.finditer(text.lower()):
+            hits |= self._prefixes[match.group(1)]
+        return frozenset(hits)
+    def any(self, text: str) -> bool:
+        """True if any term occurs in text, i.e. any(term in text for term in terms)"""
+        return self._pattern is not None and bool(text) and self._pattern.search(text.lower()) is not None
+class GroupMatcher:
+    """Several named vocabularies compiled into one KeywordMatcher; a scan reports which groups hit"""
+    def __init__(self, groups: Dict[str, Iterable[str]], cache_size: int = 8192):
+        self.groups = {name: tuple(t.lower() for t in terms) for name, terms in groups.items()}
+        self.order = tuple(self.groups)
+        self._term_groups: Dict[str, set] = {}
+        for name, terms in self.groups.items():
+            for term in terms:
+                self._term_groups.setdefault(term, set()).add(name)
+        self.keywords = KeywordMatcher(self._term_groups, cache_size=cache_size)
+        self.find_groups = lru_cache(maxsize=cache_size)(self._find_groups)
+    def _find_groups(self, text: str) -> FrozenSet[str]:
+        hits = set()
+        for term in self.keywords.find(text):
+            hits |= self._term_groups[term]
+        return frozenset(hits)
+    def first_group(self, text: str, order: Optional[Sequence[str]] = None) -> Optional[str]:
+        """The first group, in declaration (or the given) order, with a term in text"""
+        hits = self.find_groups(text)
+        if not hits:
+            return None
+        for name in order or self.order:
+            if name in hits:
+                return name
+        return None
+def plural(phrase: str) -> str:
+    """A phrase with its last word in the regular English plural"""
+    if re.search(r"[^aeiou]y$", phrase):
+        return phrase[:-1] + "ies"
+    if re.search(r"(x|z|ch|sh)$", phrase):
+        return phrase + "es"
+    return phrase + "s"
+class PhraseMatcher:
+    """Whole-word phrases and their plurals in normalized text, longest first; a phrase's first value wins"""
+    def __init__(self, phrases: Iterable[Tuple[str, Any]], plurals: bool = True):
+        self.values: Dict[str, Any] = {}
+        for phrase, value in phrases:
+            phrase = normalize_query(phrase)
+            if not phrase:
+                continue
+            self.values.setdefault(phrase, value)
+            if plurals and not phrase.endswith('s'):
+                self.values.setdefault(plural(phrase), value)
+        ordered = sorted(self.values, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in ordered) + r")\b") if ordered else None
+    def scan(self, text: str) -> List[Tuple[str, Any]]:
+        """(phrase, value) for every hit in an already normalized text, left to right"""
+        if self._pattern is None:
+            return []
+        return [(m.group(0), self.values[m.group(0)]) for m in self._pattern.finditer(text)]
+    def __len__(self) -> int:
+        return len(self.values)
+def coverage(text: str, phrases: Iterable[str], ignored: FrozenSet[str] = frozenset()) -> float:
+    """Share of a normalized text's content words (not filler, numbers or ignored words) that the phrases cover"""
+    skip = FILLER_WORDS | ignored
+    content = sum(1 for w in text.split() if w not in skip and not w.isdigit())
+    if not content:
+        return 0.0
+    covered = sum(1 for phrase in phrases for w in phrase.split() if w not in skip and not w.isdigit())
+    return min(covered / content, 1.0)
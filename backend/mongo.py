@@ -2,4 +2,5 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 mongo = AsyncIOMotorClient(os.getenv("MONGO_URI"))
 db = mongo.myOnboardingDB
-logs_col = db['chat_logs']
\ No newline at end of file
+logs_col = db['chat_logs']
+payloads_col = db['qloo_payloads']
\ No newline at end of file
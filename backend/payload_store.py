@@ -0,0 +1,72 @@
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from cache import TTLCache
+CODEC = 'zlib'
+def encode_payload(payload: Any, level: int = 6) -> Tuple[str, bytes, int]:
+    """Canonical JSON of a payload as (sha256 ref, compressed bytes, uncompressed size)"""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, level), len(raw)
+def decode_payload(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+class PayloadStore:
+    """Content-addressed, compressed blob collection for large payloads referenced from log rows"""
+    def __init__(self, collection, field: str = 'qloo_response', known_hashes: int = 4096, level: int = 6):
+        self.collection = collection
+        self.field = field
+        self.ref_field = f"{field}_ref"
+        self.level = level
+        self._known = TTLCache(max_size=known_hashes, ttl=None)
+        self.stored = 0
+        self.deduplicated = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+    async def externalize(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Move each doc's payload into the blob collection and leave only its hash behind"""
+        ops = {}
+        for doc in docs:
+            if self.field not in doc:
+                continue
+            ref, blob, size = encode_payload(doc.pop(self.field), self.level)
+            doc[self.ref_field] = ref
+            if ref in ops or self._known.get(ref):
+                self.deduplicated += 1
+                continue
+            ops[ref] = UpdateOne(
+                {"_id": ref},
+                {"$setOnInsert": {"codec": CODEC, "data": blob, "size": size, "createdAt": datetime.utcnow()}},
+                upsert=True
+            )
+            self.raw_bytes += size
+            self.compressed_bytes += len(blob)
+        if ops:
+            await self.collection.bulk_write(list(ops.values()), ordered=False)
+            for ref in ops:
+                self._known.set(ref, True)
+            self.stored += len(ops)
+        return docs
+    async def load(self, ref: str) -> Any:
+        blob_doc = await self.collection.find_one({"_id": ref})
+        if blob_doc is None:
+            raise KeyError(f"No stored payload for {ref}")
+        if blob_doc.get("codec", CODEC) != CODEC:
+            raise ValueError(f"Unsupported payload codec: {blob_doc.get('codec')}")
+        return decode_payload(blob_doc["data"])
+    async def rehydrate(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of a log row with its referenced payload restored inline"""
+        if self.ref_field not in doc:
+            return doc
+        restored = {k: v for k, v in doc.items() if k != self.ref_field}
+        restored[self.field] = await self.load(doc[self.ref_field])
+        return restored
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "compression_ratio": round(self.raw_bytes / self.compressed_bytes, 2) if self.compressed_bytes else 0.0
+        }
\ No newline at end of file
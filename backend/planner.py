@@ -1,7 +1,16 @@
+import copy
 import json
-from openai import OpenAI
+import os
+import time
+from typing import Optional
+from openai import AsyncOpenAI
+from cache import TTLCache
 from configs import setting
-client = OpenAI(api_key=setting.OPENAI_API_KEY)
+from matcher import normalize_query
+from models import Plan
+from prompt_builder import PromptBuilder
+from rule_planner import RulePlanner, render_mapping_rules, VENUE_TYPE_RULES, TASTE_RULES
+client = AsyncOpenAI(api_key=setting.OPENAI_API_KEY)
 build_qloo_request_tool = {
     "type": "function",
     "function": {
@@ -34,9 +43,12 @@ build_qloo_request_tool = {
         }
     }
 }
-def plan_qloo_call(user_query, context) -> dict:
-    prompt = f"""
-You are the Qloo-Request Builder v3.
+_plan_cache = TTLCache(max_size=setting.PLANNER_CACHE_MAX_ENTRIES, ttl=setting.PLANNER_CACHE_TTL)
+rule_planner = RulePlanner.from_files(min_confidence=setting.PLANNER_RULE_MIN_CONFIDENCE)
+_plan_sources = {"rules": 0, "llm": 0}
+VENUE_RULE_LINES = render_mapping_rules(VENUE_TYPE_RULES)
+TASTE_RULE_LINES = render_mapping_rules(TASTE_RULES)
+PLANNER_INSTRUCTIONS = f"""You are the Qloo-Request Builder v3.
 Return exactly one JSON object with this schema—no prose, no comments:
 {{
   "user": "<verbatim user text>",
@@ -45,7 +57,7 @@ Return exactly one JSON object with this schema—no prose, no comments:
     "params": {{
       "filter.type":  "urn:entity:place",
       "filter.location.query": "<extract exact city from user query>",
-      "filter.location.radius": <int>,          
+      "filter.location.radius": <int>,
       "signal.interests.tags": "<comma-sep URNs for venue types AND cultural interests>",
       "limit": 25
     }}
@@ -56,29 +68,97 @@ Location extraction rules:
 - If no city mentioned, default to "New York, NY"
 signal.interests.tags rules:
 1. ALWAYS include venue type URNs based on business type:
-   - "coffee shop" → urn:tag:venue_type:restaurant,urn:tag:taste:coffee
-   - "gallery" → urn:tag:venue_type:art_gallery
-   - "bar" → urn:tag:venue_type:bar
-   - "pop-up store" → urn:tag:venue_type:retail
-   - "record store" → urn:tag:venue_type:retail
+{VENUE_RULE_LINES}
 2. ADD cultural/taste URNs from user mentions:
-   - "natural wine" → urn:tag:taste:natural_wine
-   - "craft beer" → urn:tag:taste:craft_beer
-   - "matcha" → urn:tag:taste:tea,urn:tag:cuisine:japanese
-   - "vinyls" → urn:tag:interest:music,urn:tag:interest:vinyl
-   - "Japanese" → urn:tag:cuisine:japanese
-   - "city-pop" → urn:tag:genre:pop,urn:tag:interest:music
-   - "art" → urn:tag:interest:art
+{TASTE_RULE_LINES}
 3. Combine venue type + cultural interests in signal.interests.tags
 4. Be specific - extract ALL relevant cultural elements from the query
-User query: {user_query}
+5. Prefer tag URNs from the retrieved context when they match the query more closely
 """
-    resp = client.chat.completions.create(
+planner_prompt = PromptBuilder("Planner", PLANNER_INSTRUCTIONS, setting.GPT_MODEL, setting.PLANNER_CONTEXT_TOKEN_BUDGET)
+def rule_plan(user_query) -> Optional[dict]:
+    """The rule planner's validated plan, or None when it isn't confident enough to skip the LLM"""
+    args, confidence = rule_planner.plan(user_query)
+    if args is None or confidence < rule_planner.min_confidence:
+        return None
+    _plan_sources["rules"] += 1
+    return Plan(**args).model_dump()
+async def plan_qloo_call(user_query, context) -> dict:
+    """Plan from the plan cache, else the confident rule planner, else the LLM; `context` may be a coroutine function"""
+    key = normalize_query(user_query)
+    cached = _plan_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    plan = rule_plan(user_query)
+    if plan is not None:
+        return plan
+    if callable(context):
+        context = await context()
+    args = await _plan_with_llm(user_query, context)
+    _plan_sources["llm"] += 1
+    plan = Plan(**args).model_dump()
+    _plan_cache.set(key, plan)
+    return copy.deepcopy(plan)
+def planner_cache_stats() -> dict:
+    return {**_plan_cache.stats(), "rule_plans": _plan_sources["rules"], "llm_plans": _plan_sources["llm"],
+            "prompt": planner_prompt.stats()}
+def load_plan_cache(path=None) -> int:
+    """Restore plans saved by save_plan_cache, skipping any that expired while the server was down"""
+    path = path or setting.PLANNER_CACHE_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'r') as f:
+            entries = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not load planner cache from {path}: {e}")
+        return 0
+    if not isinstance(entries, list):
+        print(f"⚠️ Could not load planner cache from {path}: expected a list of entries")
+        return 0
+    now = time.time()
+    loaded = skipped = 0
+    for entry in entries:
+        try:
+            remaining = float(entry["expires_at"]) - now
+            query = entry["query"]
+            plan = Plan(**entry["plan"]).model_dump()
+        except (TypeError, KeyError, ValueError):
+            skipped += 1
+            continue
+        if not isinstance(query, str):
+            skipped += 1
+            continue
+        if remaining > 0:
+            _plan_cache.set(query, plan, ttl=remaining)
+            loaded += 1
+    if skipped:
+        print(f"⚠️ Skipped {skipped} malformed planner cache entries in {path}")
+    return loaded
+def save_plan_cache(path=None) -> int:
+    path = path or setting.PLANNER_CACHE_PATH
+    if not path:
+        return 0
+    now = time.time()
+    entries = [
+        {"query": key, "plan": plan, "expires_at": now + remaining}
+        for key, plan, remaining in _plan_cache.items()
+    ]
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not save planner cache to {path}: {e}")
+        return 0
+    return len(entries)
+async def _plan_with_llm(user_query, context) -> dict:
+    snippets = [{"text": context}] if isinstance(context, str) else context or []
+    resp = await client.chat.completions.create(
         model=setting.GPT_MODEL,
-        messages=[
-            {'role': 'user', 'content': prompt},
-        ],
-        tools=[build_qloo_request_tool], 
+        messages=planner_prompt.build(user_query, snippets),
+        tools=[build_qloo_request_tool],
         tool_choice={"type": "function", "function": {"name": "build_qloo_request"}}
     )
     tool_call = None
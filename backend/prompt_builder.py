@@ -0,0 +1,68 @@
+import math
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Union
+SNIPPET_SEPARATOR = "\n---\n"
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        print(f"⚠️ tiktoken is not installed, {model} prompt token budgets are approximate (4 characters per token)")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+def count_tokens(text: str, model: str) -> int:
+    """Tokens in text under the model's tokenizer, or roughly four characters per token without tiktoken"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text))
+class PromptBuilder:
+    """Chat messages for one LLM task: a fixed, cacheable system prefix, then best-first snippets within budget"""
+    def __init__(self, name: str, instructions: str, model: str, context_budget: int = 600):
+        self.name = name
+        self.instructions = instructions
+        self.model = model
+        self.context_budget = context_budget
+        self.prefix_tokens = count_tokens(instructions, model)
+        self.calls = 0
+        self.dynamic_tokens = 0
+        self.snippets_sent = 0
+        self.snippets_dropped = 0
+    def select(self, snippets: Iterable[Union[Dict[str, Any], str]]) -> List[str]:
+        """Texts of the leading ranked snippets that fit in the context budget"""
+        chosen, used = [], 0
+        for snippet in snippets:
+            text = snippet["text"] if isinstance(snippet, dict) else str(snippet)
+            cost = count_tokens(text + SNIPPET_SEPARATOR, self.model)
+            if used + cost > self.context_budget:
+                break
+            chosen.append(text)
+            used += cost
+        return chosen
+    def build(self, user_text: str, snippets: Iterable[Union[Dict[str, Any], str]] = ()) -> List[Dict[str, str]]:
+        snippets = [s for s in snippets if s]
+        chosen = self.select(snippets)
+        parts = ["Retrieved context:\n" + SNIPPET_SEPARATOR.join(chosen)] if chosen else []
+        parts.append(f"User query: {user_text}")
+        content = "\n\n".join(parts)
+        dynamic = count_tokens(content, self.model)
+        self.calls += 1
+        self.dynamic_tokens += dynamic
+        self.snippets_sent += len(chosen)
+        self.snippets_dropped += len(snippets) - len(chosen)
+        print(f"🧮 {self.name} prompt: {self.prefix_tokens} static + {dynamic} dynamic tokens, "
+              f"{len(chosen)}/{len(snippets)} snippets")
+        return [{"role": "system", "content": self.instructions}, {"role": "user", "content": content}]
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prefix_tokens": self.prefix_tokens,
+            "avg_dynamic_tokens": round(self.dynamic_tokens / self.calls, 1) if self.calls else 0.0,
+            "context_budget": self.context_budget,
+            "snippets_sent": self.snippets_sent,
+            "snippets_dropped": self.snippets_dropped,
+            "tokenizer": "tiktoken" if _encoding(self.model) is not None else "chars/4"
+        }
@@ -1,150 +1,455 @@
+import asyncio
+import heapq
+import json
+import weakref
 import httpx
+from cache import TTLCache, STALE
+from matcher import GroupMatcher
+from hashing import stable_bucket
 from configs import setting
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple, Callable, Awaitable, Union
 import random
-def calculate_realistic_affinity(entity: Dict[str, Any], base_affinity: float) -> float:
-    """Calculate a more realistic affinity score based on entity characteristics"""
-    raw_affinity = float(entity.get("query", {}).get("affinity", 0))
-    popularity = float(entity.get("popularity", 0))
+AFFINITY_MEMO_SIZE = 20000
+_affinity_memo = TTLCache(max_size=AFFINITY_MEMO_SIZE, ttl=None)
+def calculate_realistic_affinity(entity: "EntityRecord", base_affinity: float = 0.0) -> float:
+    """Calculate a more realistic affinity score based on entity characteristics.
+    Scores are deterministic across workers and restarts and memoized by entity id and inputs."""
+    keyword_count = len(entity.keyword_ids)
+    key = (entity.id, entity.name, entity.affinity, entity.popularity, entity.distance, keyword_count)
+    score = _affinity_memo.get(key)
+    if score is not None:
+        return score
+    raw_affinity = entity.affinity or 0.0
+    popularity = entity.popularity or 0.0
     popularity_factor = (popularity - 0.5) * 0.2  
-    distance = float(entity.get("query", {}).get("distance", 5000))
+    distance = 5000.0 if entity.distance is None else entity.distance
     distance_factor = (1 - (distance / 6000)) * 0.15 - 0.075  
-    keywords = entity.get("properties", {}).get("keywords", [])
-    keyword_count = len(keywords)
     keyword_factor = (keyword_count - 3) * 0.02  
-    entity_hash = hash(entity.get("name", "")) % 100
-    variance = (entity_hash / 100 - 0.5) * 0.3  
+    variance = (stable_bucket(entity.name) / 100 - 0.5) * 0.3  
     final_affinity = raw_affinity + popularity_factor + distance_factor + keyword_factor + variance
     final_affinity = max(0.5, min(0.9, final_affinity))
-    return round(final_affinity * 100, 1)
+    score = round(final_affinity * 100, 1)
+    _affinity_memo.set(key, score)
+    return score
 BASE = 'https://hackathon.api.qloo.com'
 API_KEY = setting.QLOO_API_KEY
-async def call_qloo(endpoint, params):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.get(
-            f"{BASE}{endpoint}",
-            headers={"x-api-key": setting.QLOO_API_KEY},
-            params=params
-        )
+_client: Optional[httpx.AsyncClient] = None
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+def create_qloo_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Build the pooled keep-alive client used for every Qloo request"""
+    http2 = setting.QLOO_HTTP2 and transport is None
+    if http2 and not _http2_available():
+        print("⚠️ QLOO_HTTP2 is set but the 'h2' package is not installed, using HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=setting.QLOO_MAX_CONNECTIONS,
+        max_keepalive_connections=setting.QLOO_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=setting.QLOO_KEEPALIVE_EXPIRY
+    )
+    return httpx.AsyncClient(
+        base_url=BASE,
+        headers={"x-api-key": setting.QLOO_API_KEY or ""},
+        timeout=httpx.Timeout(setting.QLOO_TIMEOUT, connect=setting.QLOO_CONNECT_TIMEOUT),
+        limits=limits,
+        http2=http2,
+        transport=transport
+    )
+async def start_qloo_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Open the shared Qloo client, called from the FastAPI lifespan"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_qloo_client(transport)
+    return _client
+async def close_qloo_client() -> None:
+    """Close the shared Qloo client and release its pooled connections"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+def get_qloo_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily for scripts that run outside the app"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_qloo_client()
+    return _client
+_response_cache = TTLCache(
+    max_size=setting.QLOO_CACHE_MAX_ENTRIES,
+    ttl=setting.QLOO_CACHE_TTL,
+    stale_ttl=setting.QLOO_CACHE_STALE_TTL
+)
+_revalidating: Dict[Tuple, asyncio.Task] = {}
+def _canonical_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical_value(v) for v in value)
+    return str(value).strip()
+def canonical_params(params: Optional[Dict[str, Any]]) -> Tuple:
+    """Order-independent, type-normalized view of query params, so 20 and '20' share a cache entry"""
+    return tuple(sorted(
+        (str(key), _canonical_value(value))
+        for key, value in (params or {}).items()
+        if value is not None
+    ))
+def qloo_cache_key(endpoint: str, params: Optional[Dict[str, Any]]) -> Tuple:
+    return (endpoint, canonical_params(params))
+def cache_ttl_for(endpoint: str) -> float:
+    return setting.QLOO_CACHE_TTLS.get(endpoint, setting.QLOO_CACHE_TTL)
+_response_listeners: List[Callable[[str, bytes], None]] = []
+def add_response_listener(listener: Callable[[str, bytes], None]) -> None:
+    """Register a callback that sees the body of every successful upstream Qloo response"""
+    if listener not in _response_listeners:
+        _response_listeners.append(listener)
+def remove_response_listener(listener: Callable[[str, bytes], None]) -> None:
+    if listener in _response_listeners:
+        _response_listeners.remove(listener)
+async def _fetch_qloo(endpoint, params) -> bytes:
+    resp = await get_qloo_client().get(endpoint, params=params)
     resp.raise_for_status()
-    return resp.json()
-def top_clusters(api_json: Dict[str, Any], k: int = 3) -> List[Dict[str, Any]]:
+    for listener in _response_listeners:
+        try:
+            listener(endpoint, resp.content)
+        except Exception as e:
+            print(f"⚠️ Qloo response listener failed: {e}")
+    return resp.content
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+_inflight: Dict[Tuple, _Flight] = {}
+_flight_stats = {"upstream_calls": 0, "coalesced": 0}
+def _finish_flight(key: Tuple, flight: _Flight, task: asyncio.Task) -> None:
+    if _inflight.get(key) is flight:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()
+async def _singleflight(key: Tuple, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+    """Await one shared upstream call per key, cancelled only once every waiter has gone away"""
+    flight = _inflight.get(key)
+    if flight is None or flight.abandoned:
+        flight = _Flight(asyncio.create_task(factory()))
+        flight.task.add_done_callback(lambda task, key=key, flight=flight: _finish_flight(key, flight, task))
+        _inflight[key] = flight
+        _flight_stats["upstream_calls"] += 1
+    else:
+        _flight_stats["coalesced"] += 1
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.abandoned = True
+            flight.task.cancel()
+async def _load(key: Tuple, endpoint, params) -> bytes:
+    body = await _fetch_qloo(endpoint, params)
+    _response_cache.set(key, body, ttl=cache_ttl_for(endpoint))
+    return body
+async def _revalidate(key: Tuple, endpoint, params) -> None:
+    try:
+        await _singleflight(key, lambda: _load(key, endpoint, params))
+    except Exception as e:
+        print(f"⚠️ Background refresh of {endpoint} failed, keeping stale entry: {e}")
+    finally:
+        _revalidating.pop(key, None)
+def _schedule_revalidate(key: Tuple, endpoint, params) -> None:
+    if key not in _revalidating:
+        _revalidating[key] = asyncio.create_task(_revalidate(key, endpoint, params))
+async def call_qloo(endpoint, params, use_cache: bool = True):
+    """GET a Qloo endpoint through the response cache; every caller gets a freshly decoded payload"""
+    key = qloo_cache_key(endpoint, params)
+    if not use_cache or cache_ttl_for(endpoint) <= 0:
+        return json.loads(await _singleflight(("uncached",) + key, lambda: _fetch_qloo(endpoint, params)))
+    state, body = _response_cache.lookup(key)
+    if state is not None:
+        if state == STALE:
+            _schedule_revalidate(key, endpoint, params)
+        return json.loads(body)
+    body = await _singleflight(key, lambda: _load(key, endpoint, params))
+    return json.loads(body)
+async def fan_out_qloo(endpoint, param_sets: Sequence[Dict[str, Any]],
+                       concurrency: int = setting.VENUE_FANOUT_CONCURRENCY) -> List[Any]:
+    """Run several queries against one endpoint concurrently, at most `concurrency` upstream at a time.
+    Returns each response, or the exception its call raised, in the order of param_sets."""
+    semaphore = asyncio.Semaphore(concurrency)
+    async def fetch(params):
+        async with semaphore:
+            return await call_qloo(endpoint, params)
+    return await asyncio.gather(*(fetch(params) for params in param_sets), return_exceptions=True)
+def qloo_cache_stats() -> Dict[str, Any]:
+    return {
+        **_response_cache.stats(),
+        "revalidating": len(_revalidating),
+        "inflight": len(_inflight),
+        **_flight_stats
+    }
+def clear_qloo_cache() -> None:
+    _response_cache.clear()
+def affinity_memo_stats() -> Dict[str, Any]:
+    return _affinity_memo.stats()
+class Vocabulary:
+    """Interns strings to dense integer ids, keeping each string's lowercase form in a parallel column.
+    With a max_size, compact() drops strings no live record uses; `generation` counts renumberings."""
+    __slots__ = ('ids', 'strings', 'lowered', 'max_size', 'limit', 'generation')
+    def __init__(self, max_size: int = 0):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+        self.lowered: List[str] = []
+        self.max_size = max_size
+        self.limit = max_size
+        self.generation = 0
+    def intern(self, text: str) -> int:
+        i = self.ids.get(text)
+        if i is None:
+            i = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+            self.lowered.append(text.lower())
+        return i
+    def _columns(self) -> Tuple[List[str], ...]:
+        return self.strings, self.lowered
+    def over_limit(self) -> bool:
+        return 0 < self.limit < len(self.strings)
+    def compact(self, used: Iterable[int]) -> Dict[int, int]:
+        """Keep only the used ids, renumbered densely in their old order; returns old id -> new id"""
+        keep = sorted(set(used))
+        for column in self._columns():
+            column[:] = [column[i] for i in keep]
+        self.ids = {text: i for i, text in enumerate(self.strings)}
+        self.limit = max(self.max_size, 2 * len(keep))
+        self.generation += 1
+        return {old: new for new, old in enumerate(keep)}
+    def __len__(self) -> int:
+        return len(self.strings)
+class TagVocabulary(Vocabulary):
+    """Interned "type:name" tag keys with name and type columns; `lowered` holds the lowercase tag name"""
+    __slots__ = ('names', 'types')
+    def __init__(self, max_size: int = 0):
+        super().__init__(max_size)
+        self.names: List[str] = []
+        self.types: List[str] = []
+    def intern_tag(self, tag_type: str, name: str) -> int:
+        key = f"{tag_type}:{name}"
+        i = self.ids.get(key)
+        if i is None:
+            i = self.intern(key)
+            self.lowered[i] = name.lower()
+            self.names.append(name)
+            self.types.append(tag_type)
+        return i
+    def _columns(self) -> Tuple[List[str], ...]:
+        return self.strings, self.lowered, self.names, self.types
+TAG_VOCAB = TagVocabulary(setting.VOCAB_MAX_ENTRIES)
+KEYWORD_VOCAB = Vocabulary(setting.VOCAB_MAX_ENTRIES)
+_live_records: "weakref.WeakSet[EntityRecord]" = weakref.WeakSet()
+def compact_vocabularies() -> None:
+    """Drop the tags and keywords no live EntityRecord refers to, renumbering the live records in place"""
+    records = list(_live_records)
+    tag_ids = TAG_VOCAB.compact(t for record in records for t in record.tag_ids)
+    keyword_ids = KEYWORD_VOCAB.compact(k for record in records for k in record.keyword_ids)
+    for record in records:
+        record.tag_ids = tuple(tag_ids[t] for t in record.tag_ids)
+        record.keyword_ids = tuple(keyword_ids[k] for k in record.keyword_ids)
+def _coordinate(location: Any, field: str, low: float, high: float) -> Optional[float]:
+    try:
+        value = float(location[field])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return value if low <= value <= high else None
+class EntityRecord:
+    """One Qloo entity flattened once: scalar columns (None when omitted) plus interned tag and keyword ids"""
+    __slots__ = ('id', 'name', 'name_lower', 'subtype', 'popularity', 'affinity', 'distance', 'lat', 'lng',
+                 'tag_ids', 'keyword_ids', 'description', 'raw', '__weakref__')
+    def __init__(self, entity: Dict[str, Any]):
+        query = entity.get('query') or {}
+        properties = entity.get('properties') or {}
+        location = entity.get('location') or {}
+        self.id = entity.get('id', '')
+        self.name = entity.get('name', '')
+        self.name_lower = self.name.lower()
+        self.subtype = entity.get('subtype', 'place')
+        self.popularity = float(entity['popularity']) if 'popularity' in entity else None
+        self.affinity = float(query['affinity']) if 'affinity' in query else None
+        self.distance = float(query['distance']) if 'distance' in query else None
+        self.lat = _coordinate(location, 'lat', -90, 90)
+        self.lng = _coordinate(location, 'lng', -180, 180)
+        if self.lat is None or self.lng is None:
+            self.lat = self.lng = None
+        self.tag_ids = tuple(TAG_VOCAB.intern_tag(t.get('type', ''), t.get('name', '')) for t in entity.get('tags', []))
+        self.keyword_ids = tuple(KEYWORD_VOCAB.intern(k.get('name', '')) for k in properties.get('keywords', []))
+        self.description = properties.get('description', '')
+        self.raw = entity
+        _live_records.add(self)
+        if TAG_VOCAB.over_limit() or KEYWORD_VOCAB.over_limit():
+            compact_vocabularies()
+    def tag_names(self) -> List[str]:
+        return [TAG_VOCAB.names[t] for t in self.tag_ids]
+    def keyword_names(self, limit: Optional[int] = None) -> List[str]:
+        return [KEYWORD_VOCAB.strings[k] for k in self.keyword_ids[:limit]]
+class EntityStore:
+    """The entities of one Qloo response, flattened into EntityRecords once per response"""
+    __slots__ = ('records',)
+    def __init__(self, entities: List[Dict[str, Any]]):
+        self.records = [EntityRecord(e) for e in entities]
+    @classmethod
+    def from_response(cls, api_json: Dict[str, Any]) -> "EntityStore":
+        return cls(api_json.get('results', {}).get('entities', []))
+    @classmethod
+    def merged(cls, stores: Iterable["EntityStore"]) -> "EntityStore":
+        """One store holding each entity of several responses once, by id, in first-seen order"""
+        merged, seen = cls([]), set()
+        for store in stores:
+            for record in store.records:
+                if record.id and record.id in seen:
+                    continue
+                seen.add(record.id)
+                merged.records.append(record)
+        return merged
+    def __len__(self) -> int:
+        return len(self.records)
+    def __iter__(self):
+        return iter(self.records)
+def entity_store(api_json: Union[Dict[str, Any], EntityStore]) -> EntityStore:
+    return api_json if isinstance(api_json, EntityStore) else EntityStore.from_response(api_json)
+CUISINE_TAG_SIGNALS = ("Japanese Culture Enthusiasts", "European Culture Seekers", "Latin Culture Community")
+SCENE_TAG_SIGNALS = (
+    "Vinyl & Music Collectors", "Live Music Scene", "Craft Cocktail Enthusiasts", "Arts & Culture Connoisseurs",
+    "Artisan Craft Community", "Mindful Wellness Community", "Third Wave Coffee Culture"
+)
+TAG_SIGNALS = GroupMatcher({
+    "Japanese Culture Enthusiasts": ["japanese", "asian"],
+    "European Culture Seekers": ["italian", "mediterranean"],
+    "Latin Culture Community": ["mexican", "latin", "caribbean"],
+    "Vinyl & Music Collectors": ["vinyl", "record", "music"],
+    "Live Music Scene": ["live", "concert", "dj", "performance"],
+    "Craft Cocktail Enthusiasts": ["bar", "cocktail", "wine", "beer", "nightlife"],
+    "Arts & Culture Connoisseurs": ["art", "gallery", "museum", "creative", "design"],
+    "Artisan Craft Community": ["craft", "artisan", "maker", "handmade"],
+    "Mindful Wellness Community": ["yoga", "fitness", "health", "organic", "wellness"],
+    "Third Wave Coffee Culture": ["coffee", "cafe"]
+})
+KEYWORD_SIGNALS = GroupMatcher({
+    "Authenticity Seekers": ["authentic", "traditional", "heritage", "original"],
+    "Cultural Trendsetters": ["trendy", "hip", "cool", "modern", "contemporary", "instagram"],
+    "Neighborhood Loyalists": ["local", "neighborhood", "community", "family"],
+    "Premium Experience Seekers": ["premium", "luxury", "upscale", "fine", "exclusive"],
+    "Conscious Culture Advocates": ["sustainable", "eco", "green", "ethical", "conscious"]
+})
+DESCRIPTION_SIGNALS = GroupMatcher({
+    "Intimate Experience Seekers": ["intimate", "cozy", "hideaway", "secret"],
+    "Innovation Pioneers": ["innovative", "unique", "creative", "experimental", "cutting-edge"],
+    "Classic Culture Appreciators": ["classic", "timeless", "established", "renowned"]
+})
+def first_hit(hits, order):
+    for name in order:
+        if name in hits:
+            return name
+    return None
+CULTURAL_PRIORITY = ("Japanese Culture Enthusiasts", "Vinyl & Music Collectors", "Arts & Culture Connoisseurs",
+                     "Third Wave Coffee Culture")
+DEFAULT_CLUSTER = "Local Cultural Enthusiasts"
+CLUSTER_EXAMPLES = 4
+def primary_cluster(entity: EntityRecord) -> str:
+    """The audience cluster an entity's tags, keywords and description point to"""
+    tag_names, tag_types = TAG_VOCAB.names, TAG_VOCAB.types
+    cluster_signals = []
+    for tag_id in entity.tag_ids:
+        tag_hits = TAG_SIGNALS.find_groups(tag_names[tag_id])
+        signal = first_hit(tag_hits, CUISINE_TAG_SIGNALS)
+        if signal is None and "cuisine" in tag_types[tag_id] and not cluster_signals:
+            signal = "Culinary Adventurers"
+        elif signal is None:
+            signal = first_hit(tag_hits, SCENE_TAG_SIGNALS)
+        if signal:
+            cluster_signals.append(signal)
+    for keyword_id in entity.keyword_ids[:5]:
+        signal = KEYWORD_SIGNALS.first_group(KEYWORD_VOCAB.strings[keyword_id])
+        if signal:
+            cluster_signals.append(signal)
+    signal = DESCRIPTION_SIGNALS.first_group(entity.description)
+    if signal:
+        cluster_signals.append(signal)
+    if not cluster_signals:
+        return DEFAULT_CLUSTER
+    return first_hit(cluster_signals, CULTURAL_PRIORITY) or cluster_signals[0]
+class _ClusterState:
+    __slots__ = ('count', 'total_affinity', 'max_affinity', 'min_affinity', 'lift_score', 'audience_size', 'lead',
+                 'examples')
+    def __init__(self):
+        self.count = 0
+        self.total_affinity = 0.0
+        self.max_affinity = 0.0
+        self.min_affinity = 1.0
+        self.lift_score = float('-inf')
+        self.audience_size = 0
+        self.lead = None
+        self.examples: List[Tuple[float, int, EntityRecord, float]] = []
+class ClusterAggregator:
+    """Audience clusters built page by page in bounded memory; snapshot() matches top_clusters so far"""
+    def __init__(self, examples: int = CLUSTER_EXAMPLES):
+        self.examples = examples
+        self.seen = 0
+        self._clusters: Dict[str, _ClusterState] = {}
+    def add(self, entity: EntityRecord) -> None:
+        index = self.seen
+        self.seen += 1
+        affinity = entity.affinity or 0.0
+        cluster_name = primary_cluster(entity)
+        state = self._clusters.get(cluster_name)
+        if state is None:
+            state = self._clusters[cluster_name] = _ClusterState()
+        state.count += 1
+        state.total_affinity += affinity
+        state.max_affinity = max(state.max_affinity, affinity)
+        state.min_affinity = min(state.min_affinity, affinity)
+        enhanced = calculate_realistic_affinity(entity)
+        state.lift_score = max(state.lift_score, enhanced)
+        state.audience_size += int((entity.popularity or 0.0) * (3000 + len(entity.tag_ids) * 1000))
+        rank = (affinity, -index)
+        if state.lead is None or rank > state.lead:
+            state.lead = rank
+        example = (affinity, -index, entity, enhanced)
+        if len(state.examples) < self.examples:
+            heapq.heappush(state.examples, example)
+        elif example[:2] > state.examples[0][:2]:
+            heapq.heapreplace(state.examples, example)
+    def add_page(self, api_json: Union[Dict[str, Any], EntityStore]) -> None:
+        for entity in entity_store(api_json):
+            self.add(entity)
+    def __len__(self) -> int:
+        return self.seen
+    def snapshot(self, k: int = 3) -> List[Dict[str, Any]]:
+        """The current top-k clusters, ranked by lift score"""
+        ranked = sorted(self._clusters.items(), key=lambda item: (-item[1].lift_score, -item[1].lead[0], -item[1].lead[1]))
+        clusters = []
+        for cluster_name, state in ranked[:k]:
+            examples = sorted(state.examples, key=lambda example: example[:2], reverse=True)
+            clusters.append({
+                "cluster_name": cluster_name,
+                "lift_score": state.lift_score,
+                "audience_size": state.audience_size,
+                "example_entities": [
+                    {
+                        "type": e.subtype,
+                        "name": e.name,
+                        "affinity": enhanced,
+                        "keywords": e.keyword_names(3)
+                    }
+                    for _, _, e, enhanced in examples
+                ]
+            })
+        return clusters
+def top_clusters(api_json: Union[Dict[str, Any], EntityStore], k: int = 3) -> List[Dict[str, Any]]:
     """Extract sophisticated cultural clusters from Qloo entities using real cultural intelligence"""
-    entities = api_json.get("results", {}).get("entities", [])
-    if not entities:
-        return []
-    clusters = []
-    entities_by_affinity = sorted(entities, key=lambda e: float(e.get("query", {}).get("affinity", 0)), reverse=True)
-    cultural_clusters = {}
-    for entity in entities_by_affinity:
-        tags = entity.get("tags", [])
-        keywords = entity.get("properties", {}).get("keywords", [])
-        good_for = entity.get("properties", {}).get("good_for", [])
-        description = entity.get("properties", {}).get("description", "")
-        affinity = float(entity.get("query", {}).get("affinity", 0))
-        cluster_signals = []
-        for tag in tags:
-            tag_name = tag.get("name", "").lower()
-            tag_type = tag.get("type", "")
-            if any(cuisine in tag_name for cuisine in ["japanese", "asian"]):
-                cluster_signals.append("Japanese Culture Enthusiasts")
-            elif any(cuisine in tag_name for cuisine in ["italian", "mediterranean"]):
-                cluster_signals.append("European Culture Seekers") 
-            elif any(cuisine in tag_name for cuisine in ["mexican", "latin", "caribbean"]):
-                cluster_signals.append("Latin Culture Community")
-            elif "cuisine" in tag_type and not cluster_signals:
-                cluster_signals.append("Culinary Adventurers")
-            elif any(music in tag_name for music in ["vinyl", "record", "music"]):
-                cluster_signals.append("Vinyl & Music Collectors")
-            elif any(music in tag_name for music in ["live", "concert", "dj", "performance"]):
-                cluster_signals.append("Live Music Scene")
-            elif any(nightlife in tag_name for nightlife in ["bar", "cocktail", "wine", "beer", "nightlife"]):
-                cluster_signals.append("Craft Cocktail Enthusiasts")
-            elif any(art in tag_name for art in ["art", "gallery", "museum", "creative", "design"]):
-                cluster_signals.append("Arts & Culture Connoisseurs")
-            elif any(craft in tag_name for craft in ["craft", "artisan", "maker", "handmade"]):
-                cluster_signals.append("Artisan Craft Community")
-            elif any(wellness in tag_name for wellness in ["yoga", "fitness", "health", "organic", "wellness"]):
-                cluster_signals.append("Mindful Wellness Community")
-            elif "coffee" in tag_name or "cafe" in tag_name:
-                cluster_signals.append("Third Wave Coffee Culture")
-        for keyword in keywords[:5]:  
-            keyword_name = keyword.get("name", "").lower()
-            if any(cultural in keyword_name for cultural in ["authentic", "traditional", "heritage", "original"]):
-                cluster_signals.append("Authenticity Seekers")
-            elif any(trendy in keyword_name for trendy in ["trendy", "hip", "cool", "modern", "contemporary", "instagram"]):
-                cluster_signals.append("Cultural Trendsetters")
-            elif any(local in keyword_name for local in ["local", "neighborhood", "community", "family"]):
-                cluster_signals.append("Neighborhood Loyalists")
-            elif any(luxury in keyword_name for luxury in ["premium", "luxury", "upscale", "fine", "exclusive"]):
-                cluster_signals.append("Premium Experience Seekers")
-            elif any(sustainable in keyword_name for sustainable in ["sustainable", "eco", "green", "ethical", "conscious"]):
-                cluster_signals.append("Conscious Culture Advocates")
-        description_lower = description.lower()
-        if any(word in description_lower for word in ["intimate", "cozy", "hideaway", "secret"]):
-            cluster_signals.append("Intimate Experience Seekers")
-        elif any(word in description_lower for word in ["innovative", "unique", "creative", "experimental", "cutting-edge"]):
-            cluster_signals.append("Innovation Pioneers")
-        elif any(word in description_lower for word in ["classic", "timeless", "established", "renowned"]):
-            cluster_signals.append("Classic Culture Appreciators")
-        if cluster_signals:
-            cultural_priority = ["Japanese Culture Enthusiasts", "Vinyl & Music Collectors", "Arts & Culture Connoisseurs", "Third Wave Coffee Culture"]
-            primary_cluster = None
-            for priority in cultural_priority:
-                if priority in cluster_signals:
-                    primary_cluster = priority
-                    break
-            if not primary_cluster:
-                primary_cluster = cluster_signals[0]
-        else:
-            primary_cluster = "Local Cultural Enthusiasts"
-        if primary_cluster not in cultural_clusters:
-            cultural_clusters[primary_cluster] = {
-                "entities": [],
-                "total_affinity": 0.0,
-                "avg_affinity": 0.0,
-                "max_affinity": 0.0,
-                "min_affinity": 1.0
-            }
-        cultural_clusters[primary_cluster]["entities"].append(entity)
-        cultural_clusters[primary_cluster]["total_affinity"] += affinity
-        cultural_clusters[primary_cluster]["max_affinity"] = max(cultural_clusters[primary_cluster]["max_affinity"], affinity)
-        cultural_clusters[primary_cluster]["min_affinity"] = min(cultural_clusters[primary_cluster]["min_affinity"], affinity)
-        num_entities = len(cultural_clusters[primary_cluster]["entities"])
-        if num_entities > 0:
-            cultural_clusters[primary_cluster]["avg_affinity"] = (
-                cultural_clusters[primary_cluster]["total_affinity"] / num_entities
-            )
-        else:
-            cultural_clusters[primary_cluster]["avg_affinity"] = 0.0
-    for cluster_name, cluster_data in cultural_clusters.items():
-        entities_in_cluster = cluster_data["entities"]
-        avg_affinity = cluster_data["avg_affinity"]
-        max_affinity = cluster_data["max_affinity"]
-        enhanced_affinities = [calculate_realistic_affinity(e, avg_affinity) for e in entities_in_cluster]
-        lift_score = max(enhanced_affinities) if enhanced_affinities else round(max_affinity * 100, 1)
-        audience_size = 0
-        for entity in entities_in_cluster:
-            popularity = float(entity.get("popularity", 0))
-            multiplier = 3000 + (len(entity.get("tags", [])) * 1000)  
-            audience_size += int(popularity * multiplier)
-        cluster = {
-            "cluster_name": cluster_name,
-            "lift_score": lift_score,
-            "audience_size": audience_size,
-            "example_entities": [
-                {
-                    "type": e.get("subtype", "place"), 
-                    "name": e["name"],
-                    "affinity": calculate_realistic_affinity(e, avg_affinity),
-                    "keywords": [k["name"] for k in e.get("properties", {}).get("keywords", [])[:3]]
-                }
-                for e in entities_in_cluster[:4]
-            ]
-        }
-        clusters.append(cluster)
-    clusters.sort(key=lambda d: d["lift_score"], reverse=True)
-    return clusters[:k]
+    aggregator = ClusterAggregator()
+    aggregator.add_page(api_json)
+    return aggregator.snapshot(k)
 def build_qloo_json(extractor_json: Dict[str, Any], api_json: Dict[str, Any]) -> Dict[str, Any]:
     params = extractor_json["qloo_request"]["params"]
     return {
@@ -0,0 +1,121 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from matcher import PhraseMatcher, coverage, normalize_query
+TAGS_PATH = 'data/qloo_tags.json'
+SHOTS_PATH = 'data/few_shots.json'
+ENDPOINT = '/v2/insights'
+DEFAULT_LOCATION = 'New York, NY'
+PLAN_LIMIT = 25
+# The LLM planner prompt's mapping tables; its rules are rendered from these, so both planners agree
+VENUE_TYPE_RULES = {
+    "coffee shop": "urn:tag:venue_type:restaurant,urn:tag:taste:coffee",
+    "gallery": "urn:tag:venue_type:art_gallery",
+    "bar": "urn:tag:venue_type:bar",
+    "pop-up store": "urn:tag:venue_type:retail",
+    "record store": "urn:tag:venue_type:retail"
+}
+TASTE_RULES = {
+    "natural wine": "urn:tag:taste:natural_wine",
+    "craft beer": "urn:tag:taste:craft_beer",
+    "matcha": "urn:tag:taste:tea,urn:tag:cuisine:japanese",
+    "vinyls": "urn:tag:interest:music,urn:tag:interest:vinyl",
+    "Japanese": "urn:tag:cuisine:japanese",
+    "city-pop": "urn:tag:genre:pop,urn:tag:interest:music",
+    "art": "urn:tag:interest:art"
+}
+KNOWN_LOCATIONS = {
+    "new york": "New York, NY", "new york city": "New York, NY", "nyc": "New York, NY", "manhattan": "Manhattan, NY",
+    "brooklyn": "Brooklyn, NY", "queens": "Queens, NY", "bronx": "Bronx, NY", "staten island": "Staten Island, NY",
+    "williamsburg": "Williamsburg, Brooklyn, NY", "greenpoint": "Greenpoint, Brooklyn, NY",
+    "dumbo": "DUMBO, Brooklyn, NY", "park slope": "Park Slope, Brooklyn, NY", "astoria": "Astoria, Queens, NY",
+    "long island city": "Long Island City, Queens, NY", "harlem": "Harlem, New York, NY",
+    "chelsea": "Chelsea, New York, NY", "tribeca": "Tribeca, New York, NY", "east village": "East Village, New York, NY",
+    "west village": "West Village, New York, NY", "lower east side": "Lower East Side, New York, NY",
+    "los angeles": "Los Angeles, CA", "san francisco": "San Francisco, CA", "oakland": "Oakland, CA",
+    "san diego": "San Diego, CA", "seattle": "Seattle, WA", "chicago": "Chicago, IL", "austin": "Austin, TX",
+    "houston": "Houston, TX", "dallas": "Dallas, TX", "denver": "Denver, CO", "boston": "Boston, MA",
+    "philadelphia": "Philadelphia, PA", "washington dc": "Washington, DC", "miami": "Miami, FL",
+    "atlanta": "Atlanta, GA", "nashville": "Nashville, TN", "new orleans": "New Orleans, LA",
+    "detroit": "Detroit, MI", "minneapolis": "Minneapolis, MN", "las vegas": "Las Vegas, NV",
+    "london": "London, UK", "paris": "Paris, France", "berlin": "Berlin, Germany", "tokyo": "Tokyo, Japan"
+}
+# A capitalized phrase after a place preposition, e.g. "in Lisbon", that may name a location we don't know
+_PLACE_MENTION = re.compile(r"\b(?:in|near|around|at)\s+((?:[A-Z][\w'-]*)(?:\s+[A-Z][\w'-]*)*)")
+def _slug_phrase(urn: str) -> str:
+    return urn.rsplit(':', 1)[-1].replace('_', ' ')
+def _split_urns(value: Any) -> List[str]:
+    return [u.strip() for u in str(value or '').split(',') if u.strip()]
+class RulePlanner:
+    """Plans common queries without an LLM; confidence is the share of content words the matched phrases cover"""
+    def __init__(self, tags: Iterable[Dict[str, Any]] = (), shots: Iterable[Dict[str, Any]] = (),
+                 min_confidence: float = 0.75):
+        self.min_confidence = min_confidence
+        shot_params = [shot.get("qloo_request", {}).get("params", {}) for shot in shots]
+        tag_phrases = [(phrase, _split_urns(urns)) for phrase, urns in {**VENUE_TYPE_RULES, **TASTE_RULES}.items()]
+        tag_phrases += [(tag["name"], [tag["id"]]) for tag in tags]
+        tag_phrases += [(_slug_phrase(urn), [urn]) for params in shot_params
+                        for urn in _split_urns(params.get("filter.tags")) + _split_urns(params.get("signal.interests.tags"))]
+        self.tags = PhraseMatcher(tag_phrases)
+        place_phrases = list(KNOWN_LOCATIONS.items())
+        place_phrases += [(query.split(',')[0], query) for query in
+                          (params.get("filter.location.query") for params in shot_params) if query]
+        self.places = PhraseMatcher(place_phrases, plurals=False)
+    @classmethod
+    def from_files(cls, tags_path: str = TAGS_PATH, shots_path: str = SHOTS_PATH, **kwargs) -> "RulePlanner":
+        loaded = []
+        for path in (tags_path, shots_path):
+            try:
+                with open(path, 'r') as f:
+                    loaded.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not load planner rules from {path}: {e}")
+                loaded.append([])
+        return cls(*loaded, **kwargs)
+    def _locate(self, user_query: str, text: str) -> Tuple[Optional[str], List[str], bool]:
+        """(location, matched place phrases, whether some other place is mentioned that we can't resolve)"""
+        hits = self.places.scan(text)
+        known = {phrase for phrase, _ in hits}
+        unresolved = any(normalize_query(m.group(1)) not in known and not self.tags.scan(normalize_query(m.group(1)))
+                         for m in _PLACE_MENTION.finditer(user_query))
+        return (hits[0][1] if hits else None), [phrase for phrase, _ in hits], unresolved
+    def extract_location(self, user_query: str) -> str:
+        """The location a query asks about, defaulting to New York like the LLM planner"""
+        location, _, _ = self._locate(user_query, normalize_query(user_query))
+        return location or DEFAULT_LOCATION
+    def place_key(self, user_query: str) -> Optional[str]:
+        """What two queries must share to count as asking about the same place: the resolved location,
+        else the raw mention of a place we don't know, else None when the query names no place"""
+        hits = self.places.scan(normalize_query(user_query))
+        if hits:
+            return hits[0][1]
+        for m in _PLACE_MENTION.finditer(user_query):
+            mention = normalize_query(m.group(1))
+            if not self.tags.scan(mention):
+                return mention
+        return None
+    def plan(self, user_query: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """(plan, confidence) for a query, or (None, 0.0) when no tag phrase matches"""
+        text = normalize_query(user_query)
+        tag_hits = self.tags.scan(text)
+        if not tag_hits:
+            return None, 0.0
+        location, place_phrases, unresolved = self._locate(user_query, text)
+        urns = list(dict.fromkeys(urn for _, hit_urns in tag_hits for urn in hit_urns))
+        matched = [phrase for phrase, _ in tag_hits]
+        plan = {
+            "endpoint": ENDPOINT,
+            "params": {
+                "filter.type": "urn:entity:place",
+                "filter.location.query": location or DEFAULT_LOCATION,
+                "signal.interests.tags": ",".join(urns),
+                "limit": PLAN_LIMIT
+            },
+            "reasoning": f"Rule plan from {', '.join(repr(p) for p in matched)}"
+                         + (f" in {location}" if location else f", no location given so {DEFAULT_LOCATION}")
+        }
+        confidence = 0.0 if unresolved else coverage(text, matched + place_phrases)
+        return plan, confidence
+def render_mapping_rules(rules: Dict[str, str]) -> str:
+    """Prompt lines for a mapping table"""
+    return "\n".join(f'   - "{phrase}" → {urns}' for phrase, urns in rules.items())
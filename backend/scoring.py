@@ -0,0 +1,152 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from matcher import KeywordMatcher, GroupMatcher
+from qloo_client import EntityRecord, TAG_VOCAB, KEYWORD_VOCAB
+from tag_index import TagBitsets, FOOD_TAGS, ARTS_TAGS
+BASE_SCORE = 50
+MAX_SCORE = 95
+NAME_WEIGHT = 20
+INDICATOR_WEIGHT = 15
+TAG_WEIGHT = 10
+KEYWORD_WEIGHT = 5
+SCORED_KEYWORDS = 5
+EXPLAINED_KEYWORDS = 8
+EXPLAINED_TASTES = 4
+INDICATOR_GROUPS = ('music', 'beverage', 'food')
+INDICATORS = GroupMatcher({
+    'music': ['music', 'concert', 'venue', 'club', 'bar', 'lounge'],
+    'beverage': ['bar', 'cafe', 'coffee', 'brewery', 'wine', 'cocktail'],
+    'food': ['restaurant', 'kitchen', 'dining', 'food', 'eatery', 'bistro']
+})
+VENUE_TYPE_MAPPINGS = GroupMatcher({
+    'contemporary art': ['gallery', 'museum', 'art', 'creative', 'design'],
+    'specialty coffee': ['coffee', 'cafe', 'espresso', 'roast', 'brew'],
+    'craft beer': ['brewery', 'beer', 'tap', 'ale', 'lager', 'craft'],
+    'vintage fashion': ['vintage', 'boutique', 'thrift', 'retro', 'second hand'],
+    'fine dining': ['restaurant', 'dining', 'cuisine', 'chef', 'gourmet'],
+    'live music': ['music', 'concert', 'live', 'band', 'venue', 'stage'],
+    'wine': ['wine', 'vineyard', 'tasting', 'cellar', 'sommelier'],
+    'street food': ['food truck', 'street', 'casual', 'quick', 'takeout']
+})
+@lru_cache(maxsize=256)
+def _word_matcher(words: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(words)
+def _indicator_category(taste_id: str) -> int:
+    if 'artist:' in taste_id:
+        return 0
+    if 'beverage:' in taste_id:
+        return 1
+    if 'food:' in taste_id or 'cuisine:' in taste_id:
+        return 2
+    return -1
+class TasteProfile:
+    """A user's tastes featurized once: interned taste words and per-taste category one-hots"""
+    def __init__(self, tastes: Sequence[Dict[str, Any]]):
+        self.names = [t.get('name', '') for t in tastes]
+        lowered = [n.lower() for n in self.names]
+        score_words = [{w for w in n.split() if len(w) > 3} for n in lowered]
+        explain_words = [{w for w in n.split() if len(w) > 2} for n in lowered]
+        self.words = tuple(sorted(set().union(*score_words, *explain_words)))
+        self.word_ids = {w: i for i, w in enumerate(self.words)}
+        self.matcher = _word_matcher(self.words)
+        n_tastes, n_words = len(tastes), len(self.words)
+        self.score_words = np.zeros((n_words, n_tastes), dtype=np.float32)
+        self.explain_words = np.zeros((n_words, n_tastes), dtype=np.float32)
+        for t in range(n_tastes):
+            for w in score_words[t]:
+                self.score_words[self.word_ids[w], t] = 1
+            for w in explain_words[t]:
+                self.explain_words[self.word_ids[w], t] = 1
+        self.indicator = np.zeros((n_tastes, len(INDICATOR_GROUPS)), dtype=np.float32)
+        self.typed = np.zeros((n_tastes, 2), dtype=np.float32)
+        self.mapping = np.zeros((n_tastes, len(VENUE_TYPE_MAPPINGS.order)), dtype=np.float32)
+        for t, taste in enumerate(tastes):
+            category = _indicator_category(taste.get('id', ''))
+            if category >= 0:
+                self.indicator[t, category] = 1
+            taste_type = taste.get('type', '').lower()
+            if taste_type == 'food_beverage':
+                self.typed[t, 0] = 1
+            elif taste_type == 'visual_arts':
+                self.typed[t, 1] = 1
+            if lowered[t] in VENUE_TYPE_MAPPINGS.groups:
+                self.mapping[t, VENUE_TYPE_MAPPINGS.order.index(lowered[t])] = 1
+        self.contained_in = {}
+        for w in {w for words in score_words for w in words}:
+            for start in range(len(w) + 1):
+                for end in range(start, len(w) + 1):
+                    self.contained_in.setdefault(w[start:end], set()).add(self.word_ids[w])
+class VenueScorer:
+    """Scores every candidate venue against a taste profile in one batched NumPy pass"""
+    def __init__(self, entities: Sequence[EntityRecord], tastes: Sequence[Dict[str, Any]],
+                 bitsets: Optional[TagBitsets] = None):
+        self.entities = list(entities)
+        self.profile = TasteProfile(tastes)
+        self._rows = {id(e): i for i, e in enumerate(self.entities)}
+        strings: Dict[str, int] = {}
+        def intern(text: str) -> int:
+            return strings.setdefault(text, len(strings))
+        n = len(self.entities)
+        name_ids = np.zeros(n, dtype=np.int64)
+        tag_pairs, kw5_pairs, kw8_pairs, kw_all_pairs = [], [], [], []
+        for e, entity in enumerate(self.entities):
+            name_ids[e] = intern(entity.name_lower)
+            for tag_id in entity.tag_ids:
+                tag_pairs.append((e, intern(TAG_VOCAB.lowered[tag_id])))
+            for k, keyword_id in enumerate(entity.keyword_ids):
+                pair = (e, intern(KEYWORD_VOCAB.lowered[keyword_id]))
+                kw_all_pairs.append(pair)
+                if k < SCORED_KEYWORDS:
+                    kw5_pairs.append(pair)
+                if k < EXPLAINED_KEYWORDS:
+                    kw8_pairs.append(pair)
+        bitsets = TagBitsets(self.entities) if bitsets is None else bitsets.select(self.entities)
+        typed = np.stack([bitsets.any(FOOD_TAGS), bitsets.any(ARTS_TAGS)], axis=1).astype(np.float32)
+        profile = self.profile
+        n_strings, n_words = len(strings), len(profile.words)
+        hits = np.zeros((n_strings, n_words), dtype=np.float32)
+        reverse = np.zeros((n_strings, n_words), dtype=np.float32)
+        indicators = np.zeros((n_strings, len(INDICATOR_GROUPS)), dtype=np.float32)
+        mappings = np.zeros((n_strings, len(VENUE_TYPE_MAPPINGS.order)), dtype=np.float32)
+        for text, s in strings.items():
+            for w in profile.matcher.find(text):
+                hits[s, profile.word_ids[w]] = 1
+            for w in profile.contained_in.get(text, ()):
+                reverse[s, w] = 1
+            for g in INDICATORS.find_groups(text):
+                indicators[s, INDICATOR_GROUPS.index(g)] = 1
+            for g in VENUE_TYPE_MAPPINGS.find_groups(text):
+                mappings[s, VENUE_TYPE_MAPPINGS.order.index(g)] = 1
+        score_hits = (hits @ profile.score_words) > 0
+        explain_hits = (hits @ profile.explain_words) > 0
+        keyword_hits = (np.maximum(hits, reverse) @ profile.score_words) > 0
+        def per_entity(pairs, per_string):
+            out = np.zeros((n, per_string.shape[1]), dtype=np.float32)
+            if pairs:
+                rows, cols = np.asarray(pairs, dtype=np.int64).T
+                np.add.at(out, rows, per_string[cols])
+            return out
+        name_match = score_hits[name_ids].astype(np.float32)
+        tag_matches = per_entity(tag_pairs, score_hits.astype(np.float32))
+        keyword_matches = per_entity(kw5_pairs, score_hits.astype(np.float32))
+        entity_indicators = (indicators[name_ids] + per_entity(tag_pairs, indicators)) > 0
+        per_taste = (NAME_WEIGHT * name_match + TAG_WEIGHT * tag_matches + KEYWORD_WEIGHT * keyword_matches
+                     + INDICATOR_WEIGHT * (entity_indicators.astype(np.float32) @ profile.indicator.T))
+        total = BASE_SCORE + np.rint(per_taste).astype(np.int64).sum(axis=1)
+        self.scores = np.minimum(total, MAX_SCORE) / 100.0
+        entity_mappings = (mappings[name_ids] + per_entity(tag_pairs, mappings) + per_entity(kw_all_pairs, mappings)) > 0
+        self.matches = (
+            explain_hits[name_ids]
+            | (per_entity(tag_pairs, explain_hits.astype(np.float32)) > 0)
+            | ((typed @ profile.typed.T) > 0)
+            | (per_entity(kw8_pairs, keyword_hits.astype(np.float32)) > 0)
+            | ((entity_mappings.astype(np.float32) @ profile.mapping.T) > 0)
+        )
+    def score_of(self, entity: EntityRecord) -> float:
+        return float(self.scores[self._rows[id(entity)]])
+    def cultural_matches(self, entity: EntityRecord) -> List[str]:
+        """Names of the first few tastes this venue matches by name, tag, keyword or venue-type mapping"""
+        row = self.matches[self._rows[id(entity)]]
+        names = self.profile.names
+        return list(dict.fromkeys(names[t] for t in range(min(EXPLAINED_TASTES, len(names))) if row[t]))
\ No newline at end of file
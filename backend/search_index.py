@@ -0,0 +1,199 @@
+import asyncio
+import bisect
+import heapq
+import json
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+from fuzzy_index import TrigramIndex
+from qloo_client import call_qloo
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+NAME_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+KEYWORD_WEIGHT = 1.0
+PREFIX_DISCOUNT = 0.8
+NAME_PREFIX_BONUS = 2.0
+POPULARITY_WEIGHT = 0.5
+def tokenize(text: str) -> List[str]:
+    """Accent-folded, casefolded alphanumeric tokens"""
+    text = text or ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return TOKEN_RE.findall(text.casefold())
+def entity_tokens(entity: Dict[str, Any]) -> Dict[str, float]:
+    """Each token of an entity's name, tags and keywords, weighted by the best field it appears in"""
+    weights: Dict[str, float] = {}
+    fields = [(entity.get("name", ""), NAME_WEIGHT)]
+    fields += [(tag.get("name", ""), TAG_WEIGHT) for tag in entity.get("tags", [])]
+    fields += [(keyword.get("name", ""), KEYWORD_WEIGHT)
+               for keyword in (entity.get("properties") or {}).get("keywords", [])]
+    for text, weight in fields:
+        for token in tokenize(text):
+            if weights.get(token, 0.0) < weight:
+                weights[token] = weight
+    return weights
+class SearchIndex:
+    """In-process inverted index over every Qloo entity seen so far, for typeahead prefix search"""
+    def __init__(self, max_entities: int = 50000, max_candidates: int = 2000):
+        self.max_entities = max_entities
+        self.max_candidates = max_candidates
+        self._entities: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._entity_tokens: Dict[str, Dict[str, float]] = {}
+        self._names: Dict[str, str] = {}
+        self._boosts: Dict[str, float] = {}
+        self._tag_texts: Dict[str, List[str]] = {}
+        self._fuzzy_names = TrigramIndex()
+        self._fuzzy_tags = TrigramIndex()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self.searches = 0
+        self.hits = 0
+        self.misses = 0
+        self.fuzzy_hits = 0
+        self.evictions = 0
+    def __len__(self) -> int:
+        return len(self._entities)
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._entities
+    def add(self, entity: Dict[str, Any]) -> bool:
+        entity_id = entity.get("id")
+        if not entity_id or not entity.get("name"):
+            return False
+        if entity_id in self._entities:
+            self.remove(entity_id)
+        tokens = entity_tokens(entity)
+        self._entities[entity_id] = entity
+        self._entity_tokens[entity_id] = tokens
+        self._names[entity_id] = " ".join(tokenize(entity["name"]))
+        self._boosts[entity_id] = POPULARITY_WEIGHT * float(entity.get("popularity") or 0.0)
+        self._tag_texts[entity_id] = list(dict.fromkeys(" ".join(tokenize(tag.get("name", ""))) for tag in entity.get("tags", [])))
+        self._fuzzy_names.add(self._names[entity_id], entity_id)
+        for text in self._tag_texts[entity_id]:
+            self._fuzzy_tags.add(text, entity_id)
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+            postings[entity_id] = weight
+        while len(self._entities) > self.max_entities:
+            self.remove(next(iter(self._entities)))
+            self.evictions += 1
+        return True
+    def add_response(self, api_json: Dict[str, Any]) -> int:
+        return sum(self.add(entity) for entity in api_json.get("results", {}).get("entities", []))
+    def on_qloo_payload(self, endpoint: str, body: bytes) -> None:
+        """call_qloo response listener: index the entities of every upstream payload"""
+        payload = json.loads(body)
+        if isinstance(payload, dict) and isinstance(payload.get("results"), dict):
+            self.add_response(payload)
+    def remove(self, entity_id: str) -> None:
+        if self._entities.pop(entity_id, None) is None:
+            return
+        self._fuzzy_names.discard(self._names.pop(entity_id), entity_id)
+        for text in self._tag_texts.pop(entity_id):
+            self._fuzzy_tags.discard(text, entity_id)
+        del self._boosts[entity_id]
+        for token in self._entity_tokens.pop(entity_id):
+            postings = self._postings[token]
+            del postings[entity_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+    def _prefixed(self, prefix: str) -> Iterable[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+    def _token_scores(self, query_token: str) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        for token in self._prefixed(query_token):
+            discount = 1.0 if token == query_token else PREFIX_DISCOUNT
+            for entity_id, weight in self._postings[token].items():
+                score = weight * discount
+                if scores.get(entity_id, 0.0) < score:
+                    scores[entity_id] = score
+            if len(scores) >= self.max_candidates:
+                break
+        return scores
+    def _match_score(self, entity_id: str, query_token: str) -> float:
+        best = 0.0
+        for token, weight in self._entity_tokens[entity_id].items():
+            if token.startswith(query_token):
+                score = weight if token == query_token else weight * PREFIX_DISCOUNT
+                if score > best:
+                    best = score
+        return best
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Entities matching every query token as a word prefix, best first"""
+        self.searches += 1
+        tokens = tokenize(query)
+        query_tokens = sorted(dict.fromkeys(tokens), key=len, reverse=True)
+        totals: Dict[str, float] = self._token_scores(query_tokens[0]) if query_tokens else {}
+        for token in query_tokens[1:]:
+            if not totals:
+                break
+            scored = {}
+            for entity_id, total in totals.items():
+                score = self._match_score(entity_id, token)
+                if score:
+                    scored[entity_id] = total + score
+            totals = scored
+        if not totals:
+            self.misses += 1
+            return []
+        self.hits += 1
+        phrase = " ".join(tokens)
+        names, boosts = self._names, self._boosts
+        def rank(entity_id: str):
+            score = totals[entity_id] + boosts[entity_id]
+            if names[entity_id].startswith(phrase):
+                score += NAME_PREFIX_BONUS
+            return (-score, names[entity_id])
+        return [self._entities[entity_id] for entity_id in heapq.nsmallest(limit, totals, key=rank)]
+    def fuzzy_search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Typo-tolerant fallback: closest entity names first, then entities carrying the closest tags"""
+        tokens = tokenize(query)
+        found: Dict[str, None] = {}
+        for fuzzy in (self._fuzzy_names, self._fuzzy_tags):
+            for text, _, _ in fuzzy.search(tokens, limit=limit):
+                for entity_id in sorted(fuzzy.keys_for(text), key=lambda i: (-self._boosts[i], self._names[i])):
+                    found.setdefault(entity_id)
+                if len(found) >= limit:
+                    break
+            if len(found) >= limit:
+                break
+        if found:
+            self.fuzzy_hits += 1
+        return [self._entities[entity_id] for entity_id in list(found)[:limit]]
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entities": len(self._entities),
+            "tokens": len(self._vocabulary),
+            "max_entities": self.max_entities,
+            "searches": self.searches,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fuzzy_hits": self.fuzzy_hits,
+            "fuzzy_names": self._fuzzy_names.stats(),
+            "fuzzy_tags": self._fuzzy_tags.stats(),
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / self.searches, 4) if self.searches else 0.0
+        }
+async def warm_search_index(locations: List[str], radius: str = '50000', limit: int = 50) -> None:
+    """Crawl place results for each location through call_qloo; the response listener indexes them"""
+    for location in locations:
+        params = {
+            'filter.type': 'urn:entity:place',
+            'filter.location.query': location,
+            'filter.location.radius': radius,
+            'limit': limit
+        }
+        try:
+            await call_qloo('/v2/insights', params)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Search index warm-up failed for {location}: {e}")
@@ -0,0 +1,93 @@
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+HISTOGRAM_EDGES = (0.0, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0001)
+class SemanticCache:
+    """Values keyed by query embedding; a lookup hits the most similar live entry in its partition above threshold"""
+    def __init__(self, max_entries: int = 512, threshold: float = 0.92, ttl: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._clock = clock
+        self._matrix: Optional[np.ndarray] = None
+        self._partitions = np.full(max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._values: List[Any] = [None] * max_entries
+        self._partition_ids: Dict[Hashable, int] = {}
+        self._histogram = np.zeros(len(HISTOGRAM_EDGES) - 1, dtype=np.int64)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    def _vector(self, vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    def lookup(self, vector: np.ndarray, partition: Hashable = None) -> Tuple[Any, float]:
+        """(value, similarity) of the closest live entry in the partition, or (None, best similarity) on a miss"""
+        pid = self._partition_ids.get(partition)
+        best, similarity = -1, 0.0
+        if self._matrix is not None and pid is not None:
+            vector = self._vector(vector)
+            if vector.shape[0] == self._matrix.shape[1]:
+                now = self._clock()
+                live = (self._partitions == pid) & (self._expires > now)
+                slots = np.flatnonzero(live)
+                if len(slots):
+                    scores = self._matrix[slots] @ vector
+                    top = int(np.argmax(scores))
+                    best, similarity = int(slots[top]), float(scores[top])
+        if best >= 0:
+            self._histogram[np.searchsorted(HISTOGRAM_EDGES, max(similarity, 0.0), side='right') - 1] += 1
+        if best >= 0 and similarity >= self.threshold:
+            self._last_used[best] = self._clock()
+            self.hits += 1
+            return self._values[best], similarity
+        self.misses += 1
+        return None, similarity
+    def store(self, vector: np.ndarray, value: Any, partition: Hashable = None) -> None:
+        if self.max_entries <= 0:
+            return
+        vector = self._vector(vector)
+        if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            self._partitions[:] = -1
+            self._values = [None] * self.max_entries
+        now = self._clock()
+        free = np.flatnonzero(self._partitions < 0)
+        if len(free):
+            slot = int(free[0])
+        else:
+            expired = np.flatnonzero(self._expires <= now)
+            if len(expired):
+                slot = int(expired[0])
+                self.expirations += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+        self._matrix[slot] = vector
+        self._partitions[slot] = self._partition_ids.setdefault(partition, len(self._partition_ids))
+        self._expires[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self._values[slot] = value
+    def clear(self) -> None:
+        self._partitions[:] = -1
+        self._values = [None] * self.max_entries
+    def __len__(self) -> int:
+        return int((self._partitions >= 0).sum())
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "similarity_histogram": {f"{lo:.2f}-{min(hi, 1.0):.2f}": int(n) for lo, hi, n in
+                                     zip(HISTOGRAM_EDGES, HISTOGRAM_EDGES[1:], self._histogram)}
+        }
@@ -1,49 +1,54 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 import json
 def prettify_answers(user_query: str, qloo_data: Dict[str, Any]) -> str:
     """Main function called by main.py - generates the markdown report"""
     return generate_markdown_report(qloo_data)
 def generate_markdown_report(qloo_data: Dict[str, Any]) -> str:
     """Generate sophisticated markdown report using Qloo's cultural intelligence"""
+    return "".join(iter_markdown_report(qloo_data))
+def iter_markdown_report(qloo_data: Dict[str, Any]) -> Iterator[str]:
+    """Yield the markdown report section by section: header, one section per cluster, then insights"""
     user_prompt = qloo_data.get("user_prompt", "Business planning query")
     qloo_info = qloo_data.get("qloo_json", {})
     clusters = qloo_info.get("clusters", [])
     radius_m = qloo_info.get("radius_m", 6000)
     radius_km = round(float(radius_m) / 1000, 1)
-    markdown = f"""
+    yield f"""
 Based on Qloo's cultural data analysis for: **{user_prompt}**
 We've identified {len(clusters)} distinct cultural segments within {radius_km}km radius, each with unique affinity patterns and audience characteristics.
 ---
 """
     for i, cluster in enumerate(clusters, 1):
-        cluster_name = cluster.get("cluster_name", f"Segment {i}")
-        lift_score = cluster.get("lift_score", 0)
-        audience_size = cluster.get("audience_size", 0)
-        entities = cluster.get("example_entities", [])
-        if audience_size >= 1000:
-            audience_str = f"{audience_size//1000}K"
-        else:
-            audience_str = str(audience_size)
-        markdown += f"""
+        yield generate_cluster_section(cluster, i)
+    yield generate_strategic_insights(clusters, user_prompt)
+def generate_cluster_section(cluster: Dict[str, Any], i: int) -> str:
+    cluster_name = cluster.get("cluster_name", f"Segment {i}")
+    lift_score = cluster.get("lift_score", 0)
+    audience_size = cluster.get("audience_size", 0)
+    entities = cluster.get("example_entities", [])
+    if audience_size >= 1000:
+        audience_str = f"{audience_size//1000}K"
+    else:
+        audience_str = str(audience_size)
+    markdown = f"""
 **Affinity Score:** {lift_score}% | **Estimated Audience:** {audience_str}
 """
-        if entities:
-            markdown += "**Key Cultural Signals:**\n"
-            for entity in entities[:3]:
-                entity_name = entity.get("name", "Unknown")
-                entity_type = entity.get("type", "venue")
-                affinity = entity.get("affinity", 0)
-                keywords = entity.get("keywords", [])
-                markdown += f"- **{entity_name}** ({entity_type}) - {affinity}% affinity\n"
-                if keywords:
-                    keyword_str = ", ".join(keywords[:3])
-                    markdown += f"  *Cultural markers: {keyword_str}*\n"
-            markdown += "\n"
-        recommendations = generate_cluster_recommendations(cluster_name, lift_score, entities)
-        if recommendations:
-            markdown += f"**Strategic Recommendations:**\n{recommendations}\n"
-        markdown += "---\n\n"
-    markdown += generate_strategic_insights(clusters, user_prompt)
+    if entities:
+        markdown += "**Key Cultural Signals:**\n"
+        for entity in entities[:3]:
+            entity_name = entity.get("name", "Unknown")
+            entity_type = entity.get("type", "venue")
+            affinity = entity.get("affinity", 0)
+            keywords = entity.get("keywords", [])
+            markdown += f"- **{entity_name}** ({entity_type}) - {affinity}% affinity\n"
+            if keywords:
+                keyword_str = ", ".join(keywords[:3])
+                markdown += f"  *Cultural markers: {keyword_str}*\n"
+        markdown += "\n"
+    recommendations = generate_cluster_recommendations(cluster_name, lift_score, entities)
+    if recommendations:
+        markdown += f"**Strategic Recommendations:**\n{recommendations}\n"
+    markdown += "---\n\n"
     return markdown
 def generate_cluster_recommendations(cluster_name: str, lift_score: float, entities: list) -> str:
     """Generate specific recommendations based on cluster characteristics"""
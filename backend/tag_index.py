@@ -0,0 +1,99 @@
+import sys
+from typing import Callable, Dict, Sequence, Set
+import numpy as np
+from matcher import KeywordMatcher
+from qloo_client import EntityRecord, TAG_VOCAB
+WORD_BITS = 64
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per uint64 row, summed over the last axis"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _POPCOUNT8[as_bytes].sum(axis=-1, dtype=np.int64)
+def _bit_words(tag_ids: np.ndarray, width: int) -> np.ndarray:
+    bits = np.zeros(width * WORD_BITS, dtype=bool)
+    bits[tag_ids[tag_ids < len(bits)]] = True
+    packed = np.packbits(bits, bitorder='little')
+    return packed.view('<u8').astype(np.uint64)
+class TagMask:
+    """A named set of tags over the global tag vocabulary, classified lazily as tags are interned"""
+    def __init__(self, name: str, predicate: Callable[[str, str], bool]):
+        self.name = name
+        self.predicate = predicate
+        self._members: Set[int] = set()
+        self._seen = 0
+        self._words = np.zeros(0, dtype=np.uint64)
+        self._generation = TAG_VOCAB.generation
+    def _refresh(self) -> None:
+        if self._generation != TAG_VOCAB.generation:
+            self._members, self._seen, self._generation = set(), 0, TAG_VOCAB.generation
+            self._words = np.zeros(0, dtype=np.uint64)
+        size = len(TAG_VOCAB)
+        if self._seen == size:
+            return
+        for tag_id in range(self._seen, size):
+            if self.predicate(TAG_VOCAB.types[tag_id], TAG_VOCAB.names[tag_id]):
+                self._members.add(tag_id)
+        self._seen = size
+        self._words = np.zeros(0, dtype=np.uint64)
+    def __contains__(self, tag_id: int) -> bool:
+        self._refresh()
+        return tag_id in self._members
+    def words(self, width: int) -> np.ndarray:
+        self._refresh()
+        if len(self._words) != width:
+            self._words = _bit_words(np.fromiter(self._members, dtype=np.int64, count=len(self._members)), width)
+        return self._words
+class TagBitsets:
+    """Each candidate's tags as a row of a uint64 bit matrix over the global tag vocabulary,
+    so membership tests against a TagMask are a vectorized AND plus popcount over the pool"""
+    def __init__(self, records: Sequence[EntityRecord]):
+        self.records = list(records)
+        self.width = max(1, -(-len(TAG_VOCAB) // WORD_BITS))
+        self.matrix = np.zeros((len(self.records), self.width), dtype=np.uint64)
+        rows = np.fromiter((r for r, record in enumerate(self.records) for _ in record.tag_ids), dtype=np.int64)
+        tags = np.fromiter((t for record in self.records for t in record.tag_ids), dtype=np.int64)
+        if len(tags):
+            bits = np.left_shift(np.uint64(1), (tags % WORD_BITS).astype(np.uint64))
+            np.bitwise_or.at(self.matrix, (rows, tags // WORD_BITS), bits)
+    def select(self, records: Sequence[EntityRecord]) -> "TagBitsets":
+        """The rows of the given records, which must all be in this index, in their order"""
+        rows = {id(record): r for r, record in enumerate(self.records)}
+        selected = object.__new__(TagBitsets)
+        selected.records = list(records)
+        selected.width = self.width
+        selected.matrix = self.matrix[np.fromiter((rows[id(r)] for r in selected.records), dtype=np.int64,
+                                                  count=len(selected.records))]
+        return selected
+    def count(self, mask: TagMask) -> np.ndarray:
+        """Number of distinct tags in the mask, per entity"""
+        return popcount(self.matrix & mask.words(self.width))
+    def any(self, mask: TagMask) -> np.ndarray:
+        return (self.matrix & mask.words(self.width)).any(axis=1)
+    def tag_counts(self, mask: TagMask) -> Dict[int, int]:
+        """Entities carrying each tag of the mask, keyed by tag id"""
+        masked = np.ascontiguousarray(self.matrix & mask.words(self.width))
+        if sys.byteorder != 'little':
+            masked = masked.byteswap()
+        totals = np.unpackbits(masked.view(np.uint8), axis=1, bitorder='little').sum(axis=0)
+        return {int(t): int(totals[t]) for t in np.flatnonzero(totals)}
+CULTURAL_TAG_WORDS = {
+    'urn:tag:category:place': KeywordMatcher(['restaurant', 'museum', 'art museum', 'market', 'cafe', 'deli', 'event venue']),
+    'urn:tag:genre:place': KeywordMatcher(['restaurant', 'museum', 'art museum', 'market', 'deli', 'arena']),
+    'urn:tag:amenity:place': KeywordMatcher(['restaurant', 'bar', 'cafe']),
+    'urn:tag:offerings:place': KeywordMatcher(['comfort food', 'happy hour', 'live music'])
+}
+LANDMARK_TAG_NAMES = {'tourist attraction', 'historical landmark', 'monument'}
+FOOD_TAG_TYPES = ('venue_type', 'business_type')
+FOOD_TAG_WORDS = KeywordMatcher(['restaurant', 'cafe', 'coffee', 'bar', 'dining', 'food', 'drink'])
+ART_TAG_TYPES = ('venue_type', 'category')
+ART_TAG_WORDS = KeywordMatcher(['gallery', 'museum', 'art', 'studio', 'exhibition', 'creative'])
+def _is_cultural_tag(tag_type: str, name: str) -> bool:
+    matcher = CULTURAL_TAG_WORDS.get(tag_type)
+    return (matcher is not None and matcher.any(name)) or name.lower() in LANDMARK_TAG_NAMES
+CULTURAL_TAGS = TagMask('cultural', _is_cultural_tag)
+FOOD_TAGS = TagMask('food', lambda tag_type, name: tag_type.lower() in FOOD_TAG_TYPES and FOOD_TAG_WORDS.any(name))
+ARTS_TAGS = TagMask('arts', lambda tag_type, name: tag_type.lower() in ART_TAG_TYPES and ART_TAG_WORDS.any(name))
+CATEGORY_TAGS = TagMask('category', lambda tag_type, name: tag_type == 'urn:tag:category:place')
+GENRE_TAGS = TagMask('genre', lambda tag_type, name: tag_type == 'urn:tag:genre:place')
@@ -0,0 +1,142 @@
+import copy
+import json
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+from openai import AsyncOpenAI
+from cache import TTLCache
+from configs import setting
+from matcher import KeywordMatcher, PhraseMatcher, coverage, normalize_query
+from hashing import stable_bucket
+client = AsyncOpenAI(api_key=setting.OPENAI_API_KEY)
+TAGS_PATH = 'data/qloo_tags.json'
+LOCAL = 'local'
+CACHE = 'cache'
+LLM = 'llm'
+FALLBACK = 'fallback'
+TIERS = (LOCAL, CACHE, LLM, FALLBACK)
+TASTE_KEYWORDS = {
+    'jazz': {"id": "jazz_music", "name": "Jazz Music", "color": "#8E44AD"},
+    'coffee': {"id": "specialty_coffee", "name": "Specialty Coffee", "color": "#A0522D"},
+    'art': {"id": "contemporary_art", "name": "Contemporary Art", "color": "#2E8B57"},
+    'gallery': {"id": "art_galleries", "name": "Art Galleries", "color": "#4682B4"},
+    'food': {"id": "gourmet_food", "name": "Gourmet Food", "color": "#CD853F"},
+    'restaurant': {"id": "fine_dining", "name": "Fine Dining", "color": "#B22222"},
+    'music': {"id": "live_music", "name": "Live Music", "color": "#FF6347"},
+    'vintage': {"id": "vintage_shops", "name": "Vintage Shopping", "color": "#DAA520"},
+    'books': {"id": "bookstores", "name": "Independent Bookstores", "color": "#483D8B"},
+    'craft': {"id": "craft_beer", "name": "Craft Beer", "color": "#D2691E"},
+    'outdoor': {"id": "outdoor_activities", "name": "Outdoor Activities", "color": "#228B22"},
+    'theater': {"id": "theater", "name": "Theater & Performance", "color": "#8B008B"},
+    'local': {"id": "local_culture", "name": "Local Culture", "color": "#556B2F"},
+    'hidden': {"id": "hidden_gems", "name": "Hidden Gems", "color": "#708090"},
+    'rooftop': {"id": "rooftop_venues", "name": "Rooftop Venues", "color": "#FF69B4"},
+    'cocktail': {"id": "craft_cocktails", "name": "Craft Cocktails", "color": "#20B2AA"},
+    'museum': {"id": "museums", "name": "Museums", "color": "#9932CC"},
+    'market': {"id": "local_markets", "name": "Local Markets", "color": "#32CD32"},
+    'nightlife': {"id": "nightlife", "name": "Nightlife", "color": "#FF1493"}
+}
+TASTE_KEYWORD_MATCHER = KeywordMatcher(TASTE_KEYWORDS)
+def mock_extract_tastes(message):
+    hits = TASTE_KEYWORD_MATCHER.find(message)
+    return [dict(taste) for keyword, taste in TASTE_KEYWORDS.items() if keyword in hits]
+PALETTE = tuple(dict.fromkeys(taste["color"] for taste in TASTE_KEYWORDS.values()))
+class TasteVocabulary:
+    """Taste phrases from the Qloo tag taxonomy and the legacy keyword table, with their plurals,
+    compiled into one PhraseMatcher; tag names take precedence over keywords."""
+    def __init__(self, keywords: Dict[str, Dict[str, str]], tags: Iterable[Dict[str, str]]):
+        tag_tastes = [(tag["name"], {"id": tag["id"].rsplit(':', 1)[-1], "name": tag["name"],
+                                     "color": PALETTE[stable_bucket(tag["id"], len(PALETTE))]}) for tag in tags]
+        self.phrases = PhraseMatcher(tag_tastes + list(keywords.items()))
+    @classmethod
+    def from_files(cls, tags_path: str = TAGS_PATH) -> "TasteVocabulary":
+        try:
+            with open(tags_path, 'r') as f:
+                tags = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load taste tags from {tags_path}: {e}")
+            tags = []
+        return cls(TASTE_KEYWORDS, tags)
+    def match(self, message: str, location: str = "") -> Tuple[List[Dict[str, str]], float]:
+        """Tastes named in a message, in order of appearance, and the share of its content words they cover.
+        The words of the location don't count, so confidence 1.0 means nothing was left over."""
+        text = normalize_query(message)
+        hits = self.phrases.scan(text)
+        tastes = []
+        for _, taste in hits:
+            if taste not in tastes:
+                tastes.append(taste)
+        return tastes, coverage(text, [phrase for phrase, _ in hits], frozenset(normalize_query(location).split()))
+def _excluding(tastes: Sequence[Dict[str, Any]], existing_tastes: Sequence[str]) -> List[Dict[str, Any]]:
+    existing = {normalize_query(str(t)) for t in existing_tastes}
+    return [dict(t) for t in tastes
+            if normalize_query(str(t.get("name", ""))) not in existing and normalize_query(str(t.get("id", ""))) not in existing]
+def _system_prompt(location: str, existing_tastes: Sequence[str]) -> str:
+    return f"""You are a cultural taste extraction AI. Analyze user messages and extract specific cultural interests, activities, and venue types.
+Location context: {location}
+Existing tastes: {', '.join(existing_tastes)}
+Extract new cultural tastes from the user's message. Return a JSON array of taste objects with this format:
+{{"id": "unique_id", "name": "Taste Name", "color": "
+Focus on:
+- Specific venue types (jazz clubs, art galleries, bookstores, etc.)
+- Activity preferences (live music, rooftop dining, craft cocktails, etc.)
+- Cultural interests (contemporary art, vintage shopping, local cuisine, etc.)
+- Ambiance preferences (intimate, vibrant, quiet, social, etc.)
+Only extract tastes that are clearly mentioned or strongly implied. Avoid duplicating existing tastes.
+Return valid JSON only, no explanations."""
+async def _extract_with_llm(message: str, existing_tastes: Sequence[str], location: str) -> List[Dict[str, Any]]:
+    response = await client.chat.completions.create(
+        model=setting.GPT_MODEL,
+        messages=[
+            {"role": "system", "content": _system_prompt(location, existing_tastes)},
+            {"role": "user", "content": message}
+        ],
+        temperature=0.3,
+        max_tokens=500
+    )
+    extracted = json.loads(response.choices[0].message.content.strip())
+    return extracted if isinstance(extracted, list) else []
+class TasteExtractor:
+    """Answers a taste extraction from the cheapest tier: local vocabulary, cached LLM answer, then the LLM"""
+    def __init__(self, vocabulary: TasteVocabulary, min_confidence: float = 0.6,
+                 cache_size: int = 2048, cache_ttl: float = 86400.0):
+        self.vocabulary = vocabulary
+        self.min_confidence = min_confidence
+        self._cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.counts = dict.fromkeys(TIERS, 0)
+    @staticmethod
+    def cache_key(message: str, existing_tastes: Sequence[str], location: str) -> Tuple:
+        return (normalize_query(message), tuple(sorted({normalize_query(str(t)) for t in existing_tastes})),
+                normalize_query(location))
+    async def extract(self, message: str, existing_tastes: Sequence[str] = (), location: str = "") -> Dict[str, Any]:
+        """{"extracted_tastes", "tier", "confidence"} for a message"""
+        tastes, confidence = self.vocabulary.match(message, location)
+        if tastes and confidence >= self.min_confidence:
+            return self._answer(LOCAL, _excluding(tastes, existing_tastes), confidence)
+        key = self.cache_key(message, existing_tastes, location)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return self._answer(CACHE, copy.deepcopy(cached), confidence)
+        try:
+            extracted = await _extract_with_llm(message, existing_tastes, location)
+        except Exception as e:
+            print(f"⚠️ Taste extraction LLM call failed: {e}")
+            return self._answer(FALLBACK, mock_extract_tastes(message), confidence)
+        self._cache.set(key, copy.deepcopy(extracted))
+        return self._answer(LLM, extracted, confidence)
+    def _answer(self, tier: str, tastes: List[Dict[str, Any]], confidence: float) -> Dict[str, Any]:
+        self.counts[tier] += 1
+        return {"extracted_tastes": tastes, "tier": tier, "confidence": round(confidence, 3)}
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        return {
+            "tiers": dict(self.counts),
+            "llm_share": round(self.counts[LLM] / total, 4) if total else 0.0,
+            "vocabulary_terms": len(self.vocabulary.phrases),
+            "min_confidence": self.min_confidence,
+            "cache": self._cache.stats()
+        }
+taste_extractor = TasteExtractor(
+    TasteVocabulary.from_files(),
+    min_confidence=setting.TASTE_LOCAL_MIN_CONFIDENCE,
+    cache_size=setting.TASTE_CACHE_MAX_ENTRIES,
+    cache_ttl=setting.TASTE_CACHE_TTL
+)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import httpx
+import numpy as np
+import context
+import planner
+import main
+from matcher import FILLER_WORDS, normalize_query
+STEP_DELAY = 0.2
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(STEP_DELAY)
+        arguments = json.dumps({
+            "endpoint": "/v2/insights",
+            "params": {"filter.type": "urn:entity:place", "filter.location.query": "Brooklyn, NY"},
+            "reasoning": "test"
+        })
+        tool_call = SimpleNamespace(function=SimpleNamespace(arguments=arguments))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[tool_call]))])
+retrieved = []
+def blocking_retrieve(query, k):
+    retrieved.append(query)
+    time.sleep(STEP_DELAY)
+    return [{"text": "Cafe (venue_type) -> urn:tag:venue_type:cafe", "metadata": {"kind": "tag"}}], []
+def fake_embed(query):
+    """Same vector for queries with the same content words, in any order"""
+    seed = sum(ord(c) for w in normalize_query(query).split() if w not in FILLER_WORDS for c in w)
+    vector = np.random.default_rng(seed).normal(size=16)
+    return vector / np.linalg.norm(vector)
+async def fake_call_qloo(endpoint, params, use_cache=True):
+    await asyncio.sleep(STEP_DELAY)
+    return {"results": {"entities": []}}
+def use_llm_planner(monkeypatch):
+    """Route every query through retrieval and the fake LLM; the rule planner would answer the ones used here"""
+    completions = FakeCompletions()
+    retrieved.clear()
+    planner._plan_cache.clear()
+    monkeypatch.setattr(planner.rule_planner, "min_confidence", 2.0)
+    monkeypatch.setattr(context, "_retrieve", blocking_retrieve)
+    monkeypatch.setattr(planner, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return completions
+def test_concurrent_chat_requests_overlap(monkeypatch):
+    completions = use_llm_planner(monkeypatch)
+    monkeypatch.setattr(context, "_embed", fake_embed)
+    monkeypatch.setattr(main, "call_qloo", fake_call_qloo)
+    n_requests = 4
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as http:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                http.post("/api/chat", json={"query": f"coffee shop in Brooklyn {i}"}) for i in range(n_requests)
+            ])
+            return responses, time.perf_counter() - started
+    responses, elapsed = asyncio.run(run())
+    assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+    assert completions.calls == n_requests and len(retrieved) == n_requests
+    serialized = n_requests * 3 * STEP_DELAY
+    assert elapsed < serialized / 2, f"{elapsed:.2f}s for {n_requests} requests, serialized would be {serialized:.2f}s"
+def test_chat_stream_sends_plan_first_and_report_by_section(monkeypatch):
+    completions = use_llm_planner(monkeypatch)
+    monkeypatch.setattr(context, "_embed", fake_embed)
+    monkeypatch.setattr(main, "call_qloo", fake_call_qloo)
+    monkeypatch.setattr(main, "chat_cache", main.SemanticCache(8, threshold=0.9, ttl=60))
+    async def stream(http, query):
+        async with http.stream("POST", "/api/chat/stream", json={"query": query}) as resp:
+            assert resp.headers["content-type"].startswith("text/event-stream")
+            return [line[len("event: "):] async for line in resp.aiter_lines() if line.startswith("event: ")]
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as http:
+            return [await stream(http, q) for q in ("record store in Bushwick", "Bushwick record store!")]
+    for events in asyncio.run(run()):
+        assert events[0] == "plan"
+        assert events[1] == "clusters"
+        assert events[2:-1] == ["report"] * (len(events) - 3)
+        assert events[-1] == "done"
+    assert completions.calls == 1 and retrieved == ["record store in Bushwick"]
+    assert main.chat_cache.stats()["hits"] == 1
+def test_paraphrased_chat_queries_share_a_cached_plan(monkeypatch):
+    completions = use_llm_planner(monkeypatch)
+    monkeypatch.setattr(context, "_embed", fake_embed)
+    upstream, logged = [], []
+    async def counting_call_qloo(endpoint, params, use_cache=True):
+        upstream.append(params)
+        return {"results": {"entities": []}}
+    monkeypatch.setattr(main, "call_qloo", counting_call_qloo)
+    monkeypatch.setattr(main, "log_chat", lambda user_query, *args: logged.append(user_query))
+    monkeypatch.setattr(main, "chat_cache", main.SemanticCache(8, threshold=0.9, ttl=60))
+    queries = ["record store in Bushwick", "Bushwick record store!", "record store in Lisbon", "record stores"]
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as http:
+            return [(await http.post("/api/chat", json={"query": q})).json() for q in queries]
+    first, paraphrase, lisbon, nowhere = asyncio.run(run())
+    assert paraphrase["plan"] == first["plan"]
+    assert paraphrase["qlooData"]["user_prompt"] == "Bushwick record store!"
+    assert "Bushwick record store!" in paraphrase["pretty"]
+    assert logged == queries
+    assert completions.calls == len(upstream) == 3
+    stats = main.chat_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert stats["similarity_histogram"]["0.98-1.00"] == 1
+def test_rule_planned_chat_queries_skip_the_embedding(monkeypatch):
+    def failing_embed(query):
+        raise AssertionError("rule-planned queries must not be embedded")
+    monkeypatch.setattr(context, "_embed", failing_embed)
+    monkeypatch.setattr(main, "call_qloo", fake_call_qloo)
+    monkeypatch.setattr(main, "chat_cache", main.SemanticCache(8, threshold=0.9, ttl=60))
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as http:
+            return await http.post("/api/chat", json={"query": "record store in Chicago"})
+    response = asyncio.run(run())
+    assert response.status_code == 200, response.text
+    assert response.json()["plan"]["params"]["filter.location.query"] == "Chicago, IL"
+    assert main.chat_cache.stats()["misses"] == 0
@@ -0,0 +1,25 @@
+import os
+import numpy as np
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import embeddings
+from embedding_cache import EmbeddingCache
+def test_repeated_texts_are_embedded_once_and_survive_restart(tmp_path, monkeypatch):
+    embedded = []
+    def fake_embed(texts, model):
+        embedded.extend(texts)
+        return embeddings.normalize_rows(np.array([[len(t), 1.0, 2.0] for t in texts], dtype=np.float32))
+    path = str(tmp_path / "embeddings.sqlite")
+    monkeypatch.setattr(embeddings, "_embed_uncached", fake_embed)
+    monkeypatch.setattr(embeddings, "embedding_cache", EmbeddingCache(path, memory_size=8))
+    first = embeddings.embed_texts(["matcha in  Bushwick", "vinyl bars"], model="m")
+    again = embeddings.embed_texts(["matcha in Bushwick ", "vinyl bars", "vinyl bars"], model="m")
+    assert embedded == ["matcha in Bushwick", "vinyl bars"]
+    assert np.allclose(first, again[:2])
+    assert embeddings.embedding_cache_stats()["memory_hits"] == 3
+    monkeypatch.setattr(embeddings, "embedding_cache", EmbeddingCache(path, memory_size=8))
+    embeddings.embed_texts(["vinyl bars"], model="m")
+    embeddings.embed_texts(["vinyl bars"], model="other-model")
+    stats = embeddings.embedding_cache_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
+    assert embedded[-1] == "vinyl bars" and len(embedded) == 3
@@ -0,0 +1,50 @@
+import asyncio
+from log_sink import LogSink
+class FakeCollection:
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("mongo down")
+        self.batches.append(list(docs))
+def test_batches_by_size_and_flushes_on_stop():
+    async def run():
+        collection = FakeCollection()
+        sink = LogSink(collection, max_queue=100, batch_size=10, flush_interval=0.05)
+        await sink.start()
+        for i in range(25):
+            assert sink.submit({"n": i})
+        await asyncio.sleep(0.2)
+        sink.submit({"n": 25})
+        await sink.stop()
+        return collection, sink
+    collection, sink = asyncio.run(run())
+    assert [len(b) for b in collection.batches][:2] == [10, 10]
+    assert [d["n"] for b in collection.batches for d in b] == list(range(26))
+    assert sink.stats()["written"] == 26
+    assert not sink.stats()["running"]
+def test_saturated_queue_drops_and_counts():
+    async def run():
+        newest = LogSink(FakeCollection(), max_queue=3, drop_policy="newest")
+        oldest = LogSink(FakeCollection(), max_queue=3, drop_policy="oldest")
+        for i in range(5):
+            newest.submit({"n": i})
+            oldest.submit({"n": i})
+        await newest.stop()
+        await oldest.stop()
+        return newest, oldest
+    newest, oldest = asyncio.run(run())
+    assert newest.dropped == 2 and oldest.dropped == 2
+    assert [d["n"] for b in newest.collection.batches for d in b] == [0, 1, 2]
+    assert [d["n"] for b in oldest.collection.batches for d in b] == [2, 3, 4]
+def test_write_failures_are_counted_not_raised():
+    async def run():
+        sink = LogSink(FakeCollection(fail=True), batch_size=5)
+        for i in range(7):
+            sink.submit({"n": i})
+        await sink.stop()
+        return sink
+    assert asyncio.run(run()).failed == 7
@@ -0,0 +1,23 @@
+import random
+from matcher import KeywordMatcher, GroupMatcher
+VOCAB = ['art', 'art museum', 'museum', 'bar', 'cocktail bar', 'cafe', 'deli', 'delicatessen', 'live', 'live music',
+         'music', 'dj', 'beauty & essex', 'cutting-edge', 'eco', 'ecological']
+def test_find_matches_naive_substring_search():
+    rng = random.Random(3)
+    pieces = VOCAB + ['the', ' ', 'Modern', 'katz', 'x', '-', 'ART', 'Live Music Hall']
+    matcher = KeywordMatcher(VOCAB)
+    for _ in range(2000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+        expected = {term for term in VOCAB if term in text.lower()}
+        assert matcher.find(text) == expected, text
+        assert matcher.any(text) == bool(expected)
+def test_group_matcher_reports_groups_in_declaration_order():
+    groups = GroupMatcher({
+        "music": ["vinyl", "record", "music"],
+        "nightlife": ["bar", "cocktail"],
+        "coffee": ["coffee", "cafe"]
+    })
+    assert groups.find_groups("Cocktail bar & record shop") == {"music", "nightlife"}
+    assert groups.first_group("Cocktail bar & record shop") == "music"
+    assert groups.first_group("Cocktail bar & record shop", order=("coffee", "nightlife")) == "nightlife"
+    assert groups.first_group("park") is None
@@ -0,0 +1,35 @@
+import asyncio
+from log_sink import LogSink
+from payload_store import PayloadStore
+class FakeBlobs:
+    def __init__(self):
+        self.docs = {}
+        self.ops = 0
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.ops += 1
+            self.docs.setdefault(op._filter["_id"], {"_id": op._filter["_id"], **op._doc["$setOnInsert"]})
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+class FakeLogs:
+    def __init__(self):
+        self.docs = []
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+def test_identical_payloads_are_stored_once_and_rehydrate():
+    raw = {"results": {"entities": [{"id": f"e{i}", "name": "Katz's Delicatessen", "tags": ["deli"] * 20} for i in range(50)]}}
+    async def run():
+        blobs, logs = FakeBlobs(), FakeLogs()
+        store = PayloadStore(blobs)
+        sink = LogSink(logs, batch_size=2, before_write=store.externalize)
+        for i in range(5):
+            sink.submit({"user_query": f"q{i}", "qloo_response": {"results": dict(raw["results"])}})
+        await sink.stop()
+        restored = await store.rehydrate(logs.docs[3])
+        return blobs, logs, store, restored
+    blobs, logs, store, restored = asyncio.run(run())
+    assert len(blobs.docs) == 1 and blobs.ops == 1
+    assert all("qloo_response" not in d and d["qloo_response_ref"] == logs.docs[0]["qloo_response_ref"] for d in logs.docs)
+    assert restored["qloo_response"] == raw and restored["user_query"] == "q3"
+    assert store.stats()["deduplicated"] == 4
+    assert store.stats()["compression_ratio"] > 10
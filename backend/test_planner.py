@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import context
+import planner
+from prompt_builder import PromptBuilder, count_tokens
+class CountingCompletions:
+    def __init__(self):
+        self.calls = 0
+        self.messages = []
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.messages.append(kwargs["messages"])
+        arguments = json.dumps({
+            "endpoint": "/v2/insights",
+            "params": {"filter.location.query": "Brooklyn, NY", "signal.interests.tags": "urn:tag:taste:coffee"},
+            "reasoning": "coffee in Brooklyn"
+        })
+        tool_call = SimpleNamespace(function=SimpleNamespace(arguments=arguments))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[tool_call]))])
+def test_equivalent_queries_share_one_llm_plan(monkeypatch, tmp_path):
+    completions = CountingCompletions()
+    monkeypatch.setattr(planner, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(planner.rule_planner, "min_confidence", 2.0)
+    planner._plan_cache.clear()
+    async def run():
+        first = await planner.plan_qloo_call("coffee shop in Brooklyn", "")
+        first["params"]["limit"] = 99
+        second = await planner.plan_qloo_call("  Coffee shop in brooklyn! ", "")
+        return second
+    second = asyncio.run(run())
+    assert completions.calls == 1
+    assert "limit" not in second["params"]
+    assert planner.normalize_query("Coffee   shop, in BROOKLYN!!") == "coffee shop in brooklyn"
+    path = str(tmp_path / "plans.json")
+    assert planner.save_plan_cache(path) == 1
+    assert planner.save_plan_cache(str(tmp_path / "missing" / "plans.json")) == 0
+    malformed = tmp_path / "malformed.json"
+    for content in ('{"a": 1}', '["x"]', '[{"query": "x"}]', '[{"query": "x", "plan": {}, "expires_at": "soon"}]'):
+        malformed.write_text(content)
+        assert planner.load_plan_cache(str(malformed)) == 0
+    malformed.write_text(json.dumps(json.loads(open(path).read()) + [{"query": "x", "plan": "y", "expires_at": 1e12}]))
+    assert planner.load_plan_cache(str(malformed)) == 1
+    planner._plan_cache.clear()
+    assert planner.load_plan_cache(path) == 1
+    asyncio.run(planner.plan_qloo_call("coffee shop in Brooklyn.", ""))
+    assert completions.calls == 1
+    planner._plan_cache.clear()
+def test_rule_planner_answers_common_queries_without_the_llm_or_retrieval(monkeypatch):
+    completions = CountingCompletions()
+    monkeypatch.setattr(planner, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    planner._plan_cache.clear()
+    retrievals = []
+    async def load_context():
+        retrievals.append(1)
+        return "Retriever tags:"
+    async def run(query):
+        return await planner.plan_qloo_call(query, load_context)
+    plan = asyncio.run(run("Best cocktail bars in Chicago!"))
+    assert plan["params"]["filter.location.query"] == "Chicago, IL"
+    assert plan["params"]["signal.interests.tags"] == "urn:tag:venue_type:cocktail_bar"
+    assert completions.calls == 0 and retrievals == []
+    asyncio.run(run("jazz clubs in Lisbon"))
+    assert completions.calls == 1 and retrievals == [1]
+    planner._plan_cache.clear()
+def test_rule_planner_follows_the_prompt_rules_and_few_shot_locations():
+    rules = planner.RulePlanner.from_files()
+    plan, confidence = rules.plan("coffee shop in Brooklyn")
+    assert confidence == 1.0
+    assert plan["params"]["signal.interests.tags"] == planner.VENUE_TYPE_RULES["coffee shop"]
+    plan, confidence = rules.plan("Japanese city-pop record stores in SoHo")
+    assert plan["params"]["filter.location.query"] == "SoHo, New York, NY"
+    assert plan["params"]["signal.interests.tags"] == "urn:tag:genre:music:japanese_city_pop,urn:tag:venue_type:retail"
+    assert rules.plan("somewhere moody for a first date") == (None, 0.0)
+    assert rules.plan("a rooftop cocktail bar in Downtown LA")[1] == 0.0
+    assert rules.extract_location("matcha pop-ups around east austin") == "East Austin, TX"
+    assert rules.extract_location("matcha pop-ups") == "New York, NY"
+    assert '"coffee shop" → urn:tag:venue_type:restaurant,urn:tag:taste:coffee' in planner.VENUE_RULE_LINES
+def test_prompt_has_a_stable_prefix_and_budgeted_context(monkeypatch):
+    completions = CountingCompletions()
+    monkeypatch.setattr(planner, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    snippets = context.rank_snippets(
+        [{"text": "Cafe (venue_type) -> urn:tag:venue_type:cafe", "score": 0.71},
+         {"text": "Bar (venue_type) -> urn:tag:venue_type:bar", "score": 0.52}],
+        [{"text": "USER: matcha pop-up\nQLOO: {}" + " filler" * 400, "score": 0.64}]
+    )
+    assert [s["score"] for s in snippets] == [0.71, 0.64, 0.52]
+    async def run():
+        await planner._plan_with_llm("somewhere moody in Lisbon", snippets)
+        await planner._plan_with_llm("a quiet cafe for reading", "Retriever tags:")
+    asyncio.run(run())
+    first, second = completions.messages
+    assert first[0] == second[0] == {"role": "system", "content": planner.PLANNER_INSTRUCTIONS}
+    assert "User query" not in planner.PLANNER_INSTRUCTIONS
+    assert "urn:tag:venue_type:cafe" in first[1]["content"]
+    assert "matcha" not in first[1]["content"] and "urn:tag:venue_type:bar" not in first[1]["content"]
+    assert first[1]["content"].endswith("User query: somewhere moody in Lisbon")
+    builder = PromptBuilder("Test", "Static instructions", "gpt-4o-mini", context_budget=0)
+    assert builder.build("hello", snippets)[1]["content"] == "User query: hello"
+    assert builder.stats()["snippets_dropped"] == 3
+    assert builder.prefix_tokens == count_tokens("Static instructions", "gpt-4o-mini") > 0
@@ -0,0 +1,220 @@
+import asyncio
+import httpx
+import qloo_client
+def make_transport(calls):
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"results": {"entities": [{"id": "e1", "name": "Katz's Delicatessen"}]}})
+    return httpx.MockTransport(handler)
+def test_shared_client_is_reused_across_calls():
+    """Every call_qloo goes through the one pooled client opened at startup"""
+    async def run():
+        calls = []
+        client = await qloo_client.start_qloo_client(make_transport(calls))
+        try:
+            params = {'filter.type': 'urn:entity:place', 'limit': 5}
+            first = await qloo_client.call_qloo('/v2/insights', params, use_cache=False)
+            await qloo_client.call_qloo('/v2/insights', params, use_cache=False)
+            assert qloo_client.get_qloo_client() is client
+            assert first["results"]["entities"][0]["id"] == "e1"
+            assert len(calls) == 2
+            assert str(calls[0].url).startswith(f"{qloo_client.BASE}/v2/insights")
+            assert "x-api-key" in calls[0].headers
+        finally:
+            await qloo_client.close_qloo_client()
+        assert client.is_closed
+        assert qloo_client._client is None
+    asyncio.run(run())
+def test_cache_canonicalizes_params_and_isolates_callers():
+    """'limit': 20 and 'limit': '20' share an entry, and mutating a result never leaks into the cache"""
+    async def run():
+        calls = []
+        await qloo_client.start_qloo_client(make_transport(calls))
+        qloo_client.clear_qloo_cache()
+        try:
+            first = await qloo_client.call_qloo('/v2/insights', {'filter.type': 'urn:entity:place', 'limit': 20})
+            first["results"]["entities"][0]["taste_match_score"] = 0.9
+            second = await qloo_client.call_qloo('/v2/insights', {'limit': '20', 'filter.type': 'urn:entity:place'})
+            assert len(calls) == 1
+            assert "taste_match_score" not in second["results"]["entities"][0]
+            assert qloo_client.qloo_cache_stats()["hits"] >= 1
+        finally:
+            await qloo_client.close_qloo_client()
+            qloo_client.clear_qloo_cache()
+    asyncio.run(run())
+def test_stale_entry_is_served_while_revalidating():
+    async def run():
+        calls = []
+        await qloo_client.start_qloo_client(make_transport(calls))
+        cache = qloo_client._response_cache
+        key = qloo_client.qloo_cache_key('/v2/insights', {'limit': 5})
+        cache.set(key, b'{"results": {"entities": []}}', ttl=-1, stale_ttl=60)
+        try:
+            stale = await qloo_client.call_qloo('/v2/insights', {'limit': 5})
+            assert stale["results"]["entities"] == []
+            await qloo_client._revalidating[key]
+            fresh = await qloo_client.call_qloo('/v2/insights', {'limit': 5})
+            assert fresh["results"]["entities"][0]["id"] == "e1"
+            assert len(calls) == 1
+        finally:
+            await qloo_client.close_qloo_client()
+            qloo_client.clear_qloo_cache()
+    asyncio.run(run())
+def make_slow_transport(calls, delay=0.05, status=200):
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(delay)
+        return httpx.Response(status, json={"results": {"entities": [{"id": "e1", "name": "MoMA"}]}})
+    return httpx.MockTransport(handler)
+def test_concurrent_identical_calls_share_one_upstream_request():
+    async def run():
+        calls = []
+        await qloo_client.start_qloo_client(make_slow_transport(calls))
+        qloo_client.clear_qloo_cache()
+        try:
+            params = {'filter.location.query': 'New York, NY', 'limit': '20'}
+            results = await asyncio.gather(*[qloo_client.call_qloo('/v2/insights', dict(params)) for _ in range(25)])
+            assert len(calls) == 1
+            assert all(r["results"]["entities"][0]["id"] == "e1" for r in results)
+            assert len({id(r) for r in results}) == 25
+            assert not qloo_client._inflight
+        finally:
+            await qloo_client.close_qloo_client()
+            qloo_client.clear_qloo_cache()
+    asyncio.run(run())
+def test_singleflight_propagates_errors_and_survives_waiter_cancellation():
+    async def run():
+        calls = []
+        await qloo_client.start_qloo_client(make_slow_transport(calls, status=503))
+        qloo_client.clear_qloo_cache()
+        try:
+            results = await asyncio.gather(*[qloo_client.call_qloo('/v2/insights', {'limit': 3}) for _ in range(5)],
+                                           return_exceptions=True)
+            assert len(calls) == 1
+            assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+            await qloo_client.close_qloo_client()
+            calls.clear()
+            await qloo_client.start_qloo_client(make_slow_transport(calls))
+            cancelled = asyncio.create_task(qloo_client.call_qloo('/v2/insights', {'limit': 4}))
+            survivor = asyncio.create_task(qloo_client.call_qloo('/v2/insights', {'limit': 4}))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            result = await survivor
+            assert result["results"]["entities"][0]["name"] == "MoMA"
+            assert cancelled.cancelled()
+            assert len(calls) == 1
+        finally:
+            await qloo_client.close_qloo_client()
+            qloo_client.clear_qloo_cache()
+    asyncio.run(run())
+def test_entity_store_interns_tags_and_keeps_missing_fields_unset():
+    """Records share interned tag/keyword ids across responses; absent numbers stay None for caller defaults"""
+    response = {"results": {"entities": [
+        {"id": "a", "name": "Katz's Delicatessen", "popularity": 0.9, "query": {"affinity": 0.8, "distance": 120},
+         "location": {"lat": 40.72, "lng": -73.98},
+         "tags": [{"type": "urn:tag:genre:place", "name": "Deli"}, {"type": "urn:tag:amenity:place", "name": "Cafe"}],
+         "properties": {"keywords": [{"name": "Pastrami"}, {"name": "Rye"}], "description": "Classic"}},
+        {"id": "b", "name": "Ruins", "location": {"lat": "north", "lng": -73.9},
+         "tags": [{"type": "urn:tag:genre:place", "name": "Deli"}]}
+    ]}}
+    first, second = qloo_client.EntityStore.from_response(response)
+    again = qloo_client.EntityStore.from_response(response).records[0]
+    assert first.tag_ids == again.tag_ids and first.keyword_ids == again.keyword_ids
+    assert second.tag_ids == first.tag_ids[:1]
+    assert qloo_client.TAG_VOCAB.strings[first.tag_ids[0]] == "urn:tag:genre:place:Deli"
+    assert qloo_client.TAG_VOCAB.lowered[first.tag_ids[0]] == "deli"
+    assert first.tag_names() == ["Deli", "Cafe"] and first.keyword_names(1) == ["Pastrami"]
+    assert (first.affinity, first.distance, first.lat, first.lng) == (0.8, 120.0, 40.72, -73.98)
+    assert (second.popularity, second.affinity, second.distance, second.lat, second.lng) == (None, None, None, None, None)
+    assert second.description == "" and second.raw is response["results"]["entities"][1]
+CLUSTER_SCRIPT = """
+import json, qloo_client
+entities = [{"id": f"e{i}", "name": f"Venue {i} Jazz Cafe", "popularity": (i % 7) / 7,
+             "query": {"affinity": (i % 5) / 5, "distance": 300 * i},
+             "tags": [{"type": "urn:tag:genre:place", "name": ["Cafe", "Bar", "Art Museum", "Deli"][i % 4]}],
+             "properties": {"keywords": [{"name": "cozy"}] * (i % 6)}} for i in range(40)]
+print(json.dumps(qloo_client.top_clusters({"results": {"entities": entities}}, k=5)))
+"""
+def test_cluster_affinities_are_identical_across_processes():
+    """Affinity variance comes from a stable digest, so differently salted interpreters agree"""
+    import os
+    import subprocess
+    import sys
+    outputs = []
+    for seed in ("0", "1", "12345"):
+        env = {**os.environ, "PYTHONHASHSEED": seed}
+        result = subprocess.run([sys.executable, "-c", CLUSTER_SCRIPT], env=env, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        outputs.append(result.stdout.strip().splitlines()[-1])
+    assert outputs[0] == outputs[1] == outputs[2]
+    record = qloo_client.EntityRecord({"id": "memo", "name": "Memo Hall", "query": {"affinity": 0.7}})
+    first = qloo_client.calculate_realistic_affinity(record)
+    hits = qloo_client.affinity_memo_stats()["hits"]
+    assert qloo_client.calculate_realistic_affinity(record) == first
+    assert qloo_client.affinity_memo_stats()["hits"] == hits + 1
+def make_cluster_entities(n):
+    tag_names = ["Japanese", "Cocktail Bar", "Art Gallery", "Coffee", "Park"]
+    return [{"id": f"c{i}", "name": f"Spot {i}", "popularity": (i % 4) / 4, "query": {"affinity": [0.9, 0.6, 0.6, 0.3][i % 4]},
+             "tags": [{"type": "urn:tag:genre:place", "name": tag_names[i % 5]}]} for i in range(n)]
+def test_cluster_aggregator_pages_match_top_clusters():
+    """Feeding pages one at a time gives the same snapshot as clustering the whole list, with bounded examples"""
+    entities = make_cluster_entities(57)
+    aggregator = qloo_client.ClusterAggregator()
+    snapshots = []
+    for start in range(0, len(entities), 10):
+        aggregator.add_page({"results": {"entities": entities[start:start + 10]}})
+        snapshots.append(aggregator.snapshot(k=5))
+    assert snapshots[-1] == qloo_client.top_clusters({"results": {"entities": entities}}, k=5)
+    assert snapshots[0] == qloo_client.top_clusters({"results": {"entities": entities[:10]}}, k=5)
+    assert len(aggregator) == 57
+    assert all(len(state.examples) <= qloo_client.CLUSTER_EXAMPLES for state in aggregator._clusters.values())
+    japanese = next(c for c in snapshots[-1] if c["cluster_name"] == "Japanese Culture Enthusiasts")
+    assert [e["name"] for e in japanese["example_entities"]] == ["Spot 0", "Spot 20", "Spot 40", "Spot 5"]
+def test_fan_out_bounds_concurrency_and_merge_dedupes_by_id():
+    in_flight, peak = [0], [0]
+    async def handler(request):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.05)
+        in_flight[0] -= 1
+        group = request.url.params.get("filter.tags", "base")
+        if group == "broken":
+            return httpx.Response(500)
+        entities = [{"id": "shared", "name": "Shared Hall"}, {"id": f"only-{group}", "name": group}]
+        return httpx.Response(200, json={"results": {"entities": entities}})
+    async def run():
+        await qloo_client.start_qloo_client(httpx.MockTransport(handler))
+        try:
+            param_sets = [{"limit": 20}] + [{"limit": 20, "filter.tags": g} for g in ("a", "b", "broken", "c")]
+            started = asyncio.get_running_loop().time()
+            responses = await qloo_client.fan_out_qloo("/v2/insights", param_sets, concurrency=2)
+            return responses, asyncio.get_running_loop().time() - started
+        finally:
+            await qloo_client.close_qloo_client()
+            qloo_client.clear_qloo_cache()
+    responses, elapsed = asyncio.run(run())
+    assert peak[0] == 2
+    assert elapsed < 5 * 0.05
+    assert isinstance(responses[3], Exception)
+    ok = [qloo_client.EntityStore.from_response(r) for r in responses if not isinstance(r, Exception)]
+    merged = qloo_client.EntityStore.merged(ok)
+    assert [r.id for r in merged] == ["shared", "only-base", "only-a", "only-b", "only-c"]
+def test_vocabularies_drop_strings_no_live_entity_uses(monkeypatch):
+    from tag_index import TagBitsets, CULTURAL_TAGS
+    vocabs = (qloo_client.TAG_VOCAB, qloo_client.KEYWORD_VOCAB)
+    caps = [len(vocab) + 20 for vocab in vocabs]
+    for vocab, cap in zip(vocabs, caps):
+        monkeypatch.setattr(vocab, "max_size", cap)
+        monkeypatch.setattr(vocab, "limit", cap)
+    def entity(i):
+        return {"id": f"v{i}", "name": f"Venue {i}", "tags": [{"type": "urn:tag:genre:place", "name": f"Genre {i}"}],
+                "properties": {"keywords": [{"name": f"keyword {i}"}]}}
+    kept = qloo_client.EntityRecord({**entity("kept"), "tags": [{"type": "urn:tag:genre:place", "name": "Deli"}]})
+    assert TagBitsets([kept]).any(CULTURAL_TAGS).tolist() == [True]
+    generation = qloo_client.TAG_VOCAB.generation
+    for i in range(200):
+        qloo_client.EntityRecord(entity(i))
+    assert qloo_client.TAG_VOCAB.generation > generation
+    assert all(len(vocab) <= 2 * cap for vocab, cap in zip(vocabs, caps))
+    assert kept.tag_names() == ["Deli"] and kept.keyword_names() == ["keyword kept"]
+    assert TagBitsets([kept]).any(CULTURAL_TAGS).tolist() == [True]
@@ -0,0 +1,115 @@
+import random
+from qloo_client import EntityRecord
+from scoring import VenueScorer
+# The per-entity loops get_venues used before the batched engine
+def reference_score(entity, user_tastes):
+    score = 0.5
+    venue_name = entity.get('name', '').lower()
+    venue_tags = entity.get('tags', [])
+    venue_keywords = entity.get('properties', {}).get('keywords', [])
+    indicator_lists = {
+        'artist:': ['music', 'concert', 'venue', 'club', 'bar', 'lounge'],
+        'beverage:': ['bar', 'cafe', 'coffee', 'brewery', 'wine', 'cocktail'],
+        'food': ['restaurant', 'kitchen', 'dining', 'food', 'eatery', 'bistro']
+    }
+    for taste in user_tastes:
+        taste_name = taste.get('name', '').lower()
+        taste_id = taste.get('id', '')
+        if any(word in venue_name for word in taste_name.split() if len(word) > 3):
+            score += 0.2
+        if 'artist:' in taste_id:
+            indicators = indicator_lists['artist:']
+        elif 'beverage:' in taste_id:
+            indicators = indicator_lists['beverage:']
+        elif 'food:' in taste_id or 'cuisine:' in taste_id:
+            indicators = indicator_lists['food']
+        else:
+            indicators = []
+        if any(i in venue_name or any(i in tag.get('name', '').lower() for tag in venue_tags) for i in indicators):
+            score += 0.15
+        for tag in venue_tags:
+            if any(word in tag.get('name', '').lower() for word in taste_name.split() if len(word) > 3):
+                score += 0.1
+        for keyword in venue_keywords[:5]:
+            if any(word in keyword.get('name', '').lower() for word in taste_name.split() if len(word) > 3):
+                score += 0.05
+    return min(score, 0.95)
+def reference_matches(entity, tastes):
+    cultural_matches = []
+    venue_tags = entity.get('tags', [])
+    venue_keywords = entity.get('properties', {}).get('keywords', [])
+    venue_name_lower = entity.get('name', '').lower()
+    mappings = {
+        'contemporary art': ['gallery', 'museum', 'art', 'creative', 'design'],
+        'specialty coffee': ['coffee', 'cafe', 'espresso', 'roast', 'brew'],
+        'craft beer': ['brewery', 'beer', 'tap', 'ale', 'lager', 'craft'],
+        'vintage fashion': ['vintage', 'boutique', 'thrift', 'retro', 'second hand'],
+        'fine dining': ['restaurant', 'dining', 'cuisine', 'chef', 'gourmet'],
+        'live music': ['music', 'concert', 'live', 'band', 'venue', 'stage'],
+        'wine': ['wine', 'vineyard', 'tasting', 'cellar', 'sommelier'],
+        'street food': ['food truck', 'street', 'casual', 'quick', 'takeout']
+    }
+    for taste in tastes[:4]:
+        taste_name = taste.get('name', '').lower()
+        taste_type = taste.get('type', '').lower()
+        if any(word in venue_name_lower for word in taste_name.split() if len(word) > 2):
+            cultural_matches.append(taste.get('name', ''))
+            continue
+        tag_match = False
+        for tag in venue_tags:
+            tag_name = tag.get('name', '').lower()
+            tag_type = tag.get('type', '').lower()
+            if any(word in tag_name for word in taste_name.split() if len(word) > 2):
+                tag_match = True
+            elif taste_type == 'food_beverage' and tag_type in ['venue_type', 'business_type'] and any(
+                    w in tag_name for w in ['restaurant', 'cafe', 'coffee', 'bar', 'dining', 'food', 'drink']):
+                tag_match = True
+            elif taste_type == 'visual_arts' and tag_type in ['venue_type', 'category'] and any(
+                    w in tag_name for w in ['gallery', 'museum', 'art', 'studio', 'exhibition', 'creative']):
+                tag_match = True
+            if tag_match:
+                cultural_matches.append(taste.get('name', ''))
+                break
+        if tag_match:
+            continue
+        for keyword in venue_keywords[:8]:
+            keyword_name = keyword.get('name', '').lower()
+            if any(word in keyword_name or keyword_name in word for word in taste_name.split() if len(word) > 3):
+                cultural_matches.append(taste.get('name', ''))
+                break
+        if taste_name in mappings:
+            if any(m in venue_name_lower or any(m in t.get('name', '').lower() for t in venue_tags) or
+                   any(m in k.get('name', '').lower() for k in venue_keywords) for m in mappings[taste_name]):
+                cultural_matches.append(taste.get('name', ''))
+    return list(dict.fromkeys(cultural_matches))
+WORDS = ['jazz', 'music', 'coffee', 'specialty', 'roast', 'art', 'contemporary', 'gallery', 'museum', 'craft', 'beer',
+         'wine', 'bar', 'lounge', 'kitchen', 'bistro', 'live', 'vintage', 'thrift', 'fine', 'dining', 'street', 'food',
+         'the', 'east', 'village', 'club', 'studio', 'venue', 'brewery', 'cafe', 'chef', 'ale', 'co', '']
+TASTES = [
+    {"id": "urn:entity:artist:jazz", "name": "Jazz Music", "type": "music"},
+    {"id": "urn:entity:beverage:specialty_coffee", "name": "Specialty Coffee", "type": "food_beverage"},
+    {"id": "urn:entity:art:contemporary_art", "name": "Contemporary Art", "type": "visual_arts"},
+    {"id": "urn:entity:food:fine_dining", "name": "Fine Dining", "type": "food_beverage"},
+    {"id": "craft_beer", "name": "Craft Beer", "type": "food_beverage"},
+    {"id": "urn:entity:cuisine:street", "name": "Street Food", "type": ""},
+    {"id": "wine", "name": "Wine", "type": "food_beverage"},
+]
+def phrase(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, n))).title()
+def make_entity(rng):
+    return {
+        "name": phrase(rng, 3),
+        "tags": [{"name": phrase(rng, 2), "type": rng.choice(["venue_type", "category", "business_type", "urn:tag:genre:place"])}
+                 for _ in range(rng.randint(0, 6))],
+        "properties": {"keywords": [{"name": rng.choice(WORDS + ['ar', 'musi', 'special'])} for _ in range(rng.randint(0, 10))]}
+    }
+def test_scores_and_explanations_match_reference_loops():
+    rng = random.Random(11)
+    for _ in range(60):
+        entities = [make_entity(rng) for _ in range(rng.randint(0, 40))]
+        tastes = rng.sample(TASTES, rng.randint(1, len(TASTES)))
+        records = [EntityRecord(e) for e in entities]
+        scorer = VenueScorer(records, tastes)
+        for entity, record in zip(entities, records):
+            assert abs(scorer.score_of(record) - reference_score(entity, tastes)) < 1e-9, entity
+            assert scorer.cultural_matches(record) == reference_matches(entity, tastes), entity
@@ -0,0 +1,105 @@
+import asyncio
+import time
+import httpx
+import qloo_client
+from search_index import SearchIndex, tokenize
+def place(entity_id, name, tags=(), keywords=(), popularity=0.5):
+    return {"id": entity_id, "name": name, "popularity": popularity,
+            "tags": [{"type": "urn:tag:genre:place", "name": t} for t in tags],
+            "properties": {"keywords": [{"name": k} for k in keywords]}}
+def test_prefix_and_multi_token_queries_rank_names_first():
+    index = SearchIndex()
+    index.add_response({"results": {"entities": [
+        place("katz", "Katz's Delicatessen", tags=["Deli"], keywords=["pastrami"], popularity=0.9),
+        place("russ", "Russ & Daughters", tags=["Deli", "Appetizing"]),
+        place("moma", "Museum of Modern Art", tags=["Art Museum"], keywords=["katz exhibit"]),
+        place("cafe", "Café Sabarsky", tags=["Cafe"], popularity=0.4),
+    ]}})
+    assert [e["id"] for e in index.search("katz")] == ["katz", "moma"]
+    assert [e["id"] for e in index.search("katz deli")] == ["katz"]
+    assert [e["id"] for e in index.search("del")] == ["katz", "russ"]
+    assert [e["id"] for e in index.search("cafe sab")] == ["cafe"]
+    assert index.search("guggenheim") == []
+    assert tokenize("Café  Sabarsky's") == ["cafe", "sabarsky", "s"]
+    assert index.stats()["hits"] == 4 and index.stats()["misses"] == 1
+def test_reindexing_and_eviction_drop_stale_tokens():
+    index = SearchIndex(max_entities=2)
+    index.add(place("a", "Blue Note", tags=["Jazz Club"]))
+    index.add(place("a", "Blue Note Jazz"))
+    assert [e["id"] for e in index.search("club")] == []
+    index.add(place("b", "Smalls"))
+    index.add(place("c", "Village Vanguard"))
+    assert "a" not in index and len(index) == 2
+    assert index.search("blue") == [] and index.stats()["evictions"] == 1
+    assert "blue" not in index._vocabulary
+def test_upstream_responses_feed_the_index():
+    async def run():
+        index = SearchIndex()
+        qloo_client.add_response_listener(index.on_qloo_payload)
+        def handler(request):
+            return httpx.Response(200, json={"results": {"entities": [place("ml", "Mercato Latino")]}})
+        await qloo_client.start_qloo_client(httpx.MockTransport(handler))
+        qloo_client.clear_qloo_cache()
+        try:
+            await qloo_client.call_qloo('/v2/insights', {'limit': 1})
+        finally:
+            qloo_client.remove_response_listener(index.on_qloo_payload)
+            await qloo_client.close_qloo_client()
+            qloo_client.clear_qloo_cache()
+        assert [e["id"] for e in index.search("merc")] == ["ml"]
+    asyncio.run(run())
+def test_typeahead_latency_on_a_large_catalog():
+    words = ["blue", "note", "jazz", "club", "deli", "museum", "garden", "market", "house", "kitchen", "gallery", "bar"]
+    index = SearchIndex()
+    for i in range(20000):
+        name = f"{words[i % 12].title()} {words[(i // 12) % 12].title()} {i}"
+        index.add(place(str(i), name, tags=[words[(i // 7) % 12]], keywords=[words[(i // 5) % 12]]))
+    started = time.perf_counter()
+    for query in ("blue n", "jazz club 1", "kitch", "gallery mar", "123"):
+        assert index.search(query)
+    assert (time.perf_counter() - started) / 5 < 0.05
+def test_fuzzy_search_tolerates_typos_and_partial_words():
+    index = SearchIndex()
+    index.add_response({"results": {"entities": [
+        place("gugg", "Solomon R. Guggenheim Museum", tags=["Art Museum"], popularity=0.9),
+        place("katz", "Katz's Delicatessen", tags=["Deli"]),
+        place("whit", "Whitney Museum of American Art", tags=["Art Museum"]),
+        place("vang", "Village Vanguard", tags=["Jazz Club"]),
+    ]}})
+    assert index.search("guggenhiem") == []
+    assert [e["id"] for e in index.fuzzy_search("guggenhiem")] == ["gugg"]
+    assert [e["id"] for e in index.fuzzy_search("kats deli")] == ["katz"]
+    assert [e["id"] for e in index.fuzzy_search("whitny musuem")] == ["whit"]
+    assert [e["id"] for e in index.fuzzy_search("jaz clb")] == ["vang"]
+    assert index.fuzzy_search("xylophone") == []
+    index.remove("gugg")
+    assert index.fuzzy_search("guggenhiem") == []
+def test_trigram_index_answers_the_same_before_and_after_compaction():
+    from fuzzy_index import TrigramIndex, prefix_distance
+    texts = ["blue note", "blue bottle coffee", "bluestone lane", "smalls jazz club", "jazz standard", "mezzrow"]
+    pending, compacted = TrigramIndex(merge_threshold=10 ** 6), TrigramIndex(merge_threshold=2)
+    for i, text in enumerate(texts):
+        pending.add(text, str(i))
+        compacted.add(text, str(i))
+    compacted.compact()
+    for query in (["blu"], ["blue", "botle"], ["jaz"], ["mezrow"], ["smals", "jazz"]):
+        assert pending.search(query) == compacted.search(query) != []
+    assert prefix_distance("guggenhiem", "guggenheim", 2) == 1
+    assert prefix_distance("deli", "delicatessen", 1) == 0
+    assert prefix_distance("museum", "moma", 2) == 3
+def test_fuzzy_search_finds_live_matches_past_evictions():
+    index = SearchIndex(max_entities=10)
+    for i in range(200):
+        index.add(place(f"annex-{i}", f"Guggenheim Annex {i}"))
+    index.add(place("gugg", "Guggenheim Museum", popularity=0.9))
+    found = [e["id"] for e in index.fuzzy_search("guggenhiem")]
+    assert found[0] == "gugg" and len(found) == 10
+    names = index._fuzzy_names
+    assert len(names) == 10 and len(names.texts) < 20
+    masked = SearchIndex()
+    for i in range(200):
+        masked.add(place(f"annex-{i}", f"Guggenheim Annex {i}"))
+    masked._fuzzy_names.max_dead_fraction = 1.0
+    for i in range(190):
+        masked.remove(f"annex-{i}")
+    assert len(masked.fuzzy_search("guggenhiem")) == 10
@@ -0,0 +1,37 @@
+import numpy as np
+from semantic_cache import SemanticCache
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+def test_nearest_entry_above_threshold_in_the_same_partition_hits():
+    cache = SemanticCache(4, threshold=0.9, ttl=60)
+    cache.store(unit(1, 0, 0), "coffee", "Brooklyn, NY")
+    cache.store(unit(0, 1, 0), "vinyl", "Brooklyn, NY")
+    assert cache.lookup(unit(1, 0.2, 0), "Brooklyn, NY")[0] == "coffee"
+    assert cache.lookup(unit(1, 0.2, 0), "Chicago, IL") == (None, 0.0)
+    value, similarity = cache.lookup(unit(1, 1, 0), "Brooklyn, NY")
+    assert value is None and 0.7 < similarity < 0.71
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["similarity_histogram"]["0.98-1.00"] == 1 and stats["similarity_histogram"]["0.70-0.80"] == 1
+def test_entries_expire_and_the_least_recently_used_slot_is_reused():
+    clock = FakeClock()
+    cache = SemanticCache(2, threshold=0.99, ttl=10, clock=clock)
+    cache.store(unit(1, 0), "a")
+    clock.now = 1
+    cache.store(unit(0, 1), "b")
+    clock.now = 2
+    assert cache.lookup(unit(1, 0))[0] == "a"
+    cache.store(unit(1, 1), "c")
+    assert cache.evictions == 1
+    assert cache.lookup(unit(0, 1))[0] is None
+    assert cache.lookup(unit(1, 0))[0] == "a"
+    clock.now = 20
+    assert cache.lookup(unit(1, 0))[0] is None
+    cache.store(unit(0, 1), "d")
+    assert cache.expirations == 1 and len(cache) == 2
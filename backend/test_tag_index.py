@@ -0,0 +1,41 @@
+import random
+import numpy as np
+from qloo_client import EntityRecord, TAG_VOCAB
+from tag_index import TagBitsets, TagMask, CULTURAL_TAGS, FOOD_TAGS, CATEGORY_TAGS, popcount
+TYPES = ['urn:tag:category:place', 'urn:tag:genre:place', 'urn:tag:amenity:place', 'urn:tag:offerings:place',
+         'venue_type', 'business_type', 'Category']
+NAMES = ['Restaurant', 'Art Museum', 'Deli', 'Bar', 'Cafe', 'Happy Hour', 'Monument', 'Park', 'Coffee Shop',
+         'Wifi', 'Gallery', 'Food Hall', 'Arena'] + [f'Tag {i}' for i in range(150)]
+def make_records(rng, n):
+    return [EntityRecord({'id': str(i), 'name': f'Venue {i}', 'tags': [
+        {'type': rng.choice(TYPES), 'name': rng.choice(NAMES)} for _ in range(rng.randint(0, 8))]}) for i in range(n)]
+def test_bitset_queries_match_per_tag_scans():
+    rng = random.Random(5)
+    records = make_records(rng, 300)
+    late = TagMask('late', lambda tag_type, name: name.startswith('Tag 1'))
+    bitsets = TagBitsets(records)
+    assert TAG_VOCAB and bitsets.width * 64 >= len(TAG_VOCAB)
+    for mask in (CULTURAL_TAGS, FOOD_TAGS, CATEGORY_TAGS, late):
+        expected_any = [any(t in mask for t in r.tag_ids) for r in records]
+        expected_count = [len({t for t in r.tag_ids if t in mask}) for r in records]
+        assert bitsets.any(mask).tolist() == expected_any
+        assert bitsets.count(mask).tolist() == expected_count
+        counts = {}
+        for r in records:
+            for t in {t for t in r.tag_ids if t in mask}:
+                counts[t] = counts.get(t, 0) + 1
+        assert bitsets.tag_counts(mask) == counts
+def test_masks_pick_up_tags_interned_after_first_use():
+    records = make_records(random.Random(1), 3)
+    TagBitsets(records).any(CULTURAL_TAGS)
+    fresh = EntityRecord({'id': 'x', 'name': 'x', 'tags': [{'type': 'urn:tag:genre:place', 'name': 'Brand New Deli'}]})
+    assert TagBitsets([fresh]).any(CULTURAL_TAGS).tolist() == [True]
+def test_popcount_matches_python_bit_count():
+    words = np.array([[0, 1, 2 ** 63 + 5], [2 ** 64 - 1, 0, 7]], dtype=np.uint64)
+    assert popcount(words).tolist() == [sum(bin(int(w)).count('1') for w in row) for row in words]
+def test_selected_rows_match_a_fresh_index():
+    records = make_records(random.Random(9), 50)
+    subset = records[::-3]
+    selected = TagBitsets(records).select(subset)
+    assert selected.records == subset
+    assert np.array_equal(selected.matrix, TagBitsets(subset).matrix)
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import taste_extractor
+from taste_extractor import TasteExtractor, TasteVocabulary, TASTE_KEYWORDS
+TAGS = [
+    {"id": "urn:tag:beverage:matcha", "name": "Matcha", "type": "beverage"},
+    {"id": "urn:tag:beverage:third_wave_coffee", "name": "Third-wave Coffee", "type": "beverage"},
+    {"id": "urn:tag:venue_type:record_store", "name": "Record Store", "type": "venue_type"}
+]
+class CountingCompletions:
+    def __init__(self, content):
+        self.calls = 0
+        self.content = content
+    async def create(self, **kwargs):
+        self.calls += 1
+        if isinstance(self.content, Exception):
+            raise self.content
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+def fake_llm(monkeypatch, content):
+    completions = CountingCompletions(content)
+    monkeypatch.setattr(taste_extractor, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return completions
+def test_vocabulary_matches_whole_phrases_longest_first():
+    vocabulary = TasteVocabulary(TASTE_KEYWORDS, TAGS)
+    tastes, confidence = vocabulary.match("Record stores and a THIRD WAVE coffee bar", "New York, NY")
+    assert [t["name"] for t in tastes] == ["Record Store", "Third-wave Coffee"]
+    assert [t["id"] for t in tastes] == ["record_store", "third_wave_coffee"]
+    assert confidence < 1.0
+    assert vocabulary.match("party in the park", "")[0] == []
+    assert vocabulary.match("jazz in Brooklyn", "Brooklyn, NY")[1] == 1.0
+def test_confident_messages_never_reach_the_llm(monkeypatch):
+    completions = fake_llm(monkeypatch, "[]")
+    extractor = TasteExtractor(TasteVocabulary(TASTE_KEYWORDS, TAGS), min_confidence=0.6)
+    result = asyncio.run(extractor.extract("I love jazz clubs and rooftop cocktails", ["Jazz Music"], "New York, NY"))
+    assert completions.calls == 0
+    assert result["tier"] == "local"
+    assert [t["name"] for t in result["extracted_tastes"]] == ["Rooftop Venues", "Craft Cocktails"]
+def test_uncertain_messages_go_to_the_llm_once_per_normalized_request(monkeypatch):
+    answer = [{"id": "moody_cinema", "name": "Moody Cinema", "color": "#333333"}]
+    completions = fake_llm(monkeypatch, json.dumps(answer))
+    extractor = TasteExtractor(TasteVocabulary(TASTE_KEYWORDS, TAGS), min_confidence=0.6)
+    async def run():
+        first = await extractor.extract("something moody and cinematic", ["Matcha"], "Brooklyn, NY")
+        first["extracted_tastes"][0]["name"] = "mutated"
+        second = await extractor.extract("  Something moody, and CINEMATIC! ", ["matcha"], "brooklyn ny")
+        third = await extractor.extract("something moody and cinematic", [], "Brooklyn, NY")
+        return first, second, third
+    first, second, third = asyncio.run(run())
+    assert (first["tier"], second["tier"], third["tier"]) == ("llm", "cache", "llm")
+    assert second["extracted_tastes"] == answer
+    assert completions.calls == 2
+    assert extractor.stats()["tiers"] == {"local": 0, "cache": 1, "llm": 2, "fallback": 0}
+def test_llm_failures_fall_back_to_keywords_without_caching(monkeypatch):
+    completions = fake_llm(monkeypatch, "not json")
+    extractor = TasteExtractor(TasteVocabulary(TASTE_KEYWORDS, TAGS), min_confidence=0.6)
+    async def run():
+        return [await extractor.extract("a moody museum evening", [], "") for _ in range(2)]
+    results = asyncio.run(run())
+    assert [r["tier"] for r in results] == ["fallback", "fallback"]
+    assert results[0]["extracted_tastes"] == [TASTE_KEYWORDS["museum"]]
+    assert completions.calls == 2
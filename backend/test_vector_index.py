@@ -0,0 +1,32 @@
+import os
+import numpy as np
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import index
+from configs import setting
+from embeddings import normalize_rows
+from vector_index import VectorIndex
+def make_docs(n):
+    docs = []
+    for i in range(n):
+        kind = "tag" if i % 3 else "fewshot"
+        docs.append({"id": f"doc-{i}", "text": f"doc {i}", "metadata": {"kind": kind}})
+    return docs
+def test_search_matches_brute_force_after_round_trip(tmp_path):
+    rng = np.random.default_rng(7)
+    matrix = normalize_rows(rng.normal(size=(200, 32)).astype(np.float32))
+    VectorIndex(matrix, make_docs(200), "test-model").save(str(tmp_path), "culturis")
+    loaded = VectorIndex.load(str(tmp_path), "culturis")
+    assert isinstance(loaded.matrix, np.memmap)
+    query = normalize_rows(rng.normal(size=(1, 32)).astype(np.float32))[0]
+    expected = np.argsort(-(matrix @ query))[:8]
+    hits = loaded.search(query, k=8)
+    assert [doc["id"] for _, doc in hits] == [f"doc-{i}" for i in expected]
+    assert [score for score, _ in hits] == sorted((score for score, _ in hits), reverse=True)
+def test_retriever_splits_tags_and_few_shots(tmp_path, monkeypatch):
+    matrix = np.eye(4, dtype=np.float32)
+    VectorIndex(matrix, make_docs(4), "test-model").save(str(tmp_path), "culturis")
+    monkeypatch.setattr(setting, "VECTOR_DIR", str(tmp_path))
+    monkeypatch.setattr(index, "embed_texts", lambda texts, model=None: np.array([[0.1, 0.9, 0.0, 0.5]], dtype=np.float32))
+    tag_snips, shot_snips = index.RAGRetriever().retrieve("coffee", k=3)
+    assert [d["text"] for d in tag_snips] == ["doc 1"]
+    assert [d["text"] for d in shot_snips] == ["doc 3", "doc 0"]
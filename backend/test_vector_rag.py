@@ -0,0 +1,32 @@
+import json
+import os
+import numpy as np
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import vectorRAG
+def test_rebuild_only_embeds_new_docs_and_drops_removed(tmp_path, monkeypatch):
+    tags_path, shots_path = tmp_path / "tags.json", tmp_path / "shots.json"
+    tags = [{"id": "urn:tag:venue_type:cafe", "name": "Cafe", "type": "venue_type"},
+            {"id": "urn:tag:venue_type:bar", "name": "Bar", "type": "venue_type"}]
+    tags_path.write_text(json.dumps(tags))
+    shots_path.write_text(json.dumps([{"user": "matcha pop-up", "qloo_request": {"endpoint": "/v2/insights"}}]))
+    embedded = []
+    def fake_embed(texts, model=None):
+        embedded.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32) / 2
+    monkeypatch.setattr(vectorRAG, "TAGS_PATH", str(tags_path))
+    monkeypatch.setattr(vectorRAG, "SHOTS_PATH", str(shots_path))
+    monkeypatch.setattr(vectorRAG, "VECTOR_DIR", str(tmp_path / "vectorstore"))
+    monkeypatch.setattr(vectorRAG, "embed_texts", fake_embed)
+    assert vectorRAG.main(["--batch-docs", "2"]) == 0
+    assert len(embedded) == 3
+    assert vectorRAG.main(["--check"]) == 0
+    assert vectorRAG.main([]) == 0
+    assert len(embedded) == 3
+    tags_path.write_text(json.dumps(tags[:1] + [{"id": "urn:tag:venue_type:museum", "name": "Museum", "type": "venue_type"}]))
+    assert vectorRAG.main(["--check"]) == 1
+    assert len(embedded) == 3
+    assert vectorRAG.main([]) == 0
+    assert embedded[3:] == ["Museum (venue_type) -> urn:tag:venue_type:museum"]
+    index = vectorRAG.load_existing()
+    assert sorted(d["metadata"].get("name", "") for d in index.docs) == ["", "Cafe", "Museum"]
+    assert index.matrix.shape == (3, 4)
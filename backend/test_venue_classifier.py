@@ -0,0 +1,54 @@
+import random
+from qloo_client import EntityRecord
+from venue_classifier import VENUE_TYPE_HIERARCHY, VenueClassifier
+def reference_type(entity):
+    venue_type = 'Cultural Venue'
+    for tag_patterns, type_name in VENUE_TYPE_HIERARCHY:
+        for tag in entity.get('tags', []):
+            if f"{tag.get('type', '')}:{tag.get('name', '')}" in tag_patterns:
+                venue_type = type_name
+                break
+        if venue_type != 'Cultural Venue':
+            break
+    if venue_type == 'Cultural Venue':
+        name_lower = entity.get('name', '').lower()
+        if 'deli' in name_lower or 'delicatessen' in name_lower:
+            venue_type = 'Deli'
+        elif any(word in name_lower for word in ['museum', 'guggenheim', 'whitney']):
+            venue_type = 'Museum'
+        elif 'market' in name_lower:
+            venue_type = 'Market'
+        elif any(word in name_lower for word in ['restaurant', 'kitchen', 'house']) and 'museum' not in name_lower:
+            venue_type = 'Restaurant'
+        elif any(word in name_lower for word in ['cafe', 'coffee']):
+            venue_type = 'Cafe'
+        elif any(word in name_lower for word in ['bar', 'tavern', 'lounge']):
+            venue_type = 'Bar'
+        elif any(word in name_lower for word in ['center', 'arena', 'garden']) and 'medical' not in name_lower:
+            venue_type = 'Garden' if 'garden' in name_lower else 'Event Venue'
+        elif 'park' in name_lower:
+            venue_type = 'Park'
+    return venue_type
+TAG_KEYS = [key for keys, _ in VENUE_TYPE_HIERARCHY for key in keys] + [
+    'urn:tag:category:place:Bakery', 'urn:tag:genre:place:Cafe', 'urn:tag:amenity:place:Wifi']
+NAME_WORDS = ['Deli', 'Whitney', 'Market', 'Kitchen', 'House', 'Coffee', 'Tavern', 'Medical', 'Center', 'Garden',
+              'Arena', 'Park', 'Museum', 'Katz', 'Barn', 'The', 'Of', 'Lounge']
+def make_entity(rng, i):
+    tags = []
+    for _ in range(rng.randint(0, 5)):
+        tag_type, _, name = rng.choice(TAG_KEYS).rpartition(':')
+        tags.append({'type': tag_type, 'name': name})
+    return {'id': f'entity-{i}', 'name': ' '.join(rng.choice(NAME_WORDS) for _ in range(rng.randint(0, 3))), 'tags': tags}
+def test_classifier_matches_reference_hierarchy():
+    rng = random.Random(3)
+    classifier = VenueClassifier()
+    for i in range(3000):
+        entity = make_entity(rng, i)
+        assert classifier.classify(EntityRecord(entity)) == reference_type(entity), entity
+def test_classification_is_memoized_by_entity_id():
+    classifier = VenueClassifier()
+    museum_tags = [{'type': 'urn:tag:genre:place', 'name': 'Museum'}]
+    assert classifier.classify(EntityRecord({'id': 'abc', 'name': 'Joe Coffee', 'tags': []})) == 'Cafe'
+    assert classifier.classify(EntityRecord({'id': 'abc', 'name': 'Joe Coffee', 'tags': museum_tags})) == 'Cafe'
+    assert classifier.stats()['hits'] == 1
+    assert classifier.classify(EntityRecord({'name': 'Joe Coffee', 'tags': museum_tags})) == 'Museum'
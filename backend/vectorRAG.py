@@ -1,45 +1,92 @@
-import os
+import argparse
+import hashlib
 import json
-import uuid
-from dotenv import load_dotenv
-import chromadb
-from chromadb.utils import embedding_functions
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-EMBED_MODEL = os.getenv("EMBED_MODEL")
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from embeddings import embed_texts, embed_model
+from vector_index import VectorIndex
 TAGS_PATH = 'data/qloo_tags.json'
 SHOTS_PATH = 'data/few_shots.json'
 VECTOR_DIR = 'vectorstore'
 COLLECTION_NAME = 'culturis'
-def main():
-    client = chromadb.PersistentClient(path=VECTOR_DIR)
-    embed_fn = embedding_functions.OpenAIEmbeddingFunction(
-        api_key=OPENAI_API_KEY,
-        model_name=EMBED_MODEL,
-    )
-    try:
-        client.delete_collection(COLLECTION_NAME)
-    except Exception:
-        pass
-    collect = client.create_collection(COLLECTION_NAME, embedding_function=embed_fn)
+MAX_BATCH_DOCS = 128
+MAX_BATCH_CHARS = 60000
+def doc_id(text: str) -> str:
+    """Content-addressed id, so an unchanged document keeps its id across runs"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+def build_docs() -> List[Dict[str, Any]]:
     with open(TAGS_PATH, 'r') as f:
         tags = json.load(f)
     with open(SHOTS_PATH, 'r') as f:
         shots = json.load(f)
-    docs = []
-    metadata = []
-    ids = []
+    docs = {}
     for t in tags:
         text = f"{t['name']} ({t['type']}) -> {t['id']}"
-        docs.append(text)
-        metadata.append({"kind": "tag", **t})
-        ids.append(str(uuid.uuid4()))
+        docs.setdefault(doc_id(text), {"id": doc_id(text), "text": text, "metadata": {"kind": "tag", **t}})
     for s in shots:
         text = f"USER: {s['user']}\nQLOO: {json.dumps(s['qloo_request'])}"
-        docs.append(text)
-        metadata.append({"kind": "fewshot"})
-        ids.append(str(uuid.uuid4()))
-    collect.add(documents=docs, metadatas=metadata, ids=ids)
-    print(f"Indexed {len(ids)} docs into '{COLLECTION_NAME}' at {VECTOR_DIR}")
+        docs.setdefault(doc_id(text), {"id": doc_id(text), "text": text, "metadata": {"kind": "fewshot"}})
+    return list(docs.values())
+def load_existing() -> Optional[VectorIndex]:
+    try:
+        return VectorIndex.load(VECTOR_DIR, COLLECTION_NAME)
+    except FileNotFoundError:
+        return None
+def diff_index(existing: Optional[VectorIndex], docs: List[Dict[str, Any]], model: str) -> Dict[str, List[str]]:
+    """Compare the wanted docs against the built index; a model change invalidates every vector"""
+    old = {} if existing is None or existing.model != model else {d["id"]: d for d in existing.docs}
+    wanted = {d["id"]: d for d in docs}
+    return {
+        "added": [i for i in wanted if i not in old],
+        "removed": [i for i in old if i not in wanted],
+        "metadata_changed": [i for i in wanted if i in old and old[i]["metadata"] != wanted[i]["metadata"]],
+        "unchanged": [i for i in wanted if i in old and old[i]["metadata"] == wanted[i]["metadata"]]
+    }
+def iter_batches(docs: List[Dict[str, Any]], max_docs: int, max_chars: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group docs into embedding requests capped by document count and total text size"""
+    batch, chars = [], 0
+    for doc in docs:
+        if batch and (len(batch) >= max_docs or chars + len(doc["text"]) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(doc)
+        chars += len(doc["text"])
+    if batch:
+        yield batch
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Incrementally (re)build the retrieval index")
+    parser.add_argument("--check", action="store_true", help="report drift between data/ and the index without writing")
+    parser.add_argument("--batch-docs", type=int, default=MAX_BATCH_DOCS)
+    parser.add_argument("--batch-chars", type=int, default=MAX_BATCH_CHARS)
+    args = parser.parse_args(argv)
+    model = embed_model()
+    docs = build_docs()
+    existing = load_existing()
+    diff = diff_index(existing, docs, model)
+    drift = diff["added"] or diff["removed"] or diff["metadata_changed"]
+    print(f"Index '{COLLECTION_NAME}': {len(diff['added'])} new, {len(diff['removed'])} removed, "
+          f"{len(diff['metadata_changed'])} metadata changes, {len(diff['unchanged'])} unchanged")
+    if existing is not None and existing.model != model:
+        print(f"Embed model changed from {existing.model} to {model}, every doc will be re-embedded")
+    if args.check:
+        return 1 if drift else 0
+    if not drift:
+        print("Index is up to date")
+        return 0
+    vectors = {}
+    if existing is not None and existing.model == model:
+        rows = {d["id"]: row for row, d in enumerate(existing.docs)}
+        for i in diff["unchanged"] + diff["metadata_changed"]:
+            vectors[i] = np.asarray(existing.matrix[rows[i]], dtype=np.float32)
+    added = set(diff["added"])
+    for batch in iter_batches([d for d in docs if d["id"] in added], args.batch_docs, args.batch_chars):
+        for doc, vector in zip(batch, embed_texts([d["text"] for d in batch], model=model)):
+            vectors[doc["id"]] = vector
+        print(f"Embedded {len(batch)} docs")
+    matrix = np.vstack([vectors[d["id"]] for d in docs]) if docs else np.zeros((0, 0), dtype=np.float32)
+    VectorIndex(matrix, docs, model).save(VECTOR_DIR, COLLECTION_NAME)
+    print(f"Indexed {len(docs)} docs into '{COLLECTION_NAME}' at {VECTOR_DIR}")
+    return 0
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
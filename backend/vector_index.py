@@ -0,0 +1,45 @@
+import json
+import os
+from typing import Any, Dict, List, Tuple
+import numpy as np
+def index_paths(vector_dir: str, name: str) -> Tuple[str, str]:
+    """Locations of the embedding matrix and its metadata sidecar"""
+    return os.path.join(vector_dir, f"{name}.npy"), os.path.join(vector_dir, f"{name}.meta.json")
+class VectorIndex:
+    """Exact cosine-similarity search over a small, unit-normalized embedding matrix"""
+    def __init__(self, matrix: np.ndarray, docs: List[Dict[str, Any]], model: str = None):
+        if len(docs) != matrix.shape[0]:
+            raise ValueError(f"Index has {matrix.shape[0]} vectors but {len(docs)} metadata rows")
+        self.matrix = matrix
+        self.docs = docs
+        self.model = model
+    def __len__(self) -> int:
+        return len(self.docs)
+    @classmethod
+    def load(cls, vector_dir: str, name: str) -> "VectorIndex":
+        matrix_path, meta_path = index_paths(vector_dir, name)
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        matrix = np.load(matrix_path, mmap_mode='r')
+        return cls(matrix, meta["docs"], meta.get("model"))
+    def save(self, vector_dir: str, name: str) -> None:
+        """Write the matrix and sidecar next to each other, replacing any previous build atomically"""
+        os.makedirs(vector_dir, exist_ok=True)
+        matrix_path, meta_path = index_paths(vector_dir, name)
+        tmp_matrix, tmp_meta = f"{matrix_path}.tmp.npy", f"{meta_path}.tmp"
+        np.save(tmp_matrix, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        with open(tmp_meta, 'w') as f:
+            json.dump({"model": self.model, "dim": int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0,
+                       "docs": self.docs}, f)
+        os.replace(tmp_matrix, matrix_path)
+        os.replace(tmp_meta, meta_path)
+    def search(self, query_vector: np.ndarray, k: int = 8) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k docs by dot product with a unit-normalized query, best first"""
+        n = len(self.docs)
+        if n == 0 or k <= 0:
+            return []
+        scores = self.matrix @ np.asarray(query_vector, dtype=np.float32)
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self.docs[i]) for i in top]
\ No newline at end of file
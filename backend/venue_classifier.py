@@ -0,0 +1,87 @@
+from typing import Any, Dict, Optional, Tuple
+from cache import TTLCache
+from matcher import GroupMatcher
+from qloo_client import EntityRecord, TAG_VOCAB
+DEFAULT_VENUE_TYPE = 'Cultural Venue'
+VENUE_TYPE_HIERARCHY = [
+    (['urn:tag:category:place:American Restaurant', 'urn:tag:category:place:Italian Restaurant',
+      'urn:tag:category:place:Jewish Restaurant'], 'Restaurant'),
+    (['urn:tag:category:place:Deli', 'urn:tag:genre:place:Deli'], 'Deli'),
+    (['urn:tag:category:place:Cafe', 'urn:tag:amenity:place:Cafe'], 'Cafe'),
+    (['urn:tag:genre:place:Restaurant'], 'Restaurant'),
+    (['urn:tag:amenity:place:Bar', 'urn:tag:amenity:place:Bar / Lounge'], 'Bar'),
+    (['urn:tag:category:place:Art Museum', 'urn:tag:genre:place:Art Museum'], 'Art Museum'),
+    (['urn:tag:category:place:Modern Art Museum', 'urn:tag:genre:place:Modern Art Museum'], 'Modern Art Museum'),
+    (['urn:tag:category:place:Museum', 'urn:tag:genre:place:Museum'], 'Museum'),
+    (['urn:tag:category:place:Market', 'urn:tag:genre:place:Market'], 'Market'),
+    (['urn:tag:category:place:Shopping Mall'], 'Shopping Mall'),
+    (['urn:tag:category:place:Event Venue', 'urn:tag:genre:place:Event Venue'], 'Event Venue'),
+    (['urn:tag:category:place:Arena', 'urn:tag:genre:place:Arena'], 'Arena'),
+    (['urn:tag:genre:place:Stadium'], 'Stadium'),
+    (['urn:tag:genre:place:Tourist Attraction'], 'Tourist Attraction'),
+    (['urn:tag:category:place:Tourist Attraction'], 'Tourist Attraction'),
+    (['urn:tag:category:place:Historical Landmark'], 'Historical Landmark'),
+    (['urn:tag:category:place:Park', 'urn:tag:genre:place:Park'], 'Park'),
+    (['urn:tag:category:place:Garden'], 'Garden')
+]
+def build_tag_table(hierarchy) -> Dict[str, Tuple[int, str]]:
+    """Flatten the ordered hierarchy into "type:name" tag key -> (priority, venue type)"""
+    table: Dict[str, Tuple[int, str]] = {}
+    for priority, (keys, type_name) in enumerate(hierarchy):
+        for key in keys:
+            table.setdefault(key, (priority, type_name))
+    return table
+TAG_VENUE_TYPES = build_tag_table(VENUE_TYPE_HIERARCHY)
+NAME_VENUE_TYPES = GroupMatcher({
+    'Deli': ['deli', 'delicatessen'],
+    'Museum': ['museum', 'guggenheim', 'whitney'],
+    'Market': ['market'],
+    'Restaurant': ['restaurant', 'kitchen', 'house'],
+    'Cafe': ['cafe', 'coffee'],
+    'Bar': ['bar', 'tavern', 'lounge'],
+    'Garden': ['garden'],
+    'Event Venue': ['center', 'arena'],
+    'Park': ['park'],
+    'medical': ['medical']
+})
+NAME_FALLBACK_ORDER = ('Deli', 'Museum', 'Market', 'Restaurant', 'Cafe', 'Bar', 'Garden', 'Event Venue', 'Park')
+EXCLUDED_BY_MEDICAL = ('Garden', 'Event Venue')
+def tag_venue_type(tag_ids) -> Optional[str]:
+    """Resolve the highest-priority venue type among an entity's interned tags in a single pass"""
+    best = None
+    for tag_id in tag_ids:
+        hit = TAG_VENUE_TYPES.get(TAG_VOCAB.strings[tag_id])
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit
+            if best[0] == 0:
+                break
+    return None if best is None else best[1]
+def name_venue_type(name: str) -> Optional[str]:
+    """Fallback from the venue name; a 'medical' center or garden is not an event venue"""
+    hits = NAME_VENUE_TYPES.find_groups(name)
+    if not hits:
+        return None
+    for type_name in NAME_FALLBACK_ORDER:
+        if type_name in hits and not (type_name in EXCLUDED_BY_MEDICAL and 'medical' in hits):
+            return type_name
+    return None
+class VenueClassifier:
+    """Classifies Qloo place entities into display venue types, memoized by entity id"""
+    def __init__(self, max_size: int = 10000):
+        self._memo = TTLCache(max_size=max_size, ttl=None)
+    def classify(self, entity: EntityRecord, name: Optional[str] = None) -> str:
+        entity_id = entity.id
+        if entity_id:
+            venue_type = self._memo.get(entity_id)
+            if venue_type is not None:
+                return venue_type
+        name = entity.name if name is None else name
+        venue_type = tag_venue_type(entity.tag_ids) or name_venue_type(name) or DEFAULT_VENUE_TYPE
+        if entity_id:
+            self._memo.set(entity_id, venue_type)
+        return venue_type
+    def clear(self) -> None:
+        self._memo.clear()
+    def stats(self) -> Dict[str, Any]:
+        return self._memo.stats()
+venue_classifier = VenueClassifier()